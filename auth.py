@@ -1,12 +1,17 @@
 # auth.py
+import os
+import time
 from passlib.context import CryptContext
 from jose import JWTError, jwt
 from datetime import datetime, timedelta
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
+from sqlalchemy import select
 from sqlalchemy.orm import Session
 import models
-from database import SessionLocal
+from database import SessionLocal, AsyncSessionLocal, read_session, async_read_session
+from utils.cache import MemoryCache
+from utils.passwords import password_pool
 
 # secret (ganti dengan env var di production)
 SECRET_KEY = "ASEP"
@@ -26,11 +31,16 @@ def get_db():
     finally:
         db.close()
 
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
+# bcrypt runs on the bounded process pool in utils/passwords.py; both raise PoolBusy when it is full
 def hash_password(password: str) -> str:
-    return pwd_context.hash(password)
+    return password_pool.hash(password)
 
 def verify_password(plain: str, hashed: str) -> bool:
-    return pwd_context.verify(plain, hashed)
+    return password_pool.verify_and_update(plain, hashed)[0]
 
 def create_access_token(data: dict, expires_delta: timedelta | None = None):
     to_encode = data.copy()
@@ -42,20 +52,104 @@ def create_access_token(data: dict, expires_delta: timedelta | None = None):
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
-def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
-    credentials_exception = HTTPException(
+# Decoded tokens and user principals are cached so an authenticated request
+# normally costs no database round trip. A token entry never outlives the
+# token; a principal entry lives AUTH_CACHE_TTL seconds at most, or until
+# invalidate_user() is called for that user.
+AUTH_CACHE_TTL = float(os.getenv("AUTH_CACHE_TTL", "60"))
+AUTH_CACHE_SIZE = int(os.getenv("AUTH_CACHE_SIZE", "10000"))
+token_cache = MemoryCache(max_entries=AUTH_CACHE_SIZE, ttl=AUTH_CACHE_TTL)
+principal_cache = MemoryCache(max_entries=AUTH_CACHE_SIZE, ttl=AUTH_CACHE_TTL)
+
+
+class Principal:
+    """The authenticated user without the ORM object (and without the password hash)."""
+    __slots__ = ("id", "name", "email")
+
+    def __init__(self, id: int, name: str, email: str):
+        self.id = id
+        self.name = name
+        self.email = email
+
+
+def _credentials_exception():
+    return HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
+
+def _token_user_id(token: str) -> int:
+    user_id = token_cache.get(token)
+    if user_id is not None:
+        return user_id
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        user_id: int = int(payload.get("sub"))
-        if user_id is None:
-            raise credentials_exception
-    except JWTError:
-        raise credentials_exception
+        user_id = int(payload.get("sub"))
+    except (JWTError, TypeError, ValueError):
+        raise _credentials_exception()
+    ttl = AUTH_CACHE_TTL
+    if payload.get("exp"):
+        ttl = min(ttl, payload["exp"] - time.time())
+    if ttl > 0:
+        token_cache.set(token, user_id, ttl=ttl)
+    return user_id
+
+def invalidate_user(user_id: int) -> None:
+    """Drop the cached principal; call after a user is deleted or their credentials change."""
+    principal_cache.delete(str(user_id))
+
+def auth_cache_stats() -> dict:
+    return {"tokens": token_cache.stats(), "principals": principal_cache.stats()}
+
+def get_current_principal(token: str = Depends(oauth2_scheme)) -> Principal:
+    """Authenticated user for routes that only need its id/name/email; no DB access on a cache hit."""
+    user_id = _token_user_id(token)
+    principal = principal_cache.get(str(user_id))
+    if principal is None:
+        db = SessionLocal()
+        try:
+            row = db.query(models.User.id, models.User.name, models.User.email).filter(models.User.id == user_id).first()
+        finally:
+            db.close()
+        if row is None:
+            raise _credentials_exception()
+        principal = Principal(row.id, row.name, row.email)
+        principal_cache.set(str(user_id), principal)
+    return principal
+
+async def get_current_principal_async(token: str = Depends(oauth2_scheme)) -> Principal:
+    """get_current_principal for async routes: a cache miss loads the user without blocking the event loop."""
+    user_id = _token_user_id(token)
+    principal = principal_cache.get(str(user_id))
+    if principal is None:
+        async with AsyncSessionLocal() as db:
+            row = (await db.execute(
+                select(models.User.id, models.User.name, models.User.email).where(models.User.id == user_id)
+            )).first()
+        if row is None:
+            raise _credentials_exception()
+        principal = Principal(row.id, row.name, row.email)
+        principal_cache.set(str(user_id), principal)
+    return principal
+
+def get_read_db(current_user: Principal = Depends(get_current_principal)):
+    """Session for GET routes: the read replica, or the primary while the user's own writes may still be replicating."""
+    db = read_session(current_user.id)
+    try:
+        yield db
+    finally:
+        db.close()
+
+async def get_async_read_db(current_user: Principal = Depends(get_current_principal_async)):
+    async with async_read_session(current_user.id) as db:
+        yield db
+
+def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
+    """The full ORM User, loaded from the database; prefer get_current_principal."""
+    user_id = _token_user_id(token)
     user = db.query(models.User).filter(models.User.id == user_id).first()
     if user is None:
-        raise credentials_exception
+        invalidate_user(user_id)
+        raise _credentials_exception()
     return user
@@ -0,0 +1,18 @@
+# benchmarks/__init__.py
+"""End-to-end API benchmarks, plus parser microbenchmarks.
+
+    python -m benchmarks.generate --users 10 --years 2          # seed ./benchmarks/bench.db
+    python -m benchmarks.run --users 10 --years 2 --output out.json
+    python -m benchmarks.parser --output parser.json
+
+`generate` fills a database with deterministic synthetic users, categories,
+incomes and expenses (same seed -> same rows). `run` seeds the database if it
+is empty, then drives the real FastAPI app in process and prints per-workload
+latency percentiles, throughput and SQL queries per request as JSON, so two
+runs can be diffed. Both default to a SQLite file; pass --database-url to use
+MySQL instead.
+
+`parser` needs no database: it times the rule extractors and the text parser
+(with a stub model) over the labelled phrases in `parser_corpus.jsonl` and
+reports their accuracy against the labels.
+"""
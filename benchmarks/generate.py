@@ -0,0 +1,173 @@
+# benchmarks/generate.py
+"""Deterministic synthetic ledgers for the benchmarks.
+
+Every user gets the default categories and, per year: a monthly salary, a
+December bonus, occasional freelance and investment income, fixed monthly
+bills and instalments, and daily food/transport/shopping expenses with
+log-normal amounts. The same seed always produces the same rows.
+
+The app modules are imported inside the functions: `database` builds its
+engine from DATABASE_URL on import, so callers set that first.
+"""
+import argparse
+import math
+import os
+import random
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import func, select
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+BENCH_PASSWORD = "benchpass"
+BENCH_EMAIL = "bench{}@example.com"
+CHUNK = 5000
+CREATED_AT = datetime(2020, 1, 1)
+
+# name -> (expected purchases per day, median amount, log-normal sigma, titles)
+DAILY_EXPENSES = {
+    "Makanan": (2.0, 35_000, 0.6, ["Makan siang", "Kopi", "Nasi goreng", "GoFood", "Sarapan", "Bakso"]),
+    "Transport": (1.2, 20_000, 0.5, ["Ojol", "Bensin", "Parkir", "KRL", "Tol"]),
+    "Belanja Bulanan": (0.13, 400_000, 0.5, ["Belanja bulanan", "Supermarket", "Indomaret", "Alfamart"]),
+    "Lainnya": (0.3, 100_000, 1.0, ["Hadiah", "Obat", "Potong rambut", "Langganan", "Donasi"]),
+}
+# name -> [(day of month, amount, title)]
+MONTHLY_BILLS = {
+    "Tagihan (Listrik, Air, Internet)": [(5, 300_000, "Token listrik"), (5, 100_000, "PDAM"), (7, 350_000, "Internet")],
+}
+UNCATEGORISED_SHARE = 0.05
+
+
+def _poisson(rng: random.Random, lam: float) -> int:
+    # Knuth; lam is small here
+    limit, k, p = math.exp(-lam), 0, 1.0
+    while True:
+        p *= rng.random()
+        if p <= limit:
+            return k
+        k += 1
+
+
+def _amount(rng: random.Random, median: float, sigma: float) -> float:
+    return round(rng.lognormvariate(math.log(median), sigma), -2) or 100.0
+
+
+def _user_rows(rng: random.Random, user_id: int, categories: dict, start: date, end: date):
+    """Yield ("income"|"expense", row) for one user over [start, end)."""
+    def category(kind: str, name: str):
+        return None if rng.random() < UNCATEGORISED_SHARE else categories[(kind, name)]
+
+    def row(kind, name, title, amount, day, description=None):
+        return kind, {"user_id": user_id, "category_id": category(kind, name), "title": title, "amount": amount,
+                      "description": description, "date": day, "created_at": CREATED_AT}
+
+    salary = _amount(rng, 8_000_000, 0.4)
+    has_instalment = rng.random() < 0.5
+    instalment = _amount(rng, 1_500_000, 0.3)
+    day = start
+    while day < end:
+        if day.day == 25:
+            yield row("income", "Gaji", "Gaji bulanan", round(salary * rng.uniform(0.98, 1.02), -3), day)
+            if day.month == 12:
+                yield row("income", "Bonus", "Bonus akhir tahun", salary, day)
+        if day.day == 1 and rng.random() < 0.3:
+            yield row("income", "Investasi", "Dividen", _amount(rng, 250_000, 0.8), day)
+        if rng.random() < 0.03:
+            yield row("income", "Side Job / Freelance", "Proyek freelance", _amount(rng, 1_500_000, 0.6), day)
+        for name, bills in MONTHLY_BILLS.items():
+            for bill_day, amount, title in bills:
+                if day.day == bill_day:
+                    yield row("expense", name, title, round(amount * rng.uniform(0.8, 1.2), -2), day)
+        if has_instalment and day.day == 10:
+            yield row("expense", "Cicilan", "Cicilan motor", instalment, day)
+        for name, (per_day, median, sigma, titles) in DAILY_EXPENSES.items():
+            for _ in range(_poisson(rng, per_day)):
+                yield row("expense", name, rng.choice(titles), _amount(rng, median, sigma), day)
+        day += timedelta(days=1)
+
+
+def generate(engine: Engine, users: int, years: int, seed: int = 1, end_year: int = 2025, password_hash: str | None = None) -> dict:
+    """Seed `engine` (already migrated, with no bench users yet) and return row counts."""
+    import models
+    from routers.auth_router import DEFAULT_CATEGORIES
+    from utils import rollup
+    if password_hash is None:
+        from auth import hash_password
+        password_hash = hash_password(BENCH_PASSWORD)
+
+    start, end = date(end_year - years + 1, 1, 1), date(end_year + 1, 1, 1)
+    counts = {"users": users, "categories": 0, "incomes": 0, "expenses": 0}
+    with Session(engine) as db:
+        db.execute(models.User.__table__.insert(), [
+            {"name": f"Bench User {i}", "email": BENCH_EMAIL.format(i), "password": password_hash, "created_at": CREATED_AT}
+            for i in range(users)
+        ])
+        user_ids = dict(db.execute(select(models.User.email, models.User.id)
+                                   .where(models.User.email.in_([BENCH_EMAIL.format(i) for i in range(users)]))).all())
+        category_rows = [{"user_id": user_id, "name": c["name"], "type": models.CategoryType[c["type"]], "created_at": CREATED_AT}
+                         for user_id in user_ids.values() for c in DEFAULT_CATEGORIES]
+        db.execute(models.Category.__table__.insert(), category_rows)
+        counts["categories"] = len(category_rows)
+        categories = {}
+        for id_, user_id, name, type_ in db.execute(select(models.Category.id, models.Category.user_id, models.Category.name,
+                                                           models.Category.type).where(models.Category.user_id.in_(user_ids.values()))):
+            categories[(user_id, type_.value, name)] = id_
+
+        pending = {"income": [], "expense": []}
+        tables = {"income": models.Income.__table__, "expense": models.Expense.__table__}
+        for i in range(users):
+            user_id = user_ids[BENCH_EMAIL.format(i)]
+            # one stream per user: adding users never changes the rows of the existing ones
+            rng = random.Random(f"{seed}:{i}")
+            own = {(kind, name): id_ for (uid, kind, name), id_ in categories.items() if uid == user_id}
+            for kind, row in _user_rows(rng, user_id, own, start, end):
+                pending[kind].append(row)
+                if len(pending[kind]) >= CHUNK:
+                    db.execute(tables[kind].insert(), pending[kind])
+                    counts[kind + "s"] += len(pending[kind])
+                    pending[kind] = []
+        for kind, rows in pending.items():
+            if rows:
+                db.execute(tables[kind].insert(), rows)
+                counts[kind + "s"] += len(rows)
+        for user_id in user_ids.values():
+            rollup.rebuild(db, user_id)
+        db.commit()
+    return counts
+
+
+def bench_users(engine: Engine) -> int:
+    import models
+    with engine.connect() as conn:
+        return conn.execute(select(func.count()).select_from(models.User.__table__)
+                            .where(models.User.email.like(BENCH_EMAIL.format("%")))).scalar_one()
+
+
+def sqlite_url(path: str) -> str:
+    return "sqlite:///" + os.path.abspath(path)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Seed a database with synthetic benchmark data.")
+    parser.add_argument("--users", type=int, default=10)
+    parser.add_argument("--years", type=int, default=2)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--end-year", type=int, default=2025, help="last year of data")
+    parser.add_argument("--db", default="benchmarks/bench.db", help="SQLite file (ignored with --database-url)")
+    parser.add_argument("--database-url", default=None, help="e.g. mysql+pymysql://user:pw@host/bench_db (must be empty)")
+    args = parser.parse_args()
+
+    url = args.database_url or sqlite_url(args.db)
+    os.environ["DATABASE_URL"] = url
+    import migrations
+    from database import engine
+    migrations.migrate(engine)
+    if bench_users(engine):
+        raise SystemExit(f"{url} already has benchmark users; use an empty database")
+    print(generate(engine, args.users, args.years, args.seed, args.end_year))
+    from utils.passwords import password_pool
+    password_pool.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,205 @@
+# benchmarks/parser.py
+"""Microbenchmarks and accuracy for the text parser, over a labelled corpus.
+
+    python -m benchmarks.parser --rounds 20 --output parser.json
+
+`parser_corpus.jsonl` holds Indonesian transaction phrases, one JSON object
+per line, labelled with what a correct parse gives: amount, date, category,
+type and has_content. A missing key means "not labelled", null means "there
+is nothing to find". Dates are ISO, "today" / "today-N" (N days ago), or
+"MM-DD" for a day named without a year (its next occurrence, today included).
+The labels are the right answers, not the current output: accuracy below 1.0
+is a list of parser bugs, printed with the report. tests/test_rule_parser.py
+keeps the known ones as a baseline and fails on any new mismatch.
+
+For every `_extract_*` helper, `_has_transaction_content` and `analyze_text`
+the report gives ns/op (best of --rounds passes over the corpus), the mean
+per-call peak of traced allocations (tracemalloc, in its own pass so tracing
+does not skew the timings) and accuracy. `parse_expense_text` runs end to end
+against a stub model, uncached and cached: that covers validation, the rule
+fast path, prompt building and the JSON post-processing, not llama itself.
+"""
+import argparse
+import contextlib
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+import tracemalloc
+from collections import Counter
+from datetime import date, datetime, timedelta
+
+from benchmarks.run import _git_commit
+from utils import ai_parser, rule_parser
+
+CORPUS = os.path.join(os.path.dirname(__file__), "parser_corpus.jsonl")
+MAX_MISMATCHES = 20
+
+# what the stub model answers to every prompt; the rule results override it
+STUB_COMPLETION = '{"title":"Transaksi","amount":0,"date":"2025-01-01","category":"other","type":"expense"}'
+
+
+class StubModel:
+    """Stands in for llama_cpp.Llama: same call signature, canned completion."""
+
+    def __init__(self, latency_ms: float = 0.0):
+        self.latency = latency_ms / 1000
+
+    def __call__(self, prompt, max_tokens=256, temperature=0.1, stop=None):
+        if self.latency:
+            time.sleep(self.latency)
+        return {"choices": [{"text": STUB_COMPLETION}]}
+
+
+def _expected_date(label: str | None, today: date) -> str | None:
+    if label is None or len(label) == 10:  # absent or ISO
+        return label
+    if label == "today":
+        return today.isoformat()
+    if label.startswith("today-"):
+        return (today - timedelta(days=int(label[6:]))).isoformat()
+    month, day = map(int, label.split("-"))
+    expected = date(today.year, month, day)
+    return (expected if expected >= today else expected.replace(year=today.year + 1)).isoformat()
+
+
+# name -> (function, label key, result -> value compared with the label)
+EXTRACTORS = {
+    "_extract_amount_from_text": (rule_parser._extract_amount_from_text, "amount", lambda r: r),
+    "_extract_date_from_text": (rule_parser._extract_date_from_text, "date", lambda r: r),
+    "_extract_category_from_text": (rule_parser._extract_category_from_text, "category", lambda r: r),
+    "_has_transaction_content": (rule_parser._has_transaction_content, "has_content", lambda r: r),
+    "analyze_text": (rule_parser.analyze_text, "type", lambda r: r["type"]),
+}
+
+
+def load_corpus(path: str = CORPUS) -> list:
+    today = datetime.utcnow().date()
+    with open(path) as f:
+        items = [json.loads(line) for line in f if line.strip()]
+    for item in items:
+        if "date" in item:
+            item["date"] = _expected_date(item["date"], today)
+    return items
+
+
+def _ns_per_op(fn, texts: list, rounds: int) -> float:
+    best = None
+    for _ in range(rounds):
+        start = time.perf_counter_ns()
+        for text in texts:
+            fn(text)
+        elapsed = time.perf_counter_ns() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best / len(texts)
+
+
+def _alloc_bytes_per_op(fn, texts: list) -> float:
+    peaks = []
+    tracemalloc.start()
+    try:
+        for text in texts:
+            tracemalloc.reset_peak()
+            before = tracemalloc.get_traced_memory()[0]
+            fn(text)
+            peaks.append(tracemalloc.get_traced_memory()[1] - before)
+    finally:
+        tracemalloc.stop()
+    return statistics.fmean(peaks)
+
+
+def _accuracy(fn, key: str, value, corpus: list) -> dict:
+    labelled = [item for item in corpus if key in item]
+    mismatches = []
+    for item in labelled:
+        got = value(fn(item["text"]))
+        if got != item[key]:
+            mismatches.append({"text": item["text"], "expected": item[key], "got": got})
+    return {
+        "labelled": len(labelled),
+        "correct": len(labelled) - len(mismatches),
+        "accuracy": round(1 - len(mismatches) / len(labelled), 4) if labelled else None,
+        "mismatches": mismatches[:MAX_MISMATCHES],
+    }
+
+
+def bench_extractors(corpus: list, rounds: int) -> dict:
+    texts = [item["text"] for item in corpus]
+    results = {}
+    for name, (fn, key, value) in EXTRACTORS.items():
+        for text in texts:  # warm the lru caches
+            fn(text)
+        results[name] = {
+            "ns_per_op": round(_ns_per_op(fn, texts, rounds), 1),
+            "alloc_peak_bytes_per_op": round(_alloc_bytes_per_op(fn, texts), 1),
+            **_accuracy(fn, key, value, corpus),
+        }
+    return results
+
+
+def bench_end_to_end(corpus: list, rounds: int, latency_ms: float) -> dict:
+    texts = [item["text"] for item in corpus]
+    stub = StubModel(latency_ms)
+    ai_parser.set_model_loader(lambda: stub)
+    try:
+        # the parser logs every step with print(); keep that off the report
+        with open(os.devnull, "w") as sink, contextlib.redirect_stdout(sink):
+            sources = Counter(result.get("source", "error") for result in map(ai_parser._parse_uncached, texts))
+            uncached = _ns_per_op(ai_parser._parse_uncached, texts, rounds)
+            ai_parser.parse_cache.clear()
+            for text in texts:
+                ai_parser.parse_expense_text(text)
+            # errors are not cached, so those texts still take the full path here
+            cached = _ns_per_op(ai_parser.parse_expense_text, texts, rounds)
+    finally:
+        ai_parser.set_model_loader(None)
+    return {
+        "texts": len(texts),
+        "sources": dict(sources),
+        "stub_latency_ms": latency_ms,
+        "uncached_us_per_op": round(uncached / 1000, 2),
+        "cached_us_per_op": round(cached / 1000, 2),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Parser microbenchmarks and accuracy against a labelled corpus.")
+    parser.add_argument("--corpus", default=CORPUS)
+    parser.add_argument("--rounds", type=int, default=20, help="timed passes over the corpus; the best one counts")
+    parser.add_argument("--stub-latency-ms", type=float, default=0.0, help="simulated model latency per prompt")
+    parser.add_argument("--output", default=None, help="write the JSON report here instead of stdout")
+    args = parser.parse_args()
+
+    corpus = load_corpus(args.corpus)
+    extractors = bench_extractors(corpus, args.rounds)
+    for name, result in extractors.items():
+        print(f"{name}: {result['ns_per_op']} ns/op, accuracy {result['accuracy']}", file=sys.stderr)
+    end_to_end = bench_end_to_end(corpus, args.rounds, args.stub_latency_ms)
+    print(f"parse_expense_text: {end_to_end['uncached_us_per_op']} us/op uncached, "
+          f"{end_to_end['cached_us_per_op']} us/op cached", file=sys.stderr)
+
+    report = {
+        "meta": {
+            "commit": _git_commit(),
+            "corpus": os.path.basename(args.corpus),
+            "texts": len(corpus),
+            "rounds": args.rounds,
+            "rule_min_confidence": ai_parser.RULE_MIN_CONFIDENCE,
+            "parse_cache": ai_parser.PARSE_CACHE_BACKEND,
+            "python": platform.python_version(),
+        },
+        "extractors": extractors,
+        "parse_expense_text": end_to_end,
+    }
+    text = json.dumps(report, indent=2, ensure_ascii=False)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
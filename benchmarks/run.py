@@ -0,0 +1,224 @@
+# benchmarks/run.py
+"""Drive the API in process and report latency, throughput and queries per request.
+
+    python -m benchmarks.run --users 10 --years 2 --requests 200 --output before.json
+
+Requests go through httpx's ASGI transport straight into `main.app`: no
+sockets, no server, but the full middleware/dependency/SQL path. Each
+workload picks a random bench user and period per request from a seeded
+RNG, so two runs send the same requests. Workloads run one after another,
+reads first; `expenses_create` runs last because every write changes the
+user's data version and so invalidates the summary caches. Its rows stay
+in the database: pass --regenerate to start the next run from the same data.
+"""
+import argparse
+import asyncio
+import contextvars
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import time
+import zlib
+
+from benchmarks.generate import BENCH_EMAIL, BENCH_PASSWORD, sqlite_url
+
+_queries: contextvars.ContextVar = contextvars.ContextVar("bench_queries", default=None)
+
+
+def _count_query(conn, cursor, statement, parameters, context, executemany):
+    counter = _queries.get()
+    if counter is not None:
+        counter[0] += 1
+
+
+# name -> (method, path(rng, user, years) -> str, json body(rng, user, years) -> dict | None)
+def _month(rng, years):
+    return rng.choice(years), rng.randint(1, 12)
+
+
+WORKLOADS = {
+    "transactions_page": ("GET", lambda r, u, ys: "/transactions?year={}&month={}&limit=50".format(*_month(r, ys)), None),
+    "transactions_summary_monthly": ("GET", lambda r, u, ys: f"/transactions/summary/monthly?year={r.choice(ys)}", None),
+    "transactions_summary_weekly": ("GET", lambda r, u, ys: "/transactions/summary/weekly?year={}&month={}".format(*_month(r, ys)), None),
+    "summary_daily": ("GET", lambda r, u, ys: "/summary/daily?date={}-{:02d}-{:02d}".format(*_month(r, ys), r.randint(1, 28)), None),
+    "summary_monthly": ("GET", lambda r, u, ys: "/summary/monthly?year={}&month={}".format(*_month(r, ys)), None),
+    "summary_yearly": ("GET", lambda r, u, ys: f"/summary/yearly?year={r.choice(ys)}", None),
+    "summary_series": ("GET", lambda r, u, ys: f"/summary/series?start={ys[0]}-01-01&end={ys[-1]}-12-31&granularity=week&group_by=category", None),
+    "expenses_list": ("GET", lambda r, u, ys: "/expenses/?year={}&month={}&limit=50".format(*_month(r, ys)), None),
+    "incomes_list": ("GET", lambda r, u, ys: f"/incomes/?year={r.choice(ys)}&limit=50", None),
+    "auth_login": ("POST", lambda r, u, ys: "/auth/login", lambda r, u, ys: {"email": BENCH_EMAIL.format(u), "password": BENCH_PASSWORD}),
+    "expenses_create": ("POST", lambda r, u, ys: "/expenses/",
+                        lambda r, u, ys: {"title": "Bench", "amount": r.randint(1, 500) * 1000,
+                                          "date": "{}-{:02d}-{:02d}".format(*_month(r, ys), r.randint(1, 28))}),
+}
+
+
+def _percentile(sorted_ms: list, q: int) -> float:
+    if len(sorted_ms) == 1:
+        return sorted_ms[0]
+    return statistics.quantiles(sorted_ms, n=100, method="inclusive")[q - 1]
+
+
+async def _run_workload(client, name: str, tokens: dict, years: list, requests: int, warmup: int, concurrency: int, seed: int) -> dict:
+    method, path, body = WORKLOADS[name]
+    rng = random.Random(seed * 1_000_003 + zlib.crc32(name.encode()))
+    users = sorted(tokens)
+    plan = []
+    for _ in range(warmup + requests):
+        user = rng.choice(users)
+        plan.append((user, path(rng, user, years), body(rng, user, years) if body else None))
+
+    async def send(user, url, payload):
+        headers = {"Authorization": f"Bearer {tokens[user]}"}
+        return await client.request(method, url, json=payload, headers=headers)
+
+    for user, url, payload in plan[:warmup]:
+        await send(user, url, payload)
+
+    latencies, queries, errors = [], [], 0
+    todo = iter(plan[warmup:])
+
+    async def worker():
+        nonlocal errors
+        for user, url, payload in todo:
+            counter = [0]
+            token = _queries.set(counter)
+            start = time.perf_counter()
+            try:
+                response = await send(user, url, payload)
+            finally:
+                latencies.append((time.perf_counter() - start) * 1000)
+                _queries.reset(token)
+            queries.append(counter[0])
+            if response.status_code >= 400:
+                errors += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        "requests": requests,
+        "errors": errors,
+        "p50_ms": round(_percentile(latencies, 50), 3),
+        "p95_ms": round(_percentile(latencies, 95), 3),
+        "p99_ms": round(_percentile(latencies, 99), 3),
+        "mean_ms": round(statistics.fmean(latencies), 3),
+        "max_ms": round(latencies[-1], 3),
+        "throughput_rps": round(requests / elapsed, 2),
+        "queries_per_request": round(statistics.fmean(queries), 2),
+    }
+
+
+def _git_commit() -> str | None:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, timeout=5).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+async def _main(args, app, engine) -> dict:
+    import httpx
+    import sqlalchemy
+
+    years = list(range(args.end_year - args.years + 1, args.end_year + 1))
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        tokens = {}
+        for user in range(args.users):
+            response = await client.post("/auth/login", json={"email": BENCH_EMAIL.format(user), "password": BENCH_PASSWORD})
+            response.raise_for_status()
+            tokens[user] = response.json()["access_token"]
+
+        results = {}
+        for name in args.workloads:
+            requests = args.login_requests if name == "auth_login" else args.requests
+            results[name] = await _run_workload(client, name, tokens, years, requests, args.warmup, args.concurrency, args.seed)
+            print(f"{name}: p50 {results[name]['p50_ms']}ms, {results[name]['queries_per_request']} queries/request", file=sys.stderr)
+
+    return {
+        "meta": {
+            "commit": _git_commit(),
+            "database": engine.dialect.name,
+            "users": args.users,
+            "years": args.years,
+            "seed": args.seed,
+            "requests": args.requests,
+            "warmup": args.warmup,
+            "concurrency": args.concurrency,
+            "summary_cache": os.environ.get("SUMMARY_CACHE_BACKEND", "memory"),
+            "python": platform.python_version(),
+            "sqlalchemy": sqlalchemy.__version__,
+        },
+        "workloads": results,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="End-to-end API benchmark.")
+    parser.add_argument("--users", type=int, default=10)
+    parser.add_argument("--years", type=int, default=2)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--end-year", type=int, default=2025)
+    parser.add_argument("--db", default="benchmarks/bench.db", help="SQLite file (ignored with --database-url)")
+    parser.add_argument("--database-url", default=None, help="run against this database instead, e.g. MySQL")
+    parser.add_argument("--regenerate", action="store_true", help="delete and re-seed the SQLite file first")
+    parser.add_argument("--requests", type=int, default=200, help="measured requests per workload")
+    parser.add_argument("--login-requests", type=int, default=20, help="measured requests for auth_login (bcrypt-bound)")
+    parser.add_argument("--warmup", type=int, default=5)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--workloads", default=",".join(WORKLOADS), help="comma-separated subset of: " + ", ".join(WORKLOADS))
+    parser.add_argument("--summary-cache", choices=["memory", "sqlite", "none"], default=None,
+                        help="SUMMARY_CACHE_BACKEND for the run (default: environment, else memory)")
+    parser.add_argument("--output", default=None, help="write the JSON report here instead of stdout")
+    args = parser.parse_args()
+    args.workloads = [w.strip() for w in args.workloads.split(",") if w.strip()]
+    unknown = [w for w in args.workloads if w not in WORKLOADS]
+    if unknown:
+        parser.error(f"unknown workloads: {', '.join(unknown)}")
+
+    # the app reads its configuration on import
+    if args.database_url:
+        os.environ["DATABASE_URL"] = args.database_url
+    else:
+        if args.regenerate and os.path.exists(args.db):
+            os.remove(args.db)
+        os.environ["DATABASE_URL"] = sqlite_url(args.db)
+    if args.summary_cache:
+        os.environ["SUMMARY_CACHE_BACKEND"] = args.summary_cache
+
+    from sqlalchemy import event
+    from sqlalchemy.engine import Engine
+    import main as app_main
+    from database import engine
+    from benchmarks.generate import bench_users, generate
+    from utils.passwords import password_pool
+
+    existing = bench_users(engine)
+    if existing == 0:
+        print(f"seeding {args.users} users x {args.years} years ...", file=sys.stderr)
+        print(generate(engine, args.users, args.years, args.seed, args.end_year), file=sys.stderr)
+    elif existing < args.users:
+        raise SystemExit(f"database has {existing} bench users, fewer than --users {args.users}; use --regenerate")
+
+    event.listen(Engine, "before_cursor_execute", _count_query)
+    try:
+        report = asyncio.run(_main(args, app_main.app, engine))
+    finally:
+        password_pool.shutdown()
+
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,242 @@
-from sqlalchemy import create_engine
+import os
+import threading
+import time
+from itertools import chain
+from dotenv import load_dotenv
+from sqlalchemy import create_engine, event
+from sqlalchemy.exc import TimeoutError as PoolTimeout
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import Session, sessionmaker
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
 
-DATABASE_URL = "mysql+pymysql://root:@localhost:3307/finance_db"
+load_dotenv()
 
-engine = create_engine(DATABASE_URL)
+DATABASE_URL = os.getenv("DATABASE_URL", "mysql+pymysql://root:@localhost:3307/finance_db")
+
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+# below MySQL's wait_timeout (and any proxy idle timeout): avoids "MySQL server has gone away"
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "1").lower() in ("1", "true", "yes")
+
+
+class _PoolMetrics:
+    """Pool mixin that records how long each checkout waited for a connection."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._metrics_lock = threading.Lock()
+        self.checkouts = 0
+        self.timeouts = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+        self.connects = 0
+        self.invalidated = 0
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        except PoolTimeout:
+            with self._metrics_lock:
+                self.timeouts += 1
+            raise
+        finally:
+            waited = time.perf_counter() - start
+            with self._metrics_lock:
+                self.checkouts += 1
+                self.wait_total += waited
+                self.wait_max = max(self.wait_max, waited)
+
+    def recreate(self):
+        # pre-ping / invalidation may rebuild the pool; keep the counters
+        new = super().recreate()
+        new.__dict__.update({k: getattr(self, k) for k in
+                             ("checkouts", "timeouts", "wait_total", "wait_max", "connects", "invalidated")})
+        return new
+
+    def metrics(self) -> dict:
+        with self._metrics_lock:
+            return {
+                "pool_size": self.size(),
+                "in_use": self.checkedout(),
+                "idle": self.checkedin(),
+                "overflow": max(0, self.overflow()),
+                "max_overflow": self._max_overflow,
+                "checkouts": self.checkouts,
+                "timeouts": self.timeouts,
+                "avg_wait_ms": round(self.wait_total / self.checkouts * 1000, 3) if self.checkouts else 0.0,
+                "max_wait_ms": round(self.wait_max * 1000, 3),
+                "connects": self.connects,
+                "invalidated": self.invalidated,
+            }
+
+
+class InstrumentedQueuePool(_PoolMetrics, QueuePool):
+    pass
+
+
+class InstrumentedAsyncQueuePool(_PoolMetrics, AsyncAdaptedQueuePool):
+    pass
+
+
+def _engine_options(url: str, poolclass=InstrumentedQueuePool) -> dict:
+    if url.startswith("sqlite"):
+        # SQLite picks its own pool class; the knobs below don't apply
+        return {}
+    return {
+        "poolclass": poolclass,
+        "pool_size": DB_POOL_SIZE,
+        "max_overflow": DB_MAX_OVERFLOW,
+        "pool_timeout": DB_POOL_TIMEOUT,
+        "pool_recycle": DB_POOL_RECYCLE,
+        "pool_pre_ping": DB_POOL_PRE_PING,
+    }
+
+
+def _instrument(engine) -> None:
+    @event.listens_for(engine, "connect")
+    def _on_connect(dbapi_connection, connection_record):
+        if isinstance(engine.pool, _PoolMetrics):
+            engine.pool.connects += 1
+
+    @event.listens_for(engine, "invalidate")
+    def _on_invalidate(dbapi_connection, connection_record, exception):
+        if isinstance(engine.pool, _PoolMetrics):
+            engine.pool.invalidated += 1
+
+
+def pool_stats(engine) -> dict:
+    pool = engine.pool
+    if isinstance(pool, _PoolMetrics):
+        return pool.metrics()
+    return {"pool": type(pool).__name__, "status": pool.status()}
+
+
+engine = create_engine(DATABASE_URL, **_engine_options(DATABASE_URL))
+_instrument(engine)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 Base = declarative_base()
+
+
+# Optional read replica. GET routes read from it, except for a user who wrote
+# within READ_AFTER_WRITE_SECONDS: replication lags, so that user keeps
+# reading from the primary and always sees their own writes. Without
+# READ_DATABASE_URL everything uses the primary.
+READ_DATABASE_URL = os.getenv("READ_DATABASE_URL", "")
+READ_AFTER_WRITE_SECONDS = float(os.getenv("READ_AFTER_WRITE_SECONDS", "5"))
+
+if READ_DATABASE_URL:
+    read_engine = create_engine(READ_DATABASE_URL, **_engine_options(READ_DATABASE_URL))
+    _instrument(read_engine)
+    ReadSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=read_engine)
+else:
+    read_engine = engine
+    ReadSessionLocal = SessionLocal
+
+# user id -> time.monotonic() of their last committed write. Per process: with
+# several workers a user may land on one that hasn't seen their write, which is
+# why READ_AFTER_WRITE_SECONDS should cover the usual replica lag only.
+_last_write: dict[int, float] = {}
+_last_write_lock = threading.Lock()
+_LAST_WRITE_MAX = 100_000
+_write_hooks: list = []
+
+
+def note_write(session: Session, user_id: int) -> None:
+    """Mark `user_id` as written by `session`; takes effect when the session commits.
+
+    ORM flushes are tracked automatically; Core statements (bulk inserts, the
+    rollup upsert) must call this themselves."""
+    session.info.setdefault("written_users", set()).add(user_id)
+
+
+def on_user_write(hook) -> None:
+    """Call `hook(user_ids)` after every commit that wrote data of those users."""
+    _write_hooks.append(hook)
+
+
+@event.listens_for(Session, "after_flush")
+def _track_flush(session, flush_context):
+    for obj in chain(session.new, session.dirty, session.deleted):
+        user_id = getattr(obj, "user_id", None)
+        if user_id is not None:
+            note_write(session, user_id)
+
+
+@event.listens_for(Session, "after_commit")
+def _record_writes(session):
+    users = session.info.pop("written_users", None)
+    if not users:
+        return
+    now = time.monotonic()
+    with _last_write_lock:
+        if len(_last_write) >= _LAST_WRITE_MAX:
+            cutoff = now - READ_AFTER_WRITE_SECONDS
+            for user_id in [u for u, t in _last_write.items() if t < cutoff]:
+                del _last_write[user_id]
+        for user_id in users:
+            _last_write[user_id] = now
+    for hook in _write_hooks:
+        hook(users)
+
+
+@event.listens_for(Session, "after_rollback")
+def _forget_writes(session):
+    session.info.pop("written_users", None)
+
+
+def wrote_recently(user_id: int) -> bool:
+    written = _last_write.get(user_id)
+    return written is not None and time.monotonic() - written < READ_AFTER_WRITE_SECONDS
+
+
+def read_session(user_id: int) -> Session:
+    """A session for reading `user_id`'s data: the replica, or the primary right after they wrote."""
+    if read_engine is engine or wrote_recently(user_id):
+        return SessionLocal()
+    return ReadSessionLocal()
+
+
+# Async engines for the read-heavy routers. Same databases, async driver:
+# aiomysql for MySQL, aiosqlite for local SQLite. Created on first use so
+# the sync-only tools (migrations, rollup CLI) don't need the async driver.
+_ASYNC_DRIVERS = {"mysql+pymysql": "mysql+aiomysql", "mysql": "mysql+aiomysql",
+                  "sqlite": "sqlite+aiosqlite", "postgresql": "postgresql+asyncpg"}
+
+
+def _async_url(url: str) -> str:
+    scheme, sep, rest = url.partition("://")
+    return _ASYNC_DRIVERS.get(scheme, scheme) + sep + rest
+
+
+ASYNC_DATABASE_URL = os.getenv("ASYNC_DATABASE_URL") or _async_url(DATABASE_URL)
+ASYNC_READ_DATABASE_URL = os.getenv("ASYNC_READ_DATABASE_URL") or (_async_url(READ_DATABASE_URL) if READ_DATABASE_URL else "")
+_async_sessionmakers: dict[str, async_sessionmaker] = {}
+
+
+def _async_sessionmaker(url: str) -> async_sessionmaker:
+    if url not in _async_sessionmakers:
+        async_engine = create_async_engine(url, **_engine_options(url, InstrumentedAsyncQueuePool))
+        _instrument(async_engine.sync_engine)
+        # expire_on_commit=False: objects stay readable after commit without an implicit (sync) reload
+        _async_sessionmakers[url] = async_sessionmaker(async_engine, expire_on_commit=False)
+    return _async_sessionmakers[url]
+
+
+def get_async_engine(read: bool = False) -> AsyncEngine:
+    url = ASYNC_READ_DATABASE_URL if read and ASYNC_READ_DATABASE_URL else ASYNC_DATABASE_URL
+    return _async_sessionmaker(url).kw["bind"]
+
+
+def AsyncSessionLocal() -> AsyncSession:
+    return _async_sessionmaker(ASYNC_DATABASE_URL)()
+
+
+def async_read_session(user_id: int) -> AsyncSession:
+    """read_session() for the async routes."""
+    if not ASYNC_READ_DATABASE_URL or wrote_recently(user_id):
+        return AsyncSessionLocal()
+    return _async_sessionmaker(ASYNC_READ_DATABASE_URL)()
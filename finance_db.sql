@@ -46,6 +46,21 @@ INSERT INTO `categories` (`id`, `user_id`, `name`, `type`, `created_at`) VALUES
 
 -- --------------------------------------------------------
 
+--
+-- Struktur dari tabel `daily_totals`
+--
+
+CREATE TABLE `daily_totals` (
+  `user_id` int(11) NOT NULL,
+  `date` date NOT NULL,
+  `category_id` int(11) NOT NULL DEFAULT 0,
+  `type` enum('income','expense') NOT NULL,
+  `total` double NOT NULL DEFAULT 0,
+  `count` int(11) NOT NULL DEFAULT 0
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_general_ci;
+
+-- --------------------------------------------------------
+
 --
 -- Struktur dari tabel `expenses`
 --
@@ -96,6 +111,28 @@ INSERT INTO `incomes` (`id`, `user_id`, `category_id`, `title`, `amount`, `descr
 
 -- --------------------------------------------------------
 
+--
+-- Struktur dari tabel `schema_migrations`
+--
+
+CREATE TABLE `schema_migrations` (
+  `version` int(11) NOT NULL,
+  `name` varchar(100) NOT NULL,
+  `applied_at` datetime NOT NULL
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_general_ci;
+
+--
+-- Dumping data untuk tabel `schema_migrations`
+--
+-- Versi 3 (backfill daily_totals) sengaja belum tercatat: dijalankan saat aplikasi pertama kali start.
+--
+
+INSERT INTO `schema_migrations` (`version`, `name`, `applied_at`) VALUES
+(1, 'baseline schema', '2025-10-06 19:17:53'),
+(2, 'composite user/date indexes on incomes and expenses', '2025-10-06 19:17:53');
+
+-- --------------------------------------------------------
+
 --
 -- Struktur dari tabel `transactions`
 --
@@ -143,6 +180,12 @@ ALTER TABLE `categories`
   ADD KEY `fk_categories_user` (`user_id`),
   ADD KEY `idx_category_type` (`type`);
 
+--
+-- Indeks untuk tabel `daily_totals`
+--
+ALTER TABLE `daily_totals`
+  ADD PRIMARY KEY (`user_id`,`date`,`category_id`,`type`);
+
 --
 -- Indeks untuk tabel `expenses`
 --
@@ -150,7 +193,9 @@ ALTER TABLE `expenses`
   ADD PRIMARY KEY (`id`),
   ADD KEY `fk_expenses_user` (`user_id`),
   ADD KEY `fk_expenses_category` (`category_id`),
-  ADD KEY `idx_expense_date` (`date`);
+  ADD KEY `idx_expense_date` (`date`),
+  ADD KEY `idx_expense_user_date` (`user_id`,`date`),
+  ADD KEY `idx_expense_user_category_date` (`user_id`,`category_id`,`date`);
 
 --
 -- Indeks untuk tabel `incomes`
@@ -159,7 +204,15 @@ ALTER TABLE `incomes`
   ADD PRIMARY KEY (`id`),
   ADD KEY `fk_incomes_user` (`user_id`),
   ADD KEY `fk_incomes_category` (`category_id`),
-  ADD KEY `idx_income_date` (`date`);
+  ADD KEY `idx_income_date` (`date`),
+  ADD KEY `idx_income_user_date` (`user_id`,`date`),
+  ADD KEY `idx_income_user_category_date` (`user_id`,`category_id`,`date`);
+
+--
+-- Indeks untuk tabel `schema_migrations`
+--
+ALTER TABLE `schema_migrations`
+  ADD PRIMARY KEY (`version`);
 
 --
 -- Indeks untuk tabel `transactions`
@@ -220,6 +273,12 @@ ALTER TABLE `users`
 ALTER TABLE `categories`
   ADD CONSTRAINT `fk_categories_user` FOREIGN KEY (`user_id`) REFERENCES `users` (`id`) ON DELETE CASCADE;
 
+--
+-- Ketidakleluasaan untuk tabel `daily_totals`
+--
+ALTER TABLE `daily_totals`
+  ADD CONSTRAINT `fk_daily_totals_user` FOREIGN KEY (`user_id`) REFERENCES `users` (`id`) ON DELETE CASCADE;
+
 --
 -- Ketidakleluasaan untuk tabel `expenses`
 --
@@ -1,4 +1,5 @@
 # main.py
+import os
 from fastapi import FastAPI
 from dotenv import load_dotenv
 load_dotenv()
@@ -8,14 +9,15 @@ from routers import ai_router
 
 from database import engine
 import models
-from routers import auth_router, category_router, incomes_router, expenses_router, summary_router, transactions_router
+from routers import auth_router, category_router, incomes_router, expenses_router, summary_router, transactions_router, import_router, internal_router, metrics_router
+from utils import metrics
 
 models.Base = models  # not used but keep
 models.Base = None
 models  
 
-from database import Base
-Base.metadata.create_all(bind=engine)
+import migrations
+migrations.migrate(engine)
 
 app = FastAPI(title="Finance API (advanced starter)",  redirect_slashes=False)
 
@@ -26,4 +28,23 @@ app.include_router(expenses_router.router)
 app.include_router(summary_router.router)
 app.include_router(ai_router.router)
 app.include_router(transactions_router.router)
-
+app.include_router(import_router.router)
+app.include_router(internal_router.router)
+app.include_router(metrics_router.router)
+metrics.install(app)
+
+@app.on_event("startup")
+def preload_ai_models():
+    # load the GGUF model pool up front instead of on the first /ai request
+    if os.getenv("AI_PRELOAD_MODEL", "").lower() in ("1", "true", "yes"):
+        from utils.ai_parser import preload_models
+        preload_models()
+
+@app.on_event("shutdown")
+def stop_ai_jobs():
+    ai_router.job_queue.shutdown()
+
+@app.on_event("shutdown")
+def stop_password_pool():
+    from utils.passwords import password_pool
+    password_pool.shutdown()
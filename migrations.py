@@ -0,0 +1,93 @@
+# migrations.py
+"""Versioned schema migrations.
+
+Applied versions are recorded in `schema_migrations`; `migrate()` runs every
+missing one in order and is safe to call on each start-up. Add new steps to
+the end of MIGRATIONS, never edit or reorder applied ones.
+
+    python migrations.py            # apply pending migrations
+    python migrations.py --status   # list applied / pending versions
+"""
+import argparse
+from datetime import datetime
+
+from sqlalchemy import Column, DateTime, Integer, MetaData, String, Table, inspect, select
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.orm import Session
+
+from database import Base, engine as default_engine
+import models
+
+_meta = MetaData()
+schema_migrations = Table(
+    "schema_migrations", _meta,
+    Column("version", Integer, primary_key=True, autoincrement=False),
+    Column("name", String(100), nullable=False),
+    Column("applied_at", DateTime, nullable=False),
+)
+
+
+def _baseline(conn: Connection) -> None:
+    # creates whatever tables are missing (all of them on a fresh database)
+    Base.metadata.create_all(bind=conn)
+
+
+def _composite_indexes(conn: Connection) -> None:
+    for model in (models.Income, models.Expense):
+        table = model.__table__
+        existing = {ix["name"] for ix in inspect(conn).get_indexes(table.name)}
+        for index in table.indexes:
+            if index.name.startswith("idx_") and index.name not in existing:
+                index.create(bind=conn)
+
+
+def _backfill_daily_totals(conn: Connection) -> None:
+    from utils import rollup
+    with Session(bind=conn) as db:
+        rollup.rebuild(db)
+
+
+MIGRATIONS = [
+    (1, "baseline schema", _baseline),
+    (2, "composite user/date indexes on incomes and expenses", _composite_indexes),
+    (3, "backfill daily_totals", _backfill_daily_totals),
+]
+
+
+def applied_versions(engine: Engine) -> set:
+    _meta.create_all(bind=engine)
+    with engine.connect() as conn:
+        return set(conn.execute(select(schema_migrations.c.version)).scalars())
+
+
+def migrate(engine: Engine = default_engine) -> list:
+    """Apply pending migrations in order; returns the versions applied."""
+    done = applied_versions(engine)
+    applied = []
+    for version, name, step in MIGRATIONS:
+        if version in done:
+            continue
+        # MySQL commits DDL implicitly, so a step must be safe to re-run if it fails halfway
+        with engine.begin() as conn:
+            step(conn)
+            conn.execute(schema_migrations.insert().values(version=version, name=name, applied_at=datetime.utcnow()))
+        applied.append(version)
+    return applied
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Apply database schema migrations.")
+    parser.add_argument("--status", action="store_true", help="show applied and pending versions")
+    args = parser.parse_args()
+
+    if args.status:
+        done = applied_versions(default_engine)
+        for version, name, _ in MIGRATIONS:
+            print(f"{version:>4}  {'applied' if version in done else 'pending'}  {name}")
+        return
+    applied = migrate()
+    print(f"applied migrations: {applied}" if applied else "database is up to date")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,5 @@
 # models.py
-from sqlalchemy import Column, Integer, String, DateTime, Float, ForeignKey, Enum, Date
+from sqlalchemy import Column, Integer, String, DateTime, Float, ForeignKey, Enum, Date, Index
 from sqlalchemy.orm import relationship
 from datetime import datetime
 import enum
@@ -47,6 +47,12 @@ class Income(Base):
     user = relationship("User", back_populates="incomes")
     category = relationship("Category", back_populates="incomes")
 
+    # hot queries filter by user first, then a date range (optionally per category)
+    __table_args__ = (
+        Index("idx_income_user_date", "user_id", "date"),
+        Index("idx_income_user_category_date", "user_id", "category_id", "date"),
+    )
+
 class Expense(Base):
     __tablename__ = "expenses"
     id = Column(Integer, primary_key=True, index=True)
@@ -61,4 +67,20 @@ class Expense(Base):
     user = relationship("User", back_populates="expenses")
     category = relationship("Category", back_populates="expenses")
 
+    # hot queries filter by user first, then a date range (optionally per category)
+    __table_args__ = (
+        Index("idx_expense_user_date", "user_id", "date"),
+        Index("idx_expense_user_category_date", "user_id", "category_id", "date"),
+    )
 
+class DailyTotal(Base):
+    """Per-day income/expense totals for each user and category, kept in step with
+    every Income/Expense write (see utils/rollup.py) so summaries never scan raw rows."""
+    __tablename__ = "daily_totals"
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    date = Column(Date, primary_key=True)
+    # 0 = no category (NULL can't be part of the primary key)
+    category_id = Column(Integer, primary_key=True, default=0)
+    type = Column(Enum(CategoryType), primary_key=True)
+    total = Column(Float, nullable=False, default=0)
+    count = Column(Integer, nullable=False, default=0)
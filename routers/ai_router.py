@@ -1,33 +1,22 @@
-from fastapi import APIRouter, Depends
+import asyncio
+import os
+import time
+from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.orm import Session
-from utils.ai_parser import parse_expense_text
-from auth import get_current_user, get_db
+from utils.ai_parser import parse_expense_text, parse_expense_texts, MODEL_THREADS
+from utils.job_queue import JobQueue, QueueFull, default_workers
+from utils import rollup
+from auth import get_current_principal, get_db, Principal
+from database import SessionLocal
 from datetime import datetime
-import models
+import models, schemas
 
 router = APIRouter(prefix="/ai")
 
+INCOME_KEYWORDS = {"income", "incom", "gaji", "penerimaan", "salary", "pendapatan", "terima"}
 
 
-@router.post("/parse-expense")
-def parse_expense(
-    text: str,
-    override_title: str | None = None,
-    override_amount: float | None = None,
-    override_date: str | None = None,
-    override_category: str | None = None,
-    override_type: str | None = None,
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_user),
-):
-    """Parse text and automatically save to income or expense table based on detected type.
-
-    Use `override_type` to force 'income' or 'expense'."""
-    data = parse_expense_text(text)
-    if "error" in data:
-        return {"success": False, "detail": data["error"]}
-
-    # apply overrides
+def _apply_overrides(data: dict, override_title, override_amount, override_date, override_category) -> dict:
     if override_title:
         data["title"] = override_title
     if override_amount is not None:
@@ -43,72 +32,154 @@ def parse_expense(
             pass
     if override_category:
         data["category"] = override_category
+    return data
 
-    # determine record type
+
+def _record_type(data: dict, override_type: str | None = None) -> str:
     record_type = "expense"
     if data.get("type") in ("income", "expense"):
         record_type = data.get("type")
     if override_type in ("income", "expense"):
         record_type = override_type
-    income_keywords = {"income", "incom", "gaji", "penerimaan", "salary", "pendapatan", "terima"}
-    if data.get("category") and str(data.get("category")).lower() in income_keywords:
+    if data.get("category") and str(data.get("category")).lower() in INCOME_KEYWORDS:
         record_type = "income"
+    return record_type
+
 
+def _default_category(db: Session, user_id: int, record_type: str):
     # find a default category for this user and type
     try:
         cat_type = models.CategoryType.income if record_type == "income" else models.CategoryType.expense
-        category = db.query(models.Category).filter(models.Category.user_id == current_user.id, models.Category.type == cat_type).first()
+        return db.query(models.Category).filter(models.Category.user_id == user_id, models.Category.type == cat_type).first()
     except Exception:
-        category = None
+        return None
+
+
+def _build_record(user_id: int, data: dict, record_type: str, category):
+    model = models.Income if record_type == "income" else models.Expense
+    return model(
+        user_id=user_id,
+        category_id=category.id if category else None,
+        title=data["title"],
+        amount=data["amount"],
+        date=datetime.strptime(data["date"], "%Y-%m-%d").date(),
+        description=""
+    )
+
+
+def _record_data(record, category, record_type: str) -> dict:
+    return {
+        "id": record.id,
+        "title": record.title,
+        "amount": record.amount,
+        "date": str(record.date),
+        "category": category.name if category else None,
+        "type": record_type
+    }
+
+
+def _save_parsed(db: Session, user_id: int, data: dict, override_title=None, override_amount=None,
+                 override_date=None, override_category=None, override_type=None) -> dict:
+    if "error" in data:
+        return {"success": False, "detail": data["error"]}
+
+    _apply_overrides(data, override_title, override_amount, override_date, override_category)
+    record_type = _record_type(data, override_type)
+    category = _default_category(db, user_id, record_type)
 
     try:
-        if record_type == "income":
-            income = models.Income(
-                user_id=current_user.id,
-                category_id=category.id if category else None,
-                title=data["title"],
-                amount=data["amount"],
-                date=datetime.strptime(data["date"], "%Y-%m-%d").date(),
-                description=""
-            )
-            db.add(income)
-            db.commit()
-            db.refresh(income)
-
-            return {"success": True, "saved": True, "data": {
-                "id": income.id,
-                "title": income.title,
-                "amount": income.amount,
-                "date": str(income.date),
-                "category": category.name if category else None,
-                "type": "income"
-            }}
-        else:
-            expense = models.Expense(
-                user_id=current_user.id,
-                category_id=category.id if category else None,
-                title=data["title"],
-                amount=data["amount"],
-                date=datetime.strptime(data["date"], "%Y-%m-%d").date(),
-                description=""
-            )
-            db.add(expense)
-            db.commit()
-            db.refresh(expense)
-
-            return {"success": True, "saved": True, "data": {
-                "id": expense.id,
-                "title": expense.title,
-                "amount": expense.amount,
-                "date": str(expense.date),
-                "category": category.name if category else None,
-                "type": "expense"
-            }}
+        record = _build_record(user_id, data, record_type, category)
+        db.add(record)
+        rollup.add(db, record, record_type)
+        db.commit()
+        db.refresh(record)
+
+        return {"success": True, "saved": True, "source": data.get("source"), "data": _record_data(record, category, record_type)}
     except Exception as e:
         db.rollback()
         return {"success": False, "detail": f"Gagal menyimpan record: {str(e)}"}
 
 
+@router.post("/parse-expense")
+def parse_expense(
+    text: str,
+    override_title: str | None = None,
+    override_amount: float | None = None,
+    override_date: str | None = None,
+    override_category: str | None = None,
+    override_type: str | None = None,
+    db: Session = Depends(get_db),
+    current_user: Principal = Depends(get_current_principal),
+):
+    """Parse text and automatically save to income or expense table based on detected type.
+
+    Use `override_type` to force 'income' or 'expense'."""
+    data = parse_expense_text(text)
+    return _save_parsed(db, current_user.id, data, override_title, override_amount,
+                        override_date, override_category, override_type)
+
+
+@router.post("/parse-expense/batch")
+def parse_expense_batch(
+    payload: schemas.ParseBatchRequest,
+    override_type: str | None = None,
+    db: Session = Depends(get_db),
+    current_user: Principal = Depends(get_current_principal),
+):
+    """Parse many texts in one request and save every successful result in a single transaction.
+
+    `results` has one entry per input text, in order, each with its own `success` flag."""
+    parsed = parse_expense_texts(payload.texts)
+
+    results = []
+    saved = []
+    categories = {}
+    for index, data in enumerate(parsed):
+        if "error" in data:
+            results.append({"index": index, "success": False, "detail": data["error"]})
+            continue
+        record_type = _record_type(data, override_type)
+        if record_type not in categories:
+            categories[record_type] = _default_category(db, current_user.id, record_type)
+        category = categories[record_type]
+        try:
+            record = _build_record(current_user.id, data, record_type, category)
+        except Exception as e:
+            results.append({"index": index, "success": False, "detail": f"Gagal menyimpan record: {str(e)}"})
+            continue
+        db.add(record)
+        saved.append((index, data, record, category, record_type))
+        results.append(None)
+
+    if saved:
+        try:
+            db.flush()
+            for kind in ("income", "expense"):
+                rollup.apply_many(db, kind, [record for _, _, record, _, record_type in saved if record_type == kind])
+            ids = {model: [record.id for _, _, record, _, _ in saved if isinstance(record, model)]
+                   for model in (models.Income, models.Expense)}
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            for index, *_ in saved:
+                results[index] = {"index": index, "success": False, "detail": f"Gagal menyimpan record: {str(e)}"}
+        else:
+            # read the records back as stored, like db.refresh() in _save_parsed, in one query per table
+            for model, model_ids in ids.items():
+                if model_ids:
+                    db.query(model).filter(model.id.in_(model_ids)).populate_existing().all()
+            for index, data, record, category, record_type in saved:
+                results[index] = {"index": index, "success": True, "saved": True, "source": data.get("source"),
+                                  "data": _record_data(record, category, record_type)}
+
+    return {
+        "success": True,
+        "saved": sum(1 for r in results if r["success"]),
+        "failed": sum(1 for r in results if not r["success"]),
+        "results": results,
+    }
+
+
 @router.post("/parse-expense/preview")
 def parse_expense_preview(
     text: str,
@@ -122,21 +193,50 @@ def parse_expense_preview(
     if "error" in data:
         return {"success": False, "detail": data["error"]}
 
-    # apply overrides
-    if override_title:
-        data["title"] = override_title
-    if override_amount is not None:
-        try:
-            data["amount"] = int(override_amount)
-        except Exception:
-            pass
-    if override_date:
-        try:
-            datetime.strptime(override_date, "%Y-%m-%d")
-            data["date"] = override_date
-        except Exception:
-            pass
-    if override_category:
-        data["category"] = override_category
+    _apply_overrides(data, override_title, override_amount, override_date, override_category)
 
     return {"success": True, "parsed": data}
+
+
+def _save_job_result(job, data: dict) -> dict:
+    # runs in the API process once a worker has parsed the text
+    db = SessionLocal()
+    try:
+        options = job.payload
+        return _save_parsed(db, job.user_id, data, options.get("override_title"), options.get("override_amount"),
+                            options.get("override_date"), options.get("override_category"), options.get("override_type"))
+    finally:
+        db.close()
+
+
+job_queue = JobQueue(
+    parse_expense_text,
+    _save_job_result,
+    workers=int(os.getenv("AI_JOB_WORKERS", "0")) or default_workers(MODEL_THREADS),
+    max_depth=int(os.getenv("AI_JOB_MAX_QUEUE", "200")),
+    max_per_user=int(os.getenv("AI_JOB_MAX_PER_USER", "20")),
+    result_ttl=float(os.getenv("AI_JOB_RESULT_TTL", "900")),
+)
+
+
+@router.post("/jobs", status_code=202)
+def create_parse_job(payload: schemas.ParseJobCreate, current_user: Principal = Depends(get_current_principal)):
+    """Queue a text for parsing in the background worker pool; poll `GET /ai/jobs/{job_id}` for the result."""
+    try:
+        job = job_queue.submit(current_user.id, payload.model_dump())
+    except QueueFull as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "5"})
+    return {"job_id": job.id, "status": job.status}
+
+
+@router.get("/jobs/{job_id}")
+async def get_parse_job(job_id: str, wait: float = Query(0, ge=0, le=30, description="Seconds to wait for the job to finish (long-poll)"),
+                        current_user: Principal = Depends(get_current_principal)):
+    """Job status; `result` holds the same body `/ai/parse-expense` returns once the job is done."""
+    job = job_queue.get(job_id)
+    if job is None or job.user_id != current_user.id:
+        raise HTTPException(status_code=404, detail="Job not found")
+    deadline = time.monotonic() + wait
+    while not job.done.is_set() and time.monotonic() < deadline:
+        await asyncio.sleep(0.1)
+    return job.to_dict()
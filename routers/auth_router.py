@@ -1,45 +1,64 @@
 # routers/auth_router.py
 from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
 import models, schemas, auth
-from auth import get_db, hash_password, verify_password, create_access_token
+from auth import get_db, create_access_token, invalidate_user
+from utils.passwords import password_pool, PoolBusy
 from datetime import timedelta
 
 router = APIRouter(prefix="/auth", tags=["auth"])
 
+# categories every new user starts with
+DEFAULT_CATEGORIES = [
+    # Income categories
+    {"name": "Gaji", "type": "income"},
+    {"name": "Bonus", "type": "income"},
+    {"name": "Bisnis", "type": "income"},
+    {"name": "Side Job / Freelance", "type": "income"},
+    {"name": "Investasi", "type": "income"},
+    {"name": "Lainnya", "type": "income"},
+    # Expense categories
+    {"name": "Makanan", "type": "expense"},
+    {"name": "Transport", "type": "expense"},
+    {"name": "Belanja Bulanan", "type": "expense"},
+    {"name": "Tagihan (Listrik, Air, Internet)", "type": "expense"},
+    {"name": "Cicilan", "type": "expense"},
+    {"name": "Lainnya", "type": "expense"},
+]
+
+def _busy(e: PoolBusy) -> HTTPException:
+    return HTTPException(status_code=503, detail=str(e), headers={"Retry-After": str(e.retry_after)})
+
+# register/login are async so bcrypt (on the password pool) never holds a request
+# thread; their few DB calls run on the threadpool instead.
+
 @router.post("/register", response_model=schemas.UserResponse)
-def register(payload: schemas.UserCreate, db: Session = Depends(get_db)):
-    existing = db.query(models.User).filter(models.User.email == payload.email).first()
+async def register(payload: schemas.UserCreate, db: Session = Depends(get_db)):
+    existing = await run_in_threadpool(lambda: db.query(models.User.id).filter(models.User.email == payload.email).first())
     if existing:
         raise HTTPException(status_code=400, detail="Email already registered")
+    try:
+        hashed = await password_pool.hash_async(payload.password)
+    except PoolBusy as e:
+        raise _busy(e)
+    return await run_in_threadpool(_create_user, db, payload, hashed)
+
+def _create_user(db: Session, payload: schemas.UserCreate, hashed: str):
     user = models.User(
         name=payload.name,
         email=payload.email,
-        password=hash_password(payload.password),
+        password=hashed,
     )
     db.add(user)
     db.commit()
     db.refresh(user)
+    # serialised here, in the worker thread: after the next commit `user` is expired
+    # and touching it from the event loop would run a blocking SELECT there
+    data = schemas.UserResponse.model_validate(user)
     
     # Create default categories for new user
-    default_categories = [
-        # Income categories
-        {"name": "Gaji", "type": "income"},
-        {"name": "Bonus", "type": "income"},
-        {"name": "Bisnis", "type": "income"},
-        {"name": "Side Job / Freelance", "type": "income"},
-        {"name": "Investasi", "type": "income"},
-        {"name": "Lainnya", "type": "income"},
-        # Expense categories
-        {"name": "Makanan", "type": "expense"},
-        {"name": "Transport", "type": "expense"},
-        {"name": "Belanja Bulanan", "type": "expense"},
-        {"name": "Tagihan (Listrik, Air, Internet)", "type": "expense"},
-        {"name": "Cicilan", "type": "expense"},
-        {"name": "Lainnya", "type": "expense"},
-    ]
-    
-    for cat_data in default_categories:
+    for cat_data in DEFAULT_CATEGORIES:
         category = models.Category(
             user_id=user.id,
             name=cat_data["name"],
@@ -49,17 +68,31 @@ def register(payload: schemas.UserCreate, db: Session = Depends(get_db)):
     
     db.commit()
     
-    return user
+    return data
+
+def _rehash(db: Session, user: models.User, new_hash: str) -> None:
+    # stored hash used another bcrypt cost than BCRYPT_ROUNDS: upgrade it transparently
+    user.password = new_hash
+    db.commit()
+    invalidate_user(user.id)
 
 @router.post("/login", response_model=schemas.Token)
-def login(form_data: dict, db: Session = Depends(get_db)):
+async def login(form_data: dict, db: Session = Depends(get_db)):
     # form_data may come as JSON { "email": "...", "password": "..." }
     email = form_data.get("email")
     password = form_data.get("password")
     if not email or not password:
         raise HTTPException(status_code=400, detail="Email and password required")
-    user = db.query(models.User).filter(models.User.email == email).first()
-    if not user or not verify_password(password, user.password):
+    user = await run_in_threadpool(lambda: db.query(models.User).filter(models.User.email == email).first())
+    if not user:
+        raise HTTPException(status_code=401, detail="Invalid credentials")
+    try:
+        valid, new_hash = await password_pool.verify_and_update_async(password, user.password)
+    except PoolBusy as e:
+        raise _busy(e)
+    if not valid:
         raise HTTPException(status_code=401, detail="Invalid credentials")
+    if new_hash:
+        await run_in_threadpool(_rehash, db, user, new_hash)
     access_token = create_access_token({"sub": str(user.id)}, expires_delta=timedelta(days=7))
     return {"access_token": access_token, "token_type": "bearer"}
@@ -0,0 +1,210 @@
+# routers/import_router.py
+import csv
+import hashlib
+import io
+import math
+import os
+from datetime import datetime
+from functools import lru_cache
+from typing import Literal
+from fastapi import APIRouter, Depends, File, HTTPException, Query, UploadFile
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+from auth import get_db, get_current_principal, Principal
+from utils import rollup
+from utils.rule_parser import _extract_category_from_text
+import models
+
+router = APIRouter(prefix="/import", tags=["import"])
+
+CHUNK_SIZE = int(os.getenv("IMPORT_CHUNK_SIZE", "2000"))
+MAX_REPORTED_ERRORS = 50
+
+INCOME_VALUES = {"income", "pemasukan", "masuk", "kredit", "credit", "cr", "in"}
+EXPENSE_VALUES = {"expense", "pengeluaran", "keluar", "debit", "db", "dr", "out"}
+
+
+def _parse_amount(raw: str) -> float:
+    """Amounts as banks write them: "50.000", "1,234.56", "-1.234.567,89", "Rp 50.000", "(50.000)"."""
+    s = raw.strip().lower().replace("rp", "").replace(" ", "")
+    negative = s.startswith("-") or (s.startswith("(") and s.endswith(")"))
+    s = s.strip("-+()")
+    if "," in s and "." in s:
+        # the later separator is the decimal one
+        s = s.replace(".", "").replace(",", ".") if s.rfind(",") > s.rfind(".") else s.replace(",", "")
+    elif "," in s:
+        parts = s.split(",")
+        s = s.replace(",", "") if all(len(p) == 3 for p in parts[1:]) else s.replace(",", ".")
+    elif "." in s:
+        parts = s.split(".")
+        if len(parts) > 2 or len(parts[1]) == 3:
+            s = s.replace(".", "")
+    value = float(s)
+    if not math.isfinite(value):
+        # float() also reads "nan", "inf" and "infinity"
+        raise ValueError(f"nominal tidak valid: {raw.strip()}")
+    return -value if negative else value
+
+
+def _row_hash(day, amount: float, title: str) -> bytes:
+    key = f"{day.isoformat()}|{float(amount):.2f}|{title.strip().lower()}"
+    return hashlib.blake2b(key.encode(), digest_size=12).digest()
+
+
+@lru_cache(maxsize=8192)
+def _parse_date(raw: str, date_format: str):
+    # statements repeat the same few hundred dates; strptime is the slowest step per row
+    return datetime.strptime(raw, date_format).date()
+
+
+@lru_cache(maxsize=8192)
+def _category_key(text: str) -> str | None:
+    return _extract_category_from_text(text)
+
+
+def _category_lookup(db: Session, user_id: int):
+    """Map (type, rule-parser category or category name) -> the user's category id."""
+    categories = db.query(models.Category.id, models.Category.name, models.Category.type)\
+        .filter(models.Category.user_id == user_id).all()
+    by_name = {}
+    for id_, name, type_ in categories:
+        by_name.setdefault((type_.value, name.strip().lower()), id_)
+    cache = {}
+
+    def lookup(record_type: str, key: str | None) -> int | None:
+        if not key:
+            return None
+        key = key.strip().lower()
+        if (record_type, key) not in cache:
+            found = by_name.get((record_type, key))
+            if found is None:
+                # rule-parser keys are short stems ("makan" -> "Makanan")
+                found = next((id_ for (t, name), id_ in by_name.items() if t == record_type and (key in name or name in key)), None)
+            cache[(record_type, key)] = found
+        return cache[(record_type, key)]
+    return lookup
+
+
+def _load_existing(db: Session, user_id: int, days: set, seen: set) -> None:
+    """Add the hashes of the user's stored rows on `days` to `seen`."""
+    days = list(days)
+    for model in (models.Income, models.Expense):
+        for start in range(0, len(days), 500):
+            rows = db.execute(select(model.date, model.amount, model.title)
+                              .where(model.user_id == user_id, model.date.in_(days[start:start + 500])))
+            seen.update(_row_hash(day, amount, title) for day, amount, title in rows)
+
+
+def _flush_chunk(db: Session, user_id: int, chunk: list, loaded_days: set, seen: set, report: dict) -> None:
+    new_days = {row["date"] for row in chunk} - loaded_days
+    if new_days:
+        _load_existing(db, user_id, new_days, seen)
+        loaded_days |= new_days
+
+    by_type = {"income": [], "expense": []}
+    # only rows that end up stored count as seen: a failed chunk must not mark later copies as duplicates
+    added = set()
+    for row in chunk:
+        digest = _row_hash(row["date"], row["amount"], row["title"])
+        if digest in seen or digest in added:
+            report["duplicates"] += 1
+            continue
+        added.add(digest)
+        by_type[row.pop("type")].append(row)
+
+    try:
+        for record_type, rows in by_type.items():
+            if rows:
+                model = models.Income if record_type == "income" else models.Expense
+                # Core executemany: no ORM identity map or per-row bookkeeping
+                db.execute(model.__table__.insert(), rows)
+                rollup.apply_many(db, record_type, rows)
+        db.commit()
+    except Exception as e:
+        db.rollback()
+        report["failed"] += len(by_type["income"]) + len(by_type["expense"])
+        if len(report["errors"]) < MAX_REPORTED_ERRORS:
+            report["errors"].append({"line": None, "detail": f"Gagal menyimpan batch: {str(e)}"})
+        return
+    seen |= added
+    report["incomes"] += len(by_type["income"])
+    report["expenses"] += len(by_type["expense"])
+    report["imported"] += len(by_type["income"]) + len(by_type["expense"])
+    report["chunks"] += 1
+
+
+@router.post("/csv")
+def import_csv(
+    file: UploadFile = File(..., description="CSV file with a header row"),
+    date_column: str = Query("date"),
+    amount_column: str = Query("amount"),
+    title_column: str = Query("title"),
+    description_column: str | None = Query(None),
+    type_column: str | None = Query(None, description="income/expense, kredit/debit, cr/dr ..."),
+    category_column: str | None = Query(None, description="Category name; otherwise guessed from the title"),
+    date_format: str = Query("%Y-%m-%d", description="strptime format of the date column"),
+    delimiter: str = Query(",", min_length=1, max_length=1),
+    default_type: Literal["income", "expense"] = Query("expense", description="Type for positive amounts without a type column"),
+    db: Session = Depends(get_db),
+    current_user: Principal = Depends(get_current_principal),
+):
+    """Import a bank statement / spreadsheet export as incomes and expenses.
+
+    The upload is read row by row and inserted in batches of IMPORT_CHUNK_SIZE,
+    one transaction per batch. Without a type column a negative amount is an
+    expense. Rows already stored (same date, amount and title) or repeated in
+    the file are skipped."""
+    reader = csv.DictReader(io.TextIOWrapper(file.file, encoding="utf-8-sig", newline=""), delimiter=delimiter)
+    required = [date_column, amount_column, title_column]
+    missing = [c for c in required + [description_column, type_column, category_column]
+               if c and c not in (reader.fieldnames or [])]
+    if missing:
+        raise HTTPException(status_code=400, detail=f"Kolom tidak ditemukan: {', '.join(missing)}")
+
+    category_id = _category_lookup(db, current_user.id)
+    report = {"rows": 0, "imported": 0, "incomes": 0, "expenses": 0, "duplicates": 0, "failed": 0, "chunks": 0, "errors": []}
+    seen: set = set()
+    loaded_days: set = set()
+    chunk = []
+    now = datetime.utcnow()
+
+    for line, raw in enumerate(reader, start=2):
+        report["rows"] += 1
+        try:
+            title = (raw[title_column] or "").strip()
+            if not title:
+                raise ValueError("judul kosong")
+            day = _parse_date((raw[date_column] or "").strip(), date_format)
+            amount = _parse_amount(raw[amount_column] or "")
+
+            record_type = default_type
+            if type_column:
+                value = (raw[type_column] or "").strip().lower()
+                record_type = "income" if value in INCOME_VALUES else "expense" if value in EXPENSE_VALUES else record_type
+            elif amount < 0:
+                record_type = "expense"
+            description = (raw[description_column] or "").strip() if description_column else ""
+            category_name = (raw[category_column] or "").strip() if category_column else None
+        except (ValueError, TypeError, KeyError) as e:
+            report["failed"] += 1
+            if len(report["errors"]) < MAX_REPORTED_ERRORS:
+                report["errors"].append({"line": line, "detail": str(e)})
+            continue
+
+        chunk.append({
+            "type": record_type,
+            "user_id": current_user.id,
+            "category_id": category_id(record_type, category_name or _category_key(f"{title} {description}".lower())),
+            "title": title[:100],
+            "amount": abs(amount),
+            "description": description[:255] or None,
+            "date": day,
+            "created_at": now,
+        })
+        if len(chunk) >= CHUNK_SIZE:
+            _flush_chunk(db, current_user.id, chunk, loaded_days, seen, report)
+            chunk = []
+    if chunk:
+        _flush_chunk(db, current_user.id, chunk, loaded_days, seen, report)
+
+    return {"success": True, **report}
@@ -1,40 +1,32 @@
 # routers/incomes_router.py
 from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from typing import List
 import models, schemas
-from auth import get_db, get_current_user
+from auth import get_db, get_async_read_db, get_current_principal, get_current_principal_async, Principal
+from utils.records import create_records
+from utils.periods import period_filter
+from utils.pagination import page_statement, split_page, DEFAULT_LIMIT, MAX_LIMIT
 
 router = APIRouter(prefix="/incomes", tags=["incomes"])
 
-@router.post("/", response_model=schemas.TransactionResponse)
-def create_income(payload: schemas.IncomeCreate, db: Session = Depends(get_db), current_user: models.User = Depends(get_current_user)):
-    # optional category validation ownership
-    if payload.category_id:
-        cat = db.query(models.Category).filter(models.Category.id==payload.category_id, models.Category.user_id==current_user.id, models.Category.type=="income").first()
-        if not cat:
-            raise HTTPException(status_code=400, detail="Invalid category")
-    income = models.Income(
-        user_id=current_user.id,
-        category_id=payload.category_id,
-        title=payload.title,
-        amount=payload.amount,
-        description=payload.description,
-        date=payload.date
-    )
-    db.add(income)
-    db.commit()
-    db.refresh(income)
-    return income
+@router.post("/", response_model=schemas.TransactionResponse | List[schemas.TransactionResponse])
+def create_income(payload: schemas.IncomeCreate | schemas.IncomeBatch, db: Session = Depends(get_db), current_user: Principal = Depends(get_current_principal)):
+    """Create one income or, with a JSON array body, many at once (all-or-nothing, same order)."""
+    if isinstance(payload, list):
+        return create_records(db, models.Income, "income", current_user.id, payload)
+    return create_records(db, models.Income, "income", current_user.id, [payload])[0]
 
-@router.get("/", response_model=List[schemas.TransactionResponse])
-def list_incomes(month: int | None = Query(None), year: int | None = Query(None), db: Session = Depends(get_db), current_user: models.User = Depends(get_current_user)):
-    q = db.query(models.Income).filter(models.Income.user_id==current_user.id)
-    if month and year:
-        q = q.filter(models.Income.date.year == year)  # SQLAlchemy doesn't support .year directly; use extract
-    from sqlalchemy import extract
-    if month:
-        q = q.filter(extract('month', models.Income.date) == month)
-    if year:
-        q = q.filter(extract('year', models.Income.date) == year)
-    return q.order_by(models.Income.date.desc()).all()
+@router.get("/", response_model=schemas.TransactionPage)
+async def list_incomes(month: int | None = Query(None, ge=1, le=12), year: int | None = Query(None),
+           limit: int = Query(DEFAULT_LIMIT, ge=1, le=MAX_LIMIT), cursor: str | None = Query(None, description="next_cursor from the previous page"),
+           db: AsyncSession = Depends(get_async_read_db), current_user: Principal = Depends(get_current_principal_async)):
+    stmt = select(models.Income).where(models.Income.user_id==current_user.id, *period_filter(models.Income.date, year, month))
+    try:
+        stmt = page_statement(stmt, models.Income, cursor, limit)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    rows, next_cursor = split_page((await db.scalars(stmt)).all(), limit)
+    return {"data": rows, "next_cursor": next_cursor}
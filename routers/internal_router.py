@@ -0,0 +1,41 @@
+# routers/internal_router.py
+import hmac
+import os
+from fastapi import APIRouter, Header, HTTPException
+import auth
+from database import engine, read_engine, pool_stats
+from utils.passwords import password_pool
+from utils import summary_cache
+from utils.ledger_cache import ledger_cache
+
+router = APIRouter(prefix="/internal", tags=["internal"])
+
+# /internal/* requires the header X-Internal-Token with this value; while it is
+# unset the endpoints answer 404 to everyone (deny by default)
+INTERNAL_STATS_TOKEN = os.getenv("INTERNAL_STATS_TOKEN", "")
+
+
+def _check_token(token: str | None) -> None:
+    if not INTERNAL_STATS_TOKEN or not hmac.compare_digest(token or "", INTERNAL_STATS_TOKEN):
+        raise HTTPException(status_code=404, detail="Not Found")
+
+
+@router.get("/stats")
+def internal_stats(x_internal_token: str | None = Header(None)):
+    """Pool, cache and queue counters of this process (operational use only)."""
+    _check_token(x_internal_token)
+    from utils.ai_parser import model_pool, parse_cache
+    from routers.ai_router import job_queue
+    stats = {
+        "db_pool": pool_stats(engine),
+        "auth_cache": auth.auth_cache_stats(),
+        "password_pool": password_pool.stats(),
+        "parse_cache": parse_cache.stats(),
+        "summary_cache": summary_cache.stats(),
+        "ledger_cache": ledger_cache.stats(),
+        "model_pool": model_pool.stats(),
+        "ai_jobs": job_queue.stats(),
+    }
+    if read_engine is not engine:
+        stats["db_read_pool"] = pool_stats(read_engine)
+    return stats
@@ -0,0 +1,26 @@
+# routers/metrics_router.py
+import os
+from fastapi import APIRouter, Header
+from fastapi.responses import Response
+from routers.internal_router import _check_token
+from utils import metrics
+
+router = APIRouter(tags=["internal"])
+
+# opt-in for scrapers that can't send a token (e.g. the port is only reachable
+# from a private network); otherwise /metrics is guarded like /internal/*
+METRICS_PUBLIC = os.getenv("METRICS_PUBLIC", "").lower() in ("1", "true", "yes")
+
+
+@router.get("/metrics", include_in_schema=False)
+def prometheus_metrics(x_internal_token: str | None = Header(None), authorization: str | None = Header(None)):
+    """Request, SQL and model metrics of this process in the Prometheus text format.
+
+    Needs INTERNAL_STATS_TOKEN, as X-Internal-Token or as a bearer token
+    (`authorization` in the scrape config), unless METRICS_PUBLIC=1.
+    """
+    if not METRICS_PUBLIC:
+        if not x_internal_token and authorization and authorization.lower().startswith("bearer "):
+            x_internal_token = authorization[7:]
+        _check_token(x_internal_token)
+    return Response(metrics.render(), media_type=metrics.CONTENT_TYPE)
@@ -1,64 +1,92 @@
 # routers/summary_router.py
-from fastapi import APIRouter, Depends, Query
-from sqlalchemy.orm import Session
-from sqlalchemy import func, extract
-from auth import get_db, get_current_user
-import models
-from typing import List
-from datetime import datetime
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from sqlalchemy.ext.asyncio import AsyncSession
+from auth import get_async_read_db, get_current_principal_async, Principal
+from typing import Literal
+from datetime import date as Date, datetime, timedelta
 import schemas
+from utils.periods import month_range, year_range
+from utils.series import series
+from utils.summary_cache import CachedSummary
 
 router = APIRouter(prefix="/summary", tags=["summary"])
 
+# every summary is a utils.series query over the daily_totals rollup (see utils/rollup.py), never the raw rows
+
+@router.get("/series")
+async def summary_series(
+    request: Request,
+    start: Date = Query(..., description="First date (YYYY-MM-DD)"),
+    end: Date = Query(..., description="Last date, inclusive (YYYY-MM-DD)"),
+    granularity: Literal["day", "week", "month", "quarter", "year"] = Query("month"),
+    group_by: Literal["category", "type"] | None = Query(None),
+    db: AsyncSession = Depends(get_async_read_db),
+    current_user: Principal = Depends(get_current_principal_async)
+):
+    """Income, expense, balance and count per period between start and end, empty periods included.
+
+    Weeks run Monday to Sunday; the first and last period are clipped to the range."""
+    if end < start:
+        raise HTTPException(status_code=400, detail="end harus setelah start")
+    cached = CachedSummary(request, current_user.id)
+    if cached.response:
+        return cached.response
+    try:
+        data = await series(db, current_user.id, start, end + timedelta(days=1), granularity, group_by)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    for item in data:
+        item["start"] = str(item["start"])
+        item["end"] = str(item["end"] - timedelta(days=1))
+    return cached.store({
+        "start": str(start),
+        "end": str(end),
+        "granularity": granularity,
+        "group_by": group_by,
+        "data": data
+    })
+
 @router.get("/daily", response_model=schemas.SummaryResponse)
-def summary_daily(date: str = Query(..., description="YYYY-MM-DD"), db: Session = Depends(get_db), current_user: models.User = Depends(get_current_user)):
+async def summary_daily(date: str = Query(..., description="YYYY-MM-DD"), db: AsyncSession = Depends(get_async_read_db), current_user: Principal = Depends(get_current_principal_async)):
     # parse date
     dt = datetime.strptime(date, "%Y-%m-%d").date()
-    income_total = db.query(func.IFNULL(func.sum(models.Income.amount), 0)).filter(models.Income.user_id==current_user.id, models.Income.date==dt).scalar() or 0
-    expense_total = db.query(func.IFNULL(func.sum(models.Expense.amount), 0)).filter(models.Expense.user_id==current_user.id, models.Expense.date==dt).scalar() or 0
-    return {"income": float(income_total), "expense": float(expense_total), "balance": float(income_total) - float(expense_total)}
+    day, = await series(db, current_user.id, dt, dt + timedelta(days=1), "day")
+    return {"income": day["income"], "expense": day["expense"], "balance": day["balance"]}
 
 @router.get("/monthly")
-def summary_monthly(month: int = Query(...), year: int = Query(...), db: Session = Depends(get_db), current_user: models.User = Depends(get_current_user)):
-    # total income & expense
-    income_total = db.query(func.IFNULL(func.sum(models.Income.amount),0)).filter(models.Income.user_id==current_user.id, extract('month', models.Income.date)==month, extract('year', models.Income.date)==year).scalar() or 0
-    expense_total = db.query(func.IFNULL(func.sum(models.Expense.amount),0)).filter(models.Expense.user_id==current_user.id, extract('month', models.Expense.date)==month, extract('year', models.Expense.date)==year).scalar() or 0
-
-    # breakdown by category
-    income_by_cat = db.query(models.Category.name, func.sum(models.Income.amount).label('total'))\
-        .join(models.Income, models.Income.category_id==models.Category.id)\
-        .filter(models.Category.user_id==current_user.id, models.Category.type=='income', extract('month', models.Income.date)==month, extract('year', models.Income.date)==year)\
-        .group_by(models.Category.id).all()
-
-    expense_by_cat = db.query(models.Category.name, func.sum(models.Expense.amount).label('total'))\
-        .join(models.Expense, models.Expense.category_id==models.Category.id)\
-        .filter(models.Category.user_id==current_user.id, models.Category.type=='expense', extract('month', models.Expense.date)==month, extract('year', models.Expense.date)==year)\
-        .group_by(models.Category.id).all()
+async def summary_monthly(request: Request, month: int = Query(..., ge=1, le=12), year: int = Query(...), db: AsyncSession = Depends(get_async_read_db), current_user: Principal = Depends(get_current_principal_async)):
+    cached = CachedSummary(request, current_user.id)
+    if cached.response:
+        return cached.response
+    # totals and the breakdown by category in one query
+    total, = await series(db, current_user.id, *month_range(year, month), "month", group_by="category")
 
+    # uncategorised totals have no category name and are left out of the breakdown
     by_category = []
-    for name, total in income_by_cat:
-        by_category.append({"category": name, "income": float(total)})
-    for name, total in expense_by_cat:
-        by_category.append({"category": name, "expense": float(total)})
+    for group in total["groups"]:
+        if group["category"] is not None:
+            by_category.append({"category": group["category"], group["type"]: group["total"]})
 
-    return {
-        "total_income": float(income_total),
-        "total_expense": float(expense_total),
-        "balance": float(income_total) - float(expense_total),
+    return cached.store({
+        "total_income": total["income"],
+        "total_expense": total["expense"],
+        "balance": total["balance"],
         "by_category": by_category
-    }
+    })
 
 @router.get("/yearly")
-def summary_yearly(year: int = Query(...), db: Session = Depends(get_db), current_user: models.User = Depends(get_current_user)):
+async def summary_yearly(request: Request, year: int = Query(...), db: AsyncSession = Depends(get_async_read_db), current_user: Principal = Depends(get_current_principal_async)):
     # returns monthly breakdown for the year
+    cached = CachedSummary(request, current_user.id)
+    if cached.response:
+        return cached.response
+    months = await series(db, current_user.id, *year_range(year), "month")
     results = []
-    for m in range(1,13):
-        income_total = db.query(func.IFNULL(func.sum(models.Income.amount),0)).filter(models.Income.user_id==current_user.id, extract('month', models.Income.date)==m, extract('year', models.Income.date)==year).scalar() or 0
-        expense_total = db.query(func.IFNULL(func.sum(models.Expense.amount),0)).filter(models.Expense.user_id==current_user.id, extract('month', models.Expense.date)==m, extract('year', models.Expense.date)==year).scalar() or 0
+    for m, totals in enumerate(months, start=1):
         results.append({
             "month": m,
-            "income": float(income_total),
-            "expense": float(expense_total),
-            "balance": float(income_total) - float(expense_total)
+            "income": totals["income"],
+            "expense": totals["expense"],
+            "balance": totals["balance"]
         })
-    return results
+    return cached.store(results)
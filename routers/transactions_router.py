@@ -1,94 +1,131 @@
 # routers/transactions_router.py
-from fastapi import APIRouter, Depends, Query
-from sqlalchemy.orm import Session
-from sqlalchemy import extract, func
+import csv
+import heapq
+import io
+import json
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import func, case, select, literal, union_all, true
 from typing import List, Literal
-from datetime import datetime, timedelta
+from datetime import date, datetime, timedelta
 import models
-from auth import get_db, get_current_user
+from auth import get_async_read_db, get_current_principal, get_current_principal_async, Principal
+from database import read_session
+from utils.periods import month_range, year_range, month_weeks, in_range
+from utils.summary_cache import CachedSummary
+from utils.ledger_cache import get_ledger
+from utils.series import series
+from utils.pagination import before, decode_cursor, encode_cursor, DEFAULT_LIMIT, MAX_LIMIT
 
 router = APIRouter(prefix="/transactions", tags=["transactions"])
 
+# merged list order: date desc, then incomes before expenses, then id desc
+_LEDGER = ((models.Income, "income", 1), (models.Expense, "expense", 0))
+
+
+def _after_cursor(model, rank: int, cursor: list):
+    cursor_date, cursor_rank, cursor_id = cursor
+    if rank < cursor_rank:
+        # this table sorts after the cursor's table on the cursor's date
+        return model.date <= cursor_date
+    if rank > cursor_rank:
+        return model.date < cursor_date
+    return before(model.date, model.id, cursor_date, cursor_id)
+
+
+def _ledger_statement(user_id: int, start, end, after: list | None, limit: int):
+    """One statement for a page of the merged ledger plus the period totals.
+
+    Each table contributes at most limit + 1 rows (index range scans on
+    (user_id, date)); they are merged with UNION ALL, ordered and cut in SQL,
+    and joined to their category names. The totals come from daily_totals and
+    are joined onto every row, so an empty page still returns them (one row of
+    NULL ledger columns).
+    """
+    branches = []
+    for model, type_, rank in _LEDGER:
+        q = select(
+            model.id, model.category_id, model.title, model.amount, model.description, model.date,
+            literal(type_).label("type"), literal(rank).label("type_rank"),
+        ).where(model.user_id == user_id, *in_range(model.date, start, end))
+        if after:
+            q = q.where(_after_cursor(model, rank, after))
+        branches.append(select(q.order_by(model.date.desc(), model.id.desc()).limit(limit + 1).subquery()))
+    ledger = union_all(*branches).subquery("ledger")
+    page = select(ledger).order_by(ledger.c.date.desc(), ledger.c.type_rank.desc(), ledger.c.id.desc())\
+        .limit(limit + 1).subquery("page")
+
+    Daily = models.DailyTotal
+    totals = select(
+        func.coalesce(func.sum(case((Daily.type == models.CategoryType.income, Daily.total), else_=0)), 0).label("total_income"),
+        func.coalesce(func.sum(case((Daily.type == models.CategoryType.expense, Daily.total), else_=0)), 0).label("total_expense"),
+    ).where(Daily.user_id == user_id, *in_range(Daily.date, start, end)).subquery("totals")
+
+    return select(totals, page, models.Category.name.label("category_name"))\
+        .select_from(totals.outerjoin(page, true()).outerjoin(models.Category, models.Category.id == page.c.category_id))\
+        .order_by(page.c.date.desc(), page.c.type_rank.desc(), page.c.id.desc())
+
+
+def _transaction_data(row) -> dict:
+    return {
+        "id": row.id,
+        "category_id": row.category_id,
+        "title": row.title,
+        "amount": row.amount,
+        "description": row.description or "",
+        "date": str(row.date),
+        "type": row.type,
+        "category": {
+            "id": row.category_id,
+            "name": row.category_name
+        } if row.category_name is not None else None
+    }
+
+
 @router.get("")
-def get_transactions(
+async def get_transactions(
     year: int = Query(..., description="Year"),
     month: int = Query(..., ge=1, le=12, description="Month (1-12)"),
     start_date: str = Query(None, description="Start date (YYYY-MM-DD)"),
     end_date: str = Query(None, description="End date (YYYY-MM-DD)"),
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_user)
+    limit: int = Query(DEFAULT_LIMIT, ge=1, le=MAX_LIMIT, description="Page size"),
+    cursor: str = Query(None, description="next_cursor from the previous page"),
+    db: AsyncSession = Depends(get_async_read_db),
+    current_user: Principal = Depends(get_current_principal_async)
 ):
-    """Get all transactions for a specific month or date range"""
+    """Get transactions (incomes and expenses, newest first) for a specific month or date range.
+
+    Results are paged: pass `next_cursor` back as `cursor` until it is null.
+    `summary` always covers the whole period."""
     try:
         if start_date and end_date:
             start = datetime.strptime(start_date, "%Y-%m-%d").date()
-            end = datetime.strptime(end_date, "%Y-%m-%d").date()
+            # end_date is inclusive; the filter is half-open
+            end = datetime.strptime(end_date, "%Y-%m-%d").date() + timedelta(days=1)
         else:
-            start = datetime(year, month, 1).date()
-            # Get last day of month
-            if month == 12:
-                end = datetime(year + 1, 1, 1).date() - timedelta(days=1)
-            else:
-                end = datetime(year, month + 1, 1).date() - timedelta(days=1)
-    except ValueError:
+            start, end = month_range(year, month)
+    except (ValueError, OverflowError):
         return {"success": False, "detail": "Invalid date format"}
-    
-    # Get incomes
-    incomes = db.query(models.Income).filter(
-        models.Income.user_id == current_user.id,
-        models.Income.date >= start,
-        models.Income.date <= end
-    ).order_by(models.Income.date.desc()).all()
-    
-    # Get expenses
-    expenses = db.query(models.Expense).filter(
-        models.Expense.user_id == current_user.id,
-        models.Expense.date >= start,
-        models.Expense.date <= end
-    ).order_by(models.Expense.date.desc()).all()
-    
-    # Combine and format transactions
-    transactions = []
-    
-    for income in incomes:
-        transactions.append({
-            "id": income.id,
-            "category_id": income.category_id,
-            "title": income.title,
-            "amount": income.amount,
-            "description": income.description or "",
-            "date": str(income.date),
-            "type": "income",
-            "category": {
-                "id": income.category.id,
-                "name": income.category.name
-            } if income.category else None
-        })
-    
-    for expense in expenses:
-        transactions.append({
-            "id": expense.id,
-            "category_id": expense.category_id,
-            "title": expense.title,
-            "amount": expense.amount,
-            "description": expense.description or "",
-            "date": str(expense.date),
-            "type": "expense",
-            "category": {
-                "id": expense.category.id,
-                "name": expense.category.name
-            } if expense.category else None
-        })
-    
-    # Sort by date descending
-    transactions.sort(key=lambda x: x["date"], reverse=True)
-    
-    # Calculate summary
-    total_income = sum(inc.amount for inc in incomes)
-    total_expense = sum(exp.amount for exp in expenses)
-    
+    try:
+        after = decode_cursor(cursor, size=3) if cursor else None
+    except ValueError:
+        return {"success": False, "detail": "Invalid cursor"}
+
+    rows = (await db.execute(_ledger_statement(current_user.id, start, end, after, limit))).all()
+    total_income, total_expense = rows[0].total_income, rows[0].total_expense
+    rows = [row for row in rows if row.id is not None]
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1].date, rows[-1].type_rank, rows[-1].id)
+
+    transactions = [_transaction_data(row) for row in rows]
+
     return {
         "data": transactions,
+        "next_cursor": next_cursor,
         "summary": {
             "total_income": total_income,
             "total_expense": total_expense,
@@ -97,132 +134,182 @@ def get_transactions(
     }
 
 
+EXPORT_COLUMNS = ["id", "type", "date", "title", "amount", "category_id", "category", "description"]
+EXPORT_BATCH = 1000
+
+
+def _tagged(result, type_: str, rank: int):
+    # incomes first on a shared date, as in the paged list
+    for row in result:
+        yield (row.date, -rank, row.id), type_, row
+
+
+def _export_rows(user_id: int, start: date | None, end: date | None):
+    """Yield the user's ledger oldest first, as dicts, with constant memory.
+
+    Each table is read through its own server-side cursor in (user_id, date)
+    index order and the two streams are merged here, so rows go out while
+    the queries are still running and nothing is sorted or buffered whole.
+    """
+    sessions = []
+    try:
+        streams = []
+        for model, type_, rank in _LEDGER:
+            db = read_session(user_id)
+            sessions.append(db)
+            q = select(
+                model.id, model.date, model.title, model.amount, model.category_id,
+                models.Category.name.label("category"), model.description,
+            ).outerjoin(models.Category, models.Category.id == model.category_id)\
+                .where(model.user_id == user_id)
+            if start:
+                q = q.where(model.date >= start)
+            if end:
+                q = q.where(model.date < end)
+            result = db.execute(q.order_by(model.date, model.id), execution_options={"yield_per": EXPORT_BATCH})
+            streams.append(_tagged(result, type_, rank))
+        for _, type_, row in heapq.merge(*streams, key=lambda item: item[0]):
+            yield {
+                "id": row.id,
+                "type": type_,
+                "date": str(row.date),
+                "title": row.title,
+                "amount": row.amount,
+                "category_id": row.category_id,
+                "category": row.category,
+                "description": row.description or "",
+            }
+    finally:
+        for db in sessions:
+            db.close()
+
+
+def _csv_chunks(rows):
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=EXPORT_COLUMNS)
+    writer.writeheader()
+    for count, row in enumerate(rows, start=1):
+        writer.writerow(row)
+        if count % EXPORT_BATCH == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+
+def _ndjson_chunks(rows):
+    lines = []
+    for row in rows:
+        lines.append(json.dumps(row, ensure_ascii=False))
+        if len(lines) == EXPORT_BATCH:
+            yield "\n".join(lines) + "\n"
+            lines = []
+    if lines:
+        yield "\n".join(lines) + "\n"
+
+
+@router.get("/export")
+def export_transactions(
+    format: Literal["csv", "ndjson"] = Query("csv", description="csv or ndjson"),
+    start: date | None = Query(None, description="First date (YYYY-MM-DD), default: everything"),
+    end: date | None = Query(None, description="Last date, inclusive (YYYY-MM-DD)"),
+    current_user: Principal = Depends(get_current_principal)
+):
+    """Stream the whole ledger (or a date range) as CSV or newline-delimited JSON, oldest first."""
+    # end is inclusive; the filter is half-open
+    try:
+        end = end + timedelta(days=1) if end else None
+    except OverflowError:
+        raise HTTPException(status_code=400, detail="Invalid date format")
+    rows = _export_rows(current_user.id, start, end)
+    if format == "ndjson":
+        return StreamingResponse(_ndjson_chunks(rows), media_type="application/x-ndjson",
+                                 headers={"Content-Disposition": 'attachment; filename="transactions.ndjson"'})
+    return StreamingResponse(_csv_chunks(rows), media_type="text/csv",
+                             headers={"Content-Disposition": 'attachment; filename="transactions.csv"'})
+
+
+def _series_totals(periods: list) -> list:
+    return [{"total_income": p["income"], "total_expense": p["expense"], "transaction_count": p["count"]} for p in periods]
+
+
 @router.get("/summary/monthly")
-def get_monthly_summary(
+async def get_monthly_summary(
+    request: Request,
     year: int = Query(..., description="Year"),
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_user)
+    db: AsyncSession = Depends(get_async_read_db),
+    current_user: Principal = Depends(get_current_principal_async)
 ):
     """Get monthly summary for entire year"""
-    month_names = ["Januari", "Februari", "Maret", "April", "Mei", "Juni", 
+    cached = CachedSummary(request, current_user.id)
+    if cached.response:
+        return cached.response
+    month_names = ["Januari", "Februari", "Maret", "April", "Mei", "Juni",
                    "Juli", "Agustus", "September", "Oktober", "November", "Desember"]
-    
-    # Get all transactions for the year
-    incomes = db.query(models.Income).filter(
-        models.Income.user_id == current_user.id,
-        extract('year', models.Income.date) == year
-    ).all()
-    
-    expenses = db.query(models.Expense).filter(
-        models.Expense.user_id == current_user.id,
-        extract('year', models.Expense.date) == year
-    ).all()
-    
-    # Group by month
-    monthly_data = {}
-    for month_num in range(1, 13):
-        monthly_data[month_num] = {
+
+    ledger = await get_ledger(db, current_user.id)
+    if ledger is not None:
+        totals = ledger.bucket_totals([month_range(year, m)[0] for m in range(1, 13)] + [year_range(year)[1]])
+    else:
+        # One grouped query over the daily_totals rollup (see utils/series.py)
+        totals = _series_totals(await series(db, current_user.id, *year_range(year), "month"))
+
+    result_data = [
+        {
             "month": month_num,
             "month_name": month_names[month_num - 1],
-            "total_income": 0,
-            "total_expense": 0,
-            "balance": 0,
-            "transaction_count": 0
+            "total_income": t["total_income"],
+            "total_expense": t["total_expense"],
+            "balance": t["total_income"] - t["total_expense"],
+            "transaction_count": t["transaction_count"]
         }
-    
-    # Sum incomes by month
-    for income in incomes:
-        month_num = income.date.month
-        monthly_data[month_num]["total_income"] += income.amount
-        monthly_data[month_num]["transaction_count"] += 1
-    
-    # Sum expenses by month
-    for expense in expenses:
-        month_num = expense.date.month
-        monthly_data[month_num]["total_expense"] += expense.amount
-        monthly_data[month_num]["transaction_count"] += 1
-    
-    # Calculate balance
-    for month_num in monthly_data:
-        monthly_data[month_num]["balance"] = monthly_data[month_num]["total_income"] - monthly_data[month_num]["total_expense"]
-    
-    # Convert to list and filter out empty months (optional: keep all months)
-    result_data = [monthly_data[i] for i in range(1, 13)]
-    
-    return {
+        for month_num, t in enumerate(totals, start=1)
+    ]
+
+    return cached.store({
         "year": year,
         "data": result_data
-    }
+    })
 
 
 @router.get("/summary/weekly")
-def get_weekly_summary(
+async def get_weekly_summary(
+    request: Request,
     year: int = Query(..., description="Year"),
     month: int = Query(..., ge=1, le=12, description="Month (1-12)"),
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_user)
+    db: AsyncSession = Depends(get_async_read_db),
+    current_user: Principal = Depends(get_current_principal_async)
 ):
     """Get weekly summary for a specific month"""
-    # Get first and last day of month
-    first_day = datetime(year, month, 1).date()
-    if month == 12:
-        last_day = datetime(year + 1, 1, 1).date() - timedelta(days=1)
+    cached = CachedSummary(request, current_user.id)
+    if cached.response:
+        return cached.response
+    # Monday-Sunday weeks, clipped to the month
+    weeks = month_weeks(year, month)
+    edges = [week_start for week_start, _ in weeks] + [weeks[-1][1]]
+
+    ledger = await get_ledger(db, current_user.id)
+    if ledger is not None:
+        totals = ledger.bucket_totals(edges)
     else:
-        last_day = datetime(year, month + 1, 1).date() - timedelta(days=1)
-    
-    # Get all transactions for the month
-    incomes = db.query(models.Income).filter(
-        models.Income.user_id == current_user.id,
-        models.Income.date >= first_day,
-        models.Income.date <= last_day
-    ).all()
-    
-    expenses = db.query(models.Expense).filter(
-        models.Expense.user_id == current_user.id,
-        models.Expense.date >= first_day,
-        models.Expense.date <= last_day
-    ).all()
-    
-    # Calculate weeks
-    weekly_data = []
-    current_date = first_day
-    week_num = 1
-    
-    while current_date <= last_day:
-        # Find start of week (Monday)
-        week_start = current_date - timedelta(days=current_date.weekday())
-        # Find end of week (Sunday)
-        week_end = week_start + timedelta(days=6)
-        
-        # Adjust if week extends beyond month
-        if week_start < first_day:
-            week_start = first_day
-        if week_end > last_day:
-            week_end = last_day
-        
-        # Filter transactions for this week
-        week_incomes = [inc for inc in incomes if week_start <= inc.date <= week_end]
-        week_expenses = [exp for exp in expenses if week_start <= exp.date <= week_end]
-        
-        total_income = sum(inc.amount for inc in week_incomes)
-        total_expense = sum(exp.amount for exp in week_expenses)
-        
-        weekly_data.append({
+        totals = _series_totals(await series(db, current_user.id, edges[0], edges[-1], "week"))
+
+    weekly_data = [
+        {
             "week_number": week_num,
             "start_date": str(week_start),
-            "end_date": str(week_end),
-            "total_income": total_income,
-            "total_expense": total_expense,
-            "balance": total_income - total_expense,
-            "transaction_count": len(week_incomes) + len(week_expenses)
-        })
-        
-        week_num += 1
-        current_date = week_end + timedelta(days=1)
-    
-    return {
+            "end_date": str(week_end - timedelta(days=1)),
+            "total_income": t["total_income"],
+            "total_expense": t["total_expense"],
+            "balance": t["total_income"] - t["total_expense"],
+            "transaction_count": t["transaction_count"]
+        }
+        for week_num, ((week_start, week_end), t) in enumerate(zip(weeks, totals), start=1)
+    ]
+
+    return cached.store({
         "year": year,
         "month": month,
         "data": weekly_data
-    }
+    })
 
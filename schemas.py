@@ -1,7 +1,7 @@
 # schemas.py
 from pydantic import BaseModel, EmailStr, Field
 from datetime import datetime, date
-from typing import Optional, List
+from typing import Annotated, Optional, List
 from enum import Enum
 
 class ModelConfig:
@@ -54,6 +54,10 @@ class ExpenseCreate(BaseModel):
     description: Optional[str] = None
     date: date
 
+# JSON array bodies of the bulk create endpoints; an empty array is a 422
+IncomeBatch = Annotated[List[IncomeCreate], Field(min_length=1)]
+ExpenseBatch = Annotated[List[ExpenseCreate], Field(min_length=1)]
+
 class TransactionResponse(BaseModel):
     id: int
     category_id: Optional[int]
@@ -65,8 +69,24 @@ class TransactionResponse(BaseModel):
 
     model_config = {"from_attributes": True}
 
+class TransactionPage(BaseModel):
+    data: List[TransactionResponse]
+    next_cursor: Optional[str] = None
+
 # Summary responses
 class SummaryResponse(BaseModel):
     income: float
     expense: float
     balance: float
+
+# AI parsing
+class ParseBatchRequest(BaseModel):
+    texts: List[str] = Field(..., min_length=1, max_length=100)
+
+class ParseJobCreate(BaseModel):
+    text: str
+    override_title: Optional[str] = None
+    override_amount: Optional[float] = None
+    override_date: Optional[str] = None
+    override_category: Optional[str] = None
+    override_type: Optional[str] = None
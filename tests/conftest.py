@@ -0,0 +1,83 @@
+# tests/conftest.py
+"""Shared fixtures: the app on a throwaway SQLite database.
+
+The app reads its configuration on import, so the environment is set here,
+before anything imports `main` or `database`. The database is a temporary
+file rather than :memory: because the sync and async engines must both see it.
+"""
+import itertools
+import os
+import sys
+import tempfile
+from contextlib import contextmanager
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+INTERNAL_TOKEN = "test-internal-token"
+_DB_DIR = tempfile.mkdtemp(prefix="finance-tests-")
+os.environ.update({
+    "DATABASE_URL": "sqlite:///" + os.path.join(_DB_DIR, "test.db"),
+    "BCRYPT_ROUNDS": "4",
+    "PASSWORD_WORKERS": "1",
+    "INTERNAL_STATS_TOKEN": INTERNAL_TOKEN,
+    "PARSE_CACHE_BACKEND": "memory",
+    "SUMMARY_CACHE_BACKEND": "memory",
+})
+for _var in ("READ_DATABASE_URL", "ASYNC_DATABASE_URL", "ASYNC_READ_DATABASE_URL"):
+    os.environ.pop(_var, None)
+
+_emails = itertools.count()
+
+
+@pytest.fixture(scope="session")
+def app():
+    import main
+    return main.app
+
+
+@pytest.fixture(scope="session")
+def client(app):
+    from fastapi.testclient import TestClient
+    with TestClient(app) as client:
+        yield client
+
+
+@pytest.fixture
+def internal_headers():
+    return {"X-Internal-Token": INTERNAL_TOKEN}
+
+
+@pytest.fixture
+def user(client):
+    """A freshly registered, logged-in user: {"id", "email", "password", "headers"}."""
+    email, password = f"user{next(_emails)}@example.com", "rahasia"
+    response = client.post("/auth/register", json={"name": "Test", "email": email, "password": password})
+    assert response.status_code == 200, response.text
+    token = client.post("/auth/login", json={"email": email, "password": password}).json()["access_token"]
+    return {"id": response.json()["id"], "email": email, "password": password,
+            "headers": {"Authorization": f"Bearer {token}"}}
+
+
+@pytest.fixture
+def count_statements():
+    """`with count_statements() as executed:` collects the SQL of every statement run inside."""
+    from sqlalchemy import event
+    from sqlalchemy.engine import Engine
+
+    @contextmanager
+    def counter():
+        executed = []
+
+        def record(conn, cursor, statement, parameters, context, executemany):
+            executed.append(statement)
+
+        event.listen(Engine, "before_cursor_execute", record)
+        try:
+            yield executed
+        finally:
+            event.remove(Engine, "before_cursor_execute", record)
+
+    return counter
@@ -0,0 +1,48 @@
+# tests/test_ai_router.py
+import pytest
+
+from routers import ai_router
+
+PARSED = {
+    "beli kopi 25rb": {"title": "Kopi", "amount": 25000, "date": "2025-03-14", "category": "minuman", "type": "expense"},
+    "gaji bulan ini 5jt": {"title": "Gaji", "amount": 5000000, "date": "2025-03-01", "category": "gaji", "type": "income"},
+    # parses, but cannot be stored
+    "parkir 5rb tanggal 31 februari": {"title": "Parkir", "amount": 5000, "date": "2025-02-31", "category": "transport",
+                                       "type": "expense"},
+}
+
+
+@pytest.fixture
+def parsed(monkeypatch):
+    """The parser replaced by canned results (ints, as the model returns them)."""
+    def parse(text):
+        return dict(PARSED[text]) if text in PARSED else {"error": "Teks tidak mengandung informasi transaksi."}
+    monkeypatch.setattr(ai_router, "parse_expense_text", parse)
+    monkeypatch.setattr(ai_router, "parse_expense_texts", lambda texts: [parse(text) for text in texts])
+    return PARSED
+
+
+def test_batch_returns_records_like_the_single_endpoint(client, user, parsed):
+    texts = ["beli kopi 25rb", "gaji bulan ini 5jt"]
+    single = [client.post("/ai/parse-expense", params={"text": text}, headers=user["headers"]).json()["data"]
+              for text in texts]
+    batch = client.post("/ai/parse-expense/batch", json={"texts": texts}, headers=user["headers"]).json()
+    assert batch["saved"] == len(texts)
+    for expected, result in zip(single, batch["results"]):
+        got = result["data"]
+        assert type(got["amount"]) is type(expected["amount"]) is float
+        assert {k: v for k, v in got.items() if k != "id"} == {k: v for k, v in expected.items() if k != "id"}
+
+
+def test_batch_keeps_input_order_when_some_texts_fail(client, user, parsed):
+    texts = ["halo", "beli kopi 25rb", "parkir 5rb tanggal 31 februari", "gaji bulan ini 5jt"]
+    batch = client.post("/ai/parse-expense/batch", json={"texts": texts}, headers=user["headers"]).json()
+    results = batch["results"]
+    assert [r["index"] for r in results] == [0, 1, 2, 3]
+    assert [r["success"] for r in results] == [False, True, False, True]
+    assert "transaksi" in results[0]["detail"]
+    assert results[2]["detail"].startswith("Gagal menyimpan record")
+    assert [results[1]["data"]["title"], results[3]["data"]["type"]] == ["Kopi", "income"]
+    assert (batch["saved"], batch["failed"]) == (2, 2)
+    stored = client.get("/expenses/?year=2025&month=3", headers=user["headers"]).json()["data"]
+    assert [r["title"] for r in stored] == ["Kopi"]
@@ -0,0 +1,59 @@
+# tests/test_date_ranges.py
+"""Period endpoints filter by half-open date ranges, in a fixed number of statements."""
+import pytest
+
+from utils import ledger_cache
+
+# path -> statements per request, whatever the amount of data
+STATEMENTS = {
+    "/summary/monthly?year=2025&month=3": 1,
+    "/summary/yearly?year=2025": 1,  # one grouped query, not one per month
+    # read through the ledger cache when it is on: one load per table
+    "/transactions/summary/monthly?year=2025": 2 if ledger_cache.ENABLED else 1,
+    "/expenses/?year=2025&month=3": 1,
+    "/incomes/?year=2025&month=3": 1,
+}
+
+
+def _post(client, user, kind: str, body: list) -> None:
+    response = client.post(f"/{kind}s/", json=body, headers=user["headers"])
+    assert response.status_code == 200, response.text
+
+
+@pytest.mark.parametrize("per_kind", [1, 12, 120])
+def test_statement_count_does_not_depend_on_the_data(client, user, count_statements, per_kind):
+    # spread over every month of the year, so a per-month query would show up
+    for kind in ("income", "expense"):
+        _post(client, user, kind, [{"title": f"{kind} {i}", "amount": 1000 + i, "date": f"2025-{i % 12 + 1:02d}-{i % 28 + 1:02d}"}
+                                   for i in range(per_kind)])
+    client.get("/categories/", headers=user["headers"])  # warm the principal cache
+
+    for path, expected in STATEMENTS.items():
+        with count_statements() as executed:
+            response = client.get(path, headers=user["headers"])
+        assert response.status_code == 200, (path, response.text)
+        assert len(executed) == expected, (path, executed)
+
+
+def test_month_includes_its_last_day_and_not_the_next_month(client, user):
+    amounts = {"2025-02-28": 1, "2025-03-01": 10, "2025-03-31": 100, "2025-04-01": 1000,
+               "2025-12-31": 10000, "2026-01-01": 100000}
+    for kind in ("income", "expense"):
+        _post(client, user, kind, [{"title": day, "amount": amount, "date": day} for day, amount in amounts.items()])
+    get = lambda path: client.get(path, headers=user["headers"]).json()
+
+    for kind in ("income", "expense"):
+        march = get(f"/{kind}s/?year=2025&month=3")["data"]
+        assert sorted(record["date"] for record in march) == ["2025-03-01", "2025-03-31"]
+
+    monthly = get("/summary/monthly?year=2025&month=3")
+    assert monthly["total_income"] == monthly["total_expense"] == 110
+
+    yearly = {m["month"]: m for m in get("/summary/yearly?year=2025")}
+    assert [yearly[m]["income"] for m in (2, 3, 4, 12)] == [1, 110, 1000, 10000]
+    assert sum(m["expense"] for m in yearly.values()) == 11111  # 2026-01-01 left out
+
+    by_month = {m["month"]: m for m in get("/transactions/summary/monthly?year=2025")["data"]}
+    assert [by_month[m]["total_income"] for m in (2, 3, 4, 12)] == [1, 110, 1000, 10000]
+    assert by_month[3]["transaction_count"] == 4
+    assert sum(m["total_expense"] for m in by_month.values()) == 11111
@@ -0,0 +1,51 @@
+# tests/test_export.py
+import csv
+import io
+import json
+
+import pytest
+
+DAYS = ["2025-03-01", "2025-03-02", "2025-03-02", "2025-03-05", "2025-04-01"]
+
+
+@pytest.fixture
+def ledger(client, user):
+    """Incomes and expenses sharing dates: {(type, id): date}."""
+    created = {}
+    for kind in ("expense", "income"):  # expenses first, so ids alone don't give the order
+        body = [{"title": f"{kind} {i}", "amount": 1000 * (i + 1), "date": day} for i, day in enumerate(DAYS)]
+        response = client.post(f"/{kind}s/", json=body, headers=user["headers"])
+        assert response.status_code == 200, response.text
+        created |= {(kind, record["id"]): record["date"] for record in response.json()}
+    return created
+
+
+def _export(client, user, format: str, **params) -> list:
+    response = client.get("/transactions/export", params={"format": format, **params}, headers=user["headers"])
+    assert response.status_code == 200, response.text
+    if format == "csv":
+        return list(csv.DictReader(io.StringIO(response.text)))
+    return [json.loads(line) for line in response.text.splitlines()]
+
+
+@pytest.mark.parametrize("format", ["csv", "ndjson"])
+def test_export_types_and_order(client, user, ledger, format):
+    rows = _export(client, user, format)
+    assert {(row["type"], int(row["id"])): row["date"] for row in rows} == ledger
+    # oldest first, incomes before expenses on a shared date
+    keys = [(row["date"], row["type"] != "income", int(row["id"])) for row in rows]
+    assert keys == sorted(keys)
+    assert {row["type"] for row in rows} == {"income", "expense"}
+
+
+@pytest.mark.parametrize("format", ["csv", "ndjson"])
+def test_export_range_is_inclusive(client, user, ledger, format):
+    rows = _export(client, user, format, start="2025-03-02", end="2025-03-05")
+    assert sorted((row["type"], int(row["id"])) for row in rows) == sorted(
+        key for key, day in ledger.items() if "2025-03-02" <= day <= "2025-03-05")
+    assert len(rows) == 6
+
+
+def test_export_end_out_of_range(client, user):
+    response = client.get("/transactions/export", params={"end": "9999-12-31"}, headers=user["headers"])
+    assert response.status_code == 400
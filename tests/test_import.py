@@ -0,0 +1,52 @@
+# tests/test_import.py
+import pytest
+
+from routers import import_router
+from utils import rollup
+
+
+def _import(client, user, text: str) -> dict:
+    response = client.post("/import/csv", files={"file": ("statement.csv", text.encode(), "text/csv")},
+                           headers=user["headers"])
+    assert response.status_code == 200, response.text
+    return response.json()
+
+
+def test_rows_of_a_failed_chunk_are_not_duplicates_later(client, user, monkeypatch):
+    monkeypatch.setattr(import_router, "CHUNK_SIZE", 2)
+    apply_many = rollup.apply_many
+    calls = []
+
+    def fail_first_chunk(db, kind, rows):
+        calls.append(kind)
+        if len(calls) == 1:
+            raise RuntimeError("disk full")
+        return apply_many(db, kind, rows)
+    monkeypatch.setattr(rollup, "apply_many", fail_first_chunk)
+
+    rows = "2025-03-01,15000,kopi\n2025-03-02,20000,makan siang\n"
+    report = _import(client, user, "date,amount,title\n" + rows + rows)
+    assert report["failed"] == 2 and len(report["errors"]) == 1
+    assert report["duplicates"] == 0
+    assert report["imported"] == 2
+    stored = client.get("/expenses/?year=2025&month=3", headers=user["headers"]).json()["data"]
+    assert sorted(r["title"] for r in stored) == ["kopi", "makan siang"]
+
+
+def test_repeats_within_a_chunk_and_across_imports_are_duplicates(client, user):
+    text = "date,amount,title\n2025-03-01,15000,kopi\n2025-03-01,15.000,Kopi\n"
+    assert _import(client, user, text)["imported"] == 1
+    report = _import(client, user, text)
+    assert report["imported"] == 0 and report["duplicates"] == 2
+
+
+@pytest.mark.parametrize("amount", ["nan", "inf", "-inf", "Infinity", "Rp NaN"])
+def test_amounts_that_are_not_finite_are_rejected(amount):
+    with pytest.raises(ValueError):
+        import_router._parse_amount(amount)
+
+
+def test_amounts_as_banks_write_them():
+    assert import_router._parse_amount("Rp 50.000") == 50000
+    assert import_router._parse_amount("-1.234.567,89") == -1234567.89
+    assert import_router._parse_amount("(1,234.56)") == -1234.56
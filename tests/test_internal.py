@@ -0,0 +1,16 @@
+# tests/test_internal.py
+from routers import internal_router
+
+
+def test_stats_require_the_token(client, internal_headers):
+    assert client.get("/internal/stats").status_code == 404
+    assert client.get("/internal/stats", headers={"X-Internal-Token": "wrong"}).status_code == 404
+    response = client.get("/internal/stats", headers=internal_headers)
+    assert response.status_code == 200
+    assert "db_pool" in response.json()
+
+
+def test_stats_are_closed_without_a_configured_token(client, monkeypatch):
+    monkeypatch.setattr(internal_router, "INTERNAL_STATS_TOKEN", "")
+    assert client.get("/internal/stats").status_code == 404
+    assert client.get("/internal/stats", headers={"X-Internal-Token": ""}).status_code == 404
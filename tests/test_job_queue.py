@@ -0,0 +1,32 @@
+# tests/test_job_queue.py
+import os
+
+from utils.job_queue import JobQueue
+
+
+def _work(text: str) -> str:
+    if text == "die":
+        os._exit(1)  # the worker process dies mid-job, like an OOM kill
+    return text.upper()
+
+
+def _on_result(job, output: str) -> dict:
+    return {"output": output}
+
+
+def test_jobs_recover_after_a_worker_died():
+    queue = JobQueue(_work, _on_result, workers=1)
+    try:
+        dying = queue.submit(1, {"text": "die"})
+        assert dying.done.wait(30)
+        assert dying.status == "failed"
+        assert dying.error
+
+        job = queue.submit(1, {"text": "halo"})
+        assert job.done.wait(30)
+        assert job.status == "done", job.error
+        assert job.result == {"output": "HALO"}
+        assert queue.stats()["restarts"] == 1
+        assert queue.stats()["running"] == 0
+    finally:
+        queue.shutdown()
@@ -0,0 +1,74 @@
+# tests/test_ledger_cache.py
+import asyncio
+from datetime import date
+
+import pytest
+from sqlalchemy import event, func, select
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import Session
+
+import database
+import models
+import schemas
+from database import SessionLocal
+from utils import ledger_cache
+from utils.records import create_records
+from utils.summary_cache import data_version
+
+pytestmark = pytest.mark.skipif(not ledger_cache.PATCH_ON_WRITE, reason="needs numpy and SUMMARY_CACHE_BACKEND=memory")
+
+YEAR = [date(2025, 1, 1), date(2026, 1, 1)]
+
+
+def _load(user_id: int) -> ledger_cache.Ledger:
+    async def load():
+        engine = create_async_engine(database.ASYNC_DATABASE_URL)
+        try:
+            async with AsyncSession(engine) as db:
+                return await ledger_cache.get_ledger(db, user_id)
+        finally:
+            await engine.dispose()
+    return asyncio.run(load())
+
+
+def _expense(amount: float) -> schemas.ExpenseCreate:
+    return schemas.ExpenseCreate(title="Kopi", amount=amount, date=date(2025, 3, 3))
+
+
+def _total(user_id: int) -> float:
+    with SessionLocal() as db:
+        return float(db.scalar(select(func.sum(models.Expense.amount)).where(models.Expense.user_id == user_id)))
+
+
+def test_write_patches_a_cached_ledger(user):
+    with SessionLocal() as db:
+        create_records(db, models.Expense, "expense", user["id"], [_expense(10_000)])
+    assert _load(user["id"]).bucket_totals(YEAR)[0]["total_expense"] == 10_000
+
+    with SessionLocal() as db:
+        create_records(db, models.Expense, "expense", user["id"], [_expense(5_000)])
+    entry = ledger_cache.ledger_cache.get(user["id"], data_version(user["id"]))
+    assert entry is not None, "the write should have patched the entry, not dropped it"
+    assert entry.bucket_totals(YEAR)[0]["total_expense"] == 15_000
+
+
+def test_load_between_commit_and_patch_is_not_double_counted(user):
+    with SessionLocal() as db:
+        create_records(db, models.Expense, "expense", user["id"], [_expense(10_000)])
+
+    # a reader misses the cache and loads the ledger after the row is committed but before
+    # the after-commit hooks bumped the version and applied the patch: its rows already
+    # contain the write, and it is stored under the version the patch is based on
+    def load_mid_commit(session):
+        if user["id"] in session.info.get("ledger_patches", {}):
+            _load(user["id"])
+
+    event.listen(Session, "after_commit", load_mid_commit, insert=True)
+    try:
+        with SessionLocal() as db:
+            create_records(db, models.Expense, "expense", user["id"], [_expense(5_000)])
+    finally:
+        event.remove(Session, "after_commit", load_mid_commit)
+
+    assert _total(user["id"]) == 15_000
+    assert _load(user["id"]).bucket_totals(YEAR)[0]["total_expense"] == 15_000
@@ -0,0 +1,29 @@
+# tests/test_metrics.py
+from routers import internal_router, metrics_router
+
+
+def test_metrics_require_the_token(client, internal_headers):
+    assert client.get("/metrics").status_code == 404
+    assert client.get("/metrics", headers={"Authorization": "Bearer wrong"}).status_code == 404
+    assert client.get("/metrics", headers=internal_headers).status_code == 200
+    response = client.get("/metrics", headers={"Authorization": "Bearer " + internal_headers["X-Internal-Token"]})
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+    assert "# TYPE http_request_duration_seconds histogram" in response.text
+
+
+def test_metrics_are_closed_without_a_configured_token(client, monkeypatch):
+    monkeypatch.setattr(internal_router, "INTERNAL_STATS_TOKEN", "")
+    assert client.get("/metrics").status_code == 404
+
+
+def test_metrics_public_opt_in(client, monkeypatch):
+    monkeypatch.setattr(metrics_router, "METRICS_PUBLIC", True)
+    assert client.get("/metrics").status_code == 200
+
+
+def test_requests_are_recorded_per_route(client, user, internal_headers):
+    client.get("/expenses/?year=2025&month=3", headers=user["headers"])
+    text = client.get("/metrics", headers=internal_headers).text
+    assert 'http_requests_total{method="GET",route="/expenses/",status="200"}' in text
+    assert 'http_request_db_statements_count{method="GET",route="/expenses/"}' in text
@@ -0,0 +1,18 @@
+# tests/test_passwords.py
+from utils.passwords import password_pool
+
+
+def test_login_after_a_worker_died(client, user):
+    broken = password_pool._executor
+    assert broken is not None
+    for process in list(broken._processes.values()):
+        process.kill()
+        process.join()
+
+    response = client.post("/auth/login", json={"email": user["email"], "password": user["password"]})
+    assert response.status_code == 200, response.text
+    assert password_pool._executor is not broken
+    assert password_pool.stats()["restarts"] >= 1
+    # and the fresh pool keeps serving
+    response = client.post("/auth/login", json={"email": user["email"], "password": "salah"})
+    assert response.status_code == 401
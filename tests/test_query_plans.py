@@ -0,0 +1,106 @@
+# tests/test_query_plans.py
+"""The ledger, summary and rollup queries must range-scan the (user_id, date) indexes.
+
+The statements are captured while the real endpoints run and then fed to
+SQLite's EXPLAIN QUERY PLAN, so a query change that falls back to a full
+table scan fails here.
+"""
+import re
+from contextlib import contextmanager
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+import database
+from database import SessionLocal
+from utils import rollup
+
+# table -> indexes a plan may use for it
+INDEXES = {
+    "incomes": ("idx_income_user_date", "idx_income_user_category_date"),
+    "expenses": ("idx_expense_user_date", "idx_expense_user_category_date"),
+    "daily_totals": ("sqlite_autoindex_daily_totals_1",),  # primary key (user_id, date, ...)
+}
+# "SEARCH incomes USING INDEX idx_income_user_date (user_id=? AND date>? AND date<?)"
+_PLAN_RE = re.compile(r"\b(SCAN|SEARCH) (\w+)(?: USING (?:COVERING )?INDEX (\w+)(?: \(([^)]*)\))?)?")
+
+
+@contextmanager
+def captured():
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if not executemany and statement.lstrip().upper().startswith(("SELECT", "INSERT INTO DAILY_TOTALS")):
+            statements.append((statement, parameters))
+
+    event.listen(Engine, "before_cursor_execute", record)
+    try:
+        yield statements
+    finally:
+        event.remove(Engine, "before_cursor_execute", record)
+
+
+def _plans(statements) -> list:
+    """(operation, table, index, index constraint, plan line, statement) for every step on a table in INDEXES."""
+    steps = []
+    with database.engine.connect() as conn:
+        for statement, parameters in statements:
+            for row in conn.exec_driver_sql("EXPLAIN QUERY PLAN " + statement, parameters):
+                match = _PLAN_RE.search(row[-1])
+                if match and match.group(2) in INDEXES:
+                    steps.append((*match.groups(), row[-1], statement))
+    return steps
+
+
+def _plan_problems(steps) -> list:
+    return [(detail, statement) for operation, table, index, _, detail, statement in steps
+            if operation != "SEARCH" or index not in INDEXES[table]]
+
+
+def _date_ranges(steps) -> set:
+    """(table, index) pairs that were range-scanned on date, not only looked up by user_id."""
+    return {(table, index) for _, table, index, constraint, _, _ in steps if constraint and "date<" in constraint}
+
+
+def _seed(client, user):
+    for kind in ("income", "expense"):
+        body = [{"title": f"{kind} {i}", "amount": 1000 * (i + 1), "date": f"2025-03-{i % 28 + 1:02d}"} for i in range(20)]
+        assert client.post(f"/{kind}s/", json=body, headers=user["headers"]).status_code == 200
+
+
+def test_read_queries_use_the_user_date_indexes(client, user):
+    _seed(client, user)
+    urls = [
+        "/transactions?year=2025&month=3&limit=5",
+        "/expenses/?year=2025&month=3&limit=5",
+        "/incomes/?year=2025&limit=5",
+        "/summary/daily?date=2025-03-02",
+        "/summary/monthly?year=2025&month=3",
+        "/summary/yearly?year=2025",
+        "/summary/series?start=2025-01-01&end=2025-12-31&granularity=week&group_by=category",
+        "/transactions/summary/monthly?year=2025",
+        "/transactions/summary/weekly?year=2025&month=3",
+    ]
+    with captured() as statements:
+        for url in urls:
+            assert client.get(url, headers=user["headers"]).status_code == 200, url
+    assert any("incomes" in s and "expenses" in s for s, _ in statements), "ledger query not captured"
+    assert any("daily_totals" in s for s, _ in statements), "summary query not captured"
+    steps = _plans(statements)
+    assert _plan_problems(steps) == []
+    # by name: a plan on the old single-column user_id index must not pass for a range scan
+    assert _date_ranges(steps) >= {
+        ("incomes", "idx_income_user_date"),
+        ("expenses", "idx_expense_user_date"),
+        ("daily_totals", "sqlite_autoindex_daily_totals_1"),
+    }
+
+
+def test_rollup_rebuild_uses_the_user_date_indexes(user):
+    with captured() as statements, SessionLocal() as db:
+        rollup.rebuild(db, user["id"])
+        db.rollback()
+    assert any("incomes" in s for s, _ in statements)
+    steps = _plans(statements)
+    assert _plan_problems(steps) == []
+    assert {table for _, table, *_ in steps} >= {"incomes", "expenses"}
@@ -0,0 +1,38 @@
+# tests/test_records.py
+import pytest
+
+import models
+from database import SessionLocal
+from utils.records import create_records
+
+
+@pytest.mark.parametrize("path", ["/expenses/", "/incomes/"])
+def test_empty_batch_is_rejected(client, user, path):
+    response = client.post(path, json=[], headers=user["headers"])
+    assert response.status_code == 422
+    assert client.get(path, headers=user["headers"]).json()["data"] == []
+
+
+def test_create_records_without_payloads_writes_nothing(user):
+    with SessionLocal() as db:
+        assert create_records(db, models.Expense, "expense", user["id"], []) == []
+        assert db.query(models.Expense).filter(models.Expense.user_id == user["id"]).count() == 0
+
+
+@pytest.mark.parametrize("kind", ["expense", "income"])
+def test_bulk_create_statement_count_does_not_grow_with_the_batch(client, user, count_statements, kind):
+    category_id = next(c["id"] for c in client.get("/categories/", headers=user["headers"]).json() if c["type"] == kind)
+
+    def body(n):
+        return [{"title": f"{kind} {i}", "amount": 1000 + i, "category_id": category_id if i % 2 == 0 else None,
+                 "date": f"2025-03-{i % 28 + 1:02d}"} for i in range(n)]
+
+    client.post(f"/{kind}s/", json=body(1), headers=user["headers"])  # warm the principal cache
+    counts = {}
+    for n in (1, 50):
+        with count_statements() as executed:
+            response = client.post(f"/{kind}s/", json=body(n), headers=user["headers"])
+        assert response.status_code == 200, response.text
+        assert len(response.json()) == n
+        counts[n] = len(executed)
+    assert counts[1] == counts[50]
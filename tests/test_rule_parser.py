@@ -0,0 +1,68 @@
+# tests/test_rule_parser.py
+"""The labelled corpus in benchmarks/parser_corpus.jsonl as a regression gate.
+
+Every labelled phrase is checked against every extractor. The parser's known
+mismatches are listed in KNOWN_MISMATCHES and run as strict xfails: a change
+that breaks another phrase fails, and so does one that fixes a listed phrase
+without taking it off the list.
+"""
+import pytest
+
+from benchmarks.parser import EXTRACTORS, load_corpus
+
+# extractor -> phrases the parser gets wrong today (the labels are the right answers)
+KNOWN_MISMATCHES = {
+    "_extract_amount_from_text": {
+        "tanggal 1 bulan 1 2025",  # the year is taken as the amount
+        "bayar listrik empat ratus ribu",  # "N ratus" is not a number word
+    },
+    "_extract_category_from_text": {
+        # "beli" (belanja) is matched before the item
+        "beli pulsa 100k",
+        "beli obat di apotek 75rb",
+        "beli token listrik 200rb",
+        "beli vitamin 89.900",
+        "dua hari lalu beli game 250 ribu",
+        # "es" (minuman) matches inside longer words
+        "dapat bonus 2.5 juta 25 desember",
+        "terima transfer dari klien sebesar 3 juta",
+        "bayar asuransi kesehatan Rp500.000",
+        "klinik gigi tanggal 3 bulan 4 2025 sebesar 400rb",
+    },
+    "_has_transaction_content": {
+        # no word from the action list
+        "nonton bioskop 50 ribu",
+        "top up spotify 55rb",
+        "penghasilan freelance lima juta",
+        "sarapan bubur ayam 12rb hari ini",
+        "dokter gigi 350 ribu kemarin",
+        "karaoke bareng teman 150rb",
+        "netflix bulanan 186rb",
+        "hadiah ulang tahun adik 250rb",
+        "transfer ke ibu 1jt",
+        "cappuccino 35k hari ini",
+        "angkot 5rb",
+    },
+}
+
+
+def _cases():
+    for name, (_, key, _) in EXTRACTORS.items():
+        known = KNOWN_MISMATCHES.get(name, set())
+        for item in load_corpus():
+            if key in item:
+                marks = [pytest.mark.xfail(strict=True, reason="known mismatch")] if item["text"] in known else []
+                yield pytest.param(name, item["text"], item[key], marks=marks, id=f"{name}:{item['text']}")
+
+
+@pytest.mark.parametrize("name, text, expected", list(_cases()))
+def test_corpus_label(name, text, expected):
+    fn, _, value = EXTRACTORS[name]
+    assert value(fn(text)) == expected
+
+
+def test_known_mismatches_are_in_the_corpus():
+    texts = {item["text"] for item in load_corpus()}
+    for name, known in KNOWN_MISMATCHES.items():
+        assert name in EXTRACTORS
+        assert known <= texts, known - texts
@@ -0,0 +1,28 @@
+# tests/test_series.py
+from datetime import date
+
+import pytest
+
+from utils import series as series_module
+from utils.periods import GRANULARITIES, bucket_count, buckets
+
+
+@pytest.mark.parametrize("granularity", GRANULARITIES)
+@pytest.mark.parametrize("start, end", [
+    (date(2025, 1, 1), date(2025, 1, 1)),
+    (date(2025, 1, 15), date(2025, 1, 16)),
+    (date(2024, 2, 29), date(2025, 3, 1)),
+    (date(2023, 11, 30), date(2026, 7, 2)),
+])
+def test_bucket_count_matches_buckets(start, end, granularity):
+    assert bucket_count(start, end, granularity) == len(buckets(start, end, granularity))
+
+
+def test_oversized_range_is_rejected_before_building_buckets(client, user, monkeypatch):
+    def fail(*args):
+        raise AssertionError("buckets() built for a rejected range")
+    monkeypatch.setattr(series_module, "buckets", fail)
+    response = client.get("/summary/series", params={"start": "0001-01-01", "end": "9000-12-31", "granularity": "day"},
+                          headers=user["headers"])
+    assert response.status_code == 400
+    assert str(series_module.MAX_BUCKETS) in response.json()["detail"]
@@ -0,0 +1,71 @@
+# tests/test_transactions.py
+import random
+from datetime import date, timedelta
+
+import pytest
+
+
+def _seed(client, user, per_kind: int = 30):
+    """Incomes and expenses spread over March 2025, several on the same day."""
+    rng = random.Random(8)
+    categories = client.get("/categories/", headers=user["headers"]).json()
+    created = set()
+    for kind in ("income", "expense"):
+        own = [c["id"] for c in categories if c["type"] == kind] + [None]
+        body = [{"title": f"{kind} {i}", "amount": rng.randint(1, 500) * 1000, "category_id": rng.choice(own),
+                 "date": str(date(2025, 3, 1) + timedelta(days=rng.randint(0, 30)))} for i in range(per_kind)]
+        response = client.post(f"/{kind}s/", json=body, headers=user["headers"])
+        assert response.status_code == 200, response.text
+        created |= {(kind, record["id"]) for record in response.json()}
+    # outside the month: must not show up
+    client.post("/expenses/", json={"title": "April", "amount": 1000, "date": "2025-04-01"}, headers=user["headers"])
+    return created
+
+
+def test_every_page_is_one_statement_and_the_pages_cover_the_ledger(client, user, count_statements):
+    created = _seed(client, user)
+    client.get("/transactions?year=2025&month=3&limit=1", headers=user["headers"])  # warm the principal cache
+
+    seen, cursor, pages = [], None, 0
+    while True:
+        url = "/transactions?year=2025&month=3&limit=7" + (f"&cursor={cursor}" if cursor else "")
+        with count_statements() as executed:
+            body = client.get(url, headers=user["headers"]).json()
+        assert len(executed) == 1, executed
+        seen.extend(body["data"])
+        pages += 1
+        cursor = body["next_cursor"]
+        if not cursor:
+            break
+
+    assert pages == -(-len(created) // 7)
+    assert len(seen) == len(created)
+    assert {(t["type"], t["id"]) for t in seen} == created
+    # newest first, incomes before expenses on the same day
+    keys = [(t["date"], t["type"] == "income", t["id"]) for t in seen]
+    assert keys == sorted(keys, reverse=True)
+    totals = body["summary"]
+    assert totals["total_income"] == sum(t["amount"] for t in seen if t["type"] == "income")
+    assert totals["total_expense"] == sum(t["amount"] for t in seen if t["type"] == "expense")
+
+
+@pytest.mark.parametrize("incomes, expenses", [(0, 0), (1, 0), (0, 1), (3, 40), (40, 3)])
+def test_ledger_page_is_one_statement_whatever_the_data(client, user, count_statements, incomes, expenses):
+    for kind, n in (("income", incomes), ("expense", expenses)):
+        if n:
+            body = [{"title": f"{kind} {i}", "amount": 1000, "date": f"2025-03-{i % 28 + 1:02d}"} for i in range(n)]
+            assert client.post(f"/{kind}s/", json=body, headers=user["headers"]).status_code == 200
+    client.get("/categories/", headers=user["headers"])  # warm the principal cache
+
+    for query in ("year=2025&month=3&limit=10", "year=2025&month=3&start_date=2025-01-01&end_date=2025-12-31&limit=10"):
+        cursor, rows = None, 0
+        while True:
+            url = f"/transactions?{query}" + (f"&cursor={cursor}" if cursor else "")
+            with count_statements() as executed:
+                body = client.get(url, headers=user["headers"]).json()
+            assert len(executed) == 1, (url, executed)
+            rows += len(body["data"])
+            cursor = body["next_cursor"]
+            if not cursor:
+                break
+        assert rows == incomes + expenses
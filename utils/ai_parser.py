@@ -1,60 +1,272 @@
 # utils/ai_parser.py
+import os
 import re
 import json
+import queue
+import threading
+import time
+from contextlib import contextmanager
 from datetime import datetime, timedelta
-from typing import Dict, Any
-from .rule_parser import _extract_date_from_text, _extract_category_from_text, _extract_amount_from_text, _has_transaction_content
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, List
+from .rule_parser import analyze_text
+from .cache import make_cache
+from . import metrics
 
 try:
+    import llama_cpp
     from llama_cpp import Llama
     _LLAMA_AVAILABLE = True
 except Exception:
+    llama_cpp = None  # type: ignore
     Llama = None  # type: ignore
     _LLAMA_AVAILABLE = False
 
+MODEL_PATH = os.getenv("AI_MODEL_PATH", "./models/DeepSeek-R1-Distill-Qwen-1.5B-Q8_0.gguf")
+MODEL_THREADS = int(os.getenv("AI_MODEL_THREADS", "4"))
+MODEL_CTX = int(os.getenv("AI_MODEL_CTX", "2048"))
+MODEL_POOL_SIZE = int(os.getenv("AI_MODEL_POOL_SIZE", "1"))
+MODEL_POOL_TIMEOUT = float(os.getenv("AI_MODEL_POOL_TIMEOUT", "30"))
+# Rule-only results at or above this confidence skip the model (set > 1 to always use it)
+RULE_MIN_CONFIDENCE = float(os.getenv("AI_RULE_MIN_CONFIDENCE", "1.0"))
+RULE_WEIGHTS = {"amount": 0.4, "category": 0.2, "type": 0.2, "title": 0.2}
 
+# Parse-result cache: "memory" (per process), "sqlite" (shared by workers on this host) or "none"
+PARSE_CACHE_BACKEND = os.getenv("PARSE_CACHE_BACKEND", "memory")
+PARSE_CACHE_SIZE = int(os.getenv("PARSE_CACHE_SIZE", "2048"))
+PARSE_CACHE_TTL = float(os.getenv("PARSE_CACHE_TTL", "3600"))
+PARSE_CACHE_PATH = os.getenv("PARSE_CACHE_PATH", "./cache/parse_cache.sqlite3")
+_WHITESPACE_RE = re.compile(r"\s+")
 
 
+class ModelPoolTimeout(Exception):
+    pass
 
-def parse_expense_text(text: str) -> Dict[str, Any]:
-    """Parse Indonesian natural-language expense text into structured dict using AI model.
 
-    Returns dict with keys: title, amount (int in IDR), date (YYYY-MM-DD), category, type.
-    On failure returns {'error': 'message'}
+class ModelPool:
+    """Process-wide pool of loaded Llama instances.
+
+    Instances are created lazily up to `size` and reused across requests. A Llama
+    object is not safe to share between threads, so each request checks one out
+    exclusively and waits at most `timeout` seconds for one to become free.
+    """
+
+    def __init__(self, size: int, timeout: float):
+        self.size = max(1, size)
+        self.timeout = timeout
+        # set_model_loader() replaces llama-cpp, e.g. with a stub for benchmarks
+        self.loader = None
+        self._idle: "queue.LifoQueue" = queue.LifoQueue()
+        self._created = 0
+        self._lock = threading.Lock()
+
+    @property
+    def available(self) -> bool:
+        return self.loader is not None or (_LLAMA_AVAILABLE and Llama is not None)
+
+    def _load(self):
+        started = time.perf_counter()
+        if self.loader is not None:
+            llm = self.loader()
+        else:
+            llm = Llama(model_path=MODEL_PATH,
+                        n_threads=MODEL_THREADS,
+                        n_ctx=MODEL_CTX,
+                        verbose=False)
+        metrics.model_load.observe(time.perf_counter() - started)
+        return llm
+
+    def _checkout(self):
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+
+        with self._lock:
+            can_create = self._created < self.size
+            if can_create:
+                self._created += 1
+        if can_create:
+            try:
+                return self._load()
+            except Exception:
+                with self._lock:
+                    self._created -= 1
+                raise
+
+        try:
+            return self._idle.get(timeout=self.timeout)
+        except queue.Empty:
+            raise ModelPoolTimeout(f"tidak ada model AI yang bebas setelah {self.timeout:.0f} detik")
+
+    @contextmanager
+    def acquire(self):
+        started = time.perf_counter()
+        llm = self._checkout()
+        metrics.model_wait.observe(time.perf_counter() - started)
+        try:
+            yield llm
+        finally:
+            self._idle.put(llm)
+
+    def warmup(self) -> None:
+        """Load every instance up front so the first requests don't pay the load."""
+        loaded = []
+        try:
+            while True:
+                with self._lock:
+                    if self._created >= self.size:
+                        break
+                    self._created += 1
+                try:
+                    loaded.append(self._load())
+                except Exception:
+                    with self._lock:
+                        self._created -= 1
+                    raise
+        finally:
+            for llm in loaded:
+                self._idle.put(llm)
+
+    def stats(self) -> Dict[str, int]:
+        return {"size": self.size, "loaded": self._created, "idle": self._idle.qsize()}
+
+
+model_pool = ModelPool(MODEL_POOL_SIZE, MODEL_POOL_TIMEOUT)
+
+
+def set_model_loader(loader) -> None:
+    """Create pool instances with `loader()` instead of llama-cpp; None restores the default.
+
+    An instance is anything callable like Llama: llm(prompt, max_tokens=..., temperature=...,
+    stop=[...]) -> {"choices": [{"text": "..."}]}. Idle instances from the previous loader
+    are dropped; call it while no parse is running."""
+    model_pool.loader = loader
+    while True:
+        try:
+            model_pool._idle.get_nowait()
+        except queue.Empty:
+            break
+        with model_pool._lock:
+            model_pool._created -= 1
+
+parse_cache = make_cache(PARSE_CACHE_BACKEND, PARSE_CACHE_SIZE, PARSE_CACHE_TTL, PARSE_CACHE_PATH, table="parse_cache")
+
+
+def preload_models() -> bool:
+    """Load the model pool at startup. Returns False if llama-cpp is not installed."""
+    if not model_pool.available:
+        return False
+    model_pool.warmup()
+    return True
+
+
+
+def _rule_confidence(rules: Dict[str, Any]) -> float:
+    return round(sum(weight for key, weight in RULE_WEIGHTS.items() if rules.get(key)), 2)
+
+
+def _rule_only(text: str, rules: Dict[str, Any]) -> Dict[str, Any] | None:
+    """Build the final result from the rule pass alone, or None if the model is needed."""
+    confidence = _rule_confidence(rules)
+    if not rules["amount"] or confidence < RULE_MIN_CONFIDENCE:
+        return None
+    return {
+        "title": rules["title"] or text[:50],
+        "amount": rules["amount"],
+        "date": rules["date"] or datetime.utcnow().date().strftime("%Y-%m-%d"),
+        "category": rules["category"] or "other",
+        "type": rules["type"] or "expense",
+        "source": "rule",
+        "confidence": confidence,
+    }
+
+
+def _pre_parse(text: str) -> Dict[str, Any]:
+    """Validation and rule pass that run before the model is touched.
+
+    Returns {'text': ..., 'rules': ...} when the model is needed, {'parsed': ...}
+    when the rules were confident enough, or {'error': 'message'}.
     """
     text = (text or "").strip()
     if not text:
         return {"error": "text is empty"}
 
+    # ✅ PRE-PROCESS: one pass of the rule engine gives content check, date, category and amount
+    try:
+        rules = analyze_text(text)
+    except Exception as e:
+        return {"error": f"AI parsing gagal: {str(e)}"}
+
     # ✅ VALIDASI AWAL: Check if text contains actual transaction content
-    if not _has_transaction_content(text):
+    if not rules["has_content"]:
         return {"error": "Teks tidak mengandung informasi transaksi. Silakan sebutkan apa yang dibeli/dibayar dan nominalnya. Contoh: 'beli kopi 15rb kemarin'"}
 
+    # ✅ FAST PATH: the rules already know everything the model would add
+    parsed = _rule_only(text, rules)
+    if parsed is not None:
+        print(f"⚡ Rule-only result (confidence {parsed['confidence']}): {parsed}")
+        return {"parsed": parsed}
+
     # Check if AI model is available
-    if not _LLAMA_AVAILABLE or Llama is None:
+    if not model_pool.available:
         return {"error": "AI model (llama-cpp-python) tidak tersedia. Install dengan: pip install llama-cpp-python"}
 
+    # ✅ Date, category, and amount from regex (faster & more reliable)
+    print(f"🔍 Pre-processing:")
+    print(f"   - Detected date: {rules['date']}")
+    print(f"   - Detected category: {rules['category']}")
+    print(f"   - Detected amount: {rules['amount']}")
+
+    # ✅ VALIDASI: Amount harus ada
+    if rules["amount"] is None:
+        return {"error": "Nominal/harga tidak disebutkan dalam teks. Silakan tambahkan jumlah uang. Contoh: '15rb', 'Rp15.000', '15ribu', '10 juta'"}
+
+    return {"text": text, "rules": rules}
+
+
+def _llama_perf(llm, reset: bool = False):
+    """(prompt eval, generation) seconds from llama.cpp's perf counters, None where not exposed."""
+    ctx = getattr(getattr(llm, "_ctx", None), "ctx", None)
+    if ctx is None or not hasattr(llama_cpp, "llama_perf_context_reset"):
+        return None
+    if reset:
+        llama_cpp.llama_perf_context_reset(ctx)
+        return None
+    data = llama_cpp.llama_perf_context(ctx)
+    return data.t_p_eval_ms / 1000, data.t_eval_ms / 1000
+
+
+def _complete(llm, prompt: str, **kwargs):
+    """Run one completion and record its timings and token counts."""
     try:
-        # ✅ PRE-PROCESS: Extract date, category, and amount using regex (faster & more reliable)
-        detected_date = _extract_date_from_text(text)
-        detected_category = _extract_category_from_text(text)
-        detected_amount = _extract_amount_from_text(text)
-        
-        print(f"🔍 Pre-processing:")
-        print(f"   - Detected date: {detected_date}")
-        print(f"   - Detected category: {detected_category}")
-        print(f"   - Detected amount: {detected_amount}")
-        
-        # ✅ VALIDASI: Amount harus ada
-        if detected_amount is None:
-            return {"error": "Nominal/harga tidak disebutkan dalam teks. Silakan tambahkan jumlah uang. Contoh: '15rb', 'Rp15.000', '15ribu', '10 juta'"}
-
-        # Initialize AI model
-        llm = Llama(model_path="./models/DeepSeek-R1-Distill-Qwen-1.5B-Q8_0.gguf", 
-                    n_threads=4, 
-                    n_ctx=2048,
-                    verbose=False)
-        
+        _llama_perf(llm, reset=True)
+    except Exception:
+        pass
+    started = time.perf_counter()
+    resp = llm(prompt, **kwargs)
+    metrics.model_inference.observe(time.perf_counter() - started, "total")
+    try:
+        phases = _llama_perf(llm)
+    except Exception:
+        phases = None
+    if phases is not None:
+        metrics.model_inference.observe(phases[0], "prompt_eval")
+        metrics.model_inference.observe(phases[1], "generation")
+    usage = resp.get("usage") if isinstance(resp, dict) else None
+    if usage:
+        metrics.model_tokens.inc("prompt", amount=usage.get("prompt_tokens", 0))
+        metrics.model_tokens.inc("completion", amount=usage.get("completion_tokens", 0))
+    return resp
+
+
+def _infer(llm, text: str, rules: Dict[str, Any]) -> Dict[str, Any]:
+    """Run one prompt through a checked-out model and merge the rule results in."""
+    try:
+        detected_date = rules["date"]
+        detected_category = rules["category"]
+        detected_amount = rules["amount"]
+
         # Enhanced prompt with MORE DETAILED examples
         today = datetime.utcnow().date().strftime("%Y-%m-%d")
         yesterday = (datetime.utcnow().date() - timedelta(days=1)).strftime("%Y-%m-%d")
@@ -125,7 +337,7 @@ def parse_expense_text(text: str) -> Dict[str, Any]:
 
         # Get AI response
         print(f"🤖 Processing with AI...")
-        resp = llm(prompt, max_tokens=256, temperature=0.1, stop=["\n\n", "Input:", "SEKARANG", "OUTPUT"])
+        resp = _complete(llm, prompt, max_tokens=256, temperature=0.1, stop=["\n\n", "Input:", "SEKARANG", "OUTPUT"])
         
         # Extract response text
         out = ""
@@ -174,10 +386,98 @@ def parse_expense_text(text: str) -> Dict[str, Any]:
         if not parsed.get("amount") or parsed.get("amount") == 0:
             return {"error": "Nominal/harga tidak dapat dideteksi. Pastikan format benar. Contoh: '15rb', 'Rp15.000', '15000', '10 juta'"}
         
+        parsed["source"] = "ai"
+        parsed["confidence"] = _rule_confidence(rules)
         print(f"✅ Final parsed result: {parsed}")
         return parsed
         
     except json.JSONDecodeError as e:
         return {"error": f"AI menghasilkan JSON tidak valid: {str(e)}"}
     except Exception as e:
-        return {"error": f"AI parsing gagal: {str(e)}"}
\ No newline at end of file
+        return {"error": f"AI parsing gagal: {str(e)}"}
+
+
+def _model_error(e: Exception) -> Dict[str, Any]:
+    if isinstance(e, ModelPoolTimeout):
+        return {"error": f"AI sedang sibuk, coba lagi nanti: {str(e)}"}
+    return {"error": f"AI parsing gagal: {str(e)}"}
+
+
+def _cache_key(text: str) -> str:
+    # "kemarin"/"hari ini" resolve against today, so the same text parses
+    # differently after midnight: the date is part of the key
+    normalized = _WHITESPACE_RE.sub(" ", (text or "").strip().lower())
+    return f"{datetime.utcnow().date().isoformat()}|{normalized}"
+
+
+def _parse_uncached(text: str) -> Dict[str, Any]:
+    prepared = _pre_parse(text)
+    if "error" in prepared:
+        return prepared
+    if "parsed" in prepared:
+        return prepared["parsed"]
+
+    try:
+        with model_pool.acquire() as llm:
+            return _infer(llm, prepared["text"], prepared["rules"])
+    except Exception as e:
+        return _model_error(e)
+
+
+def parse_expense_text(text: str) -> Dict[str, Any]:
+    """Parse Indonesian natural-language expense text into structured dict using AI model.
+
+    Returns dict with keys: title, amount (int in IDR), date (YYYY-MM-DD), category, type,
+    source ('rule' when the model was skipped, else 'ai') and confidence (rule score, 0-1).
+    On failure returns {'error': 'message'}
+
+    Successful results are cached per (normalized text, today); callers get their own copy.
+    """
+    key = _cache_key(text)
+    cached = parse_cache.get(key)
+    if cached is not None:
+        return dict(cached)
+
+    result = _parse_uncached(text)
+    if "error" not in result:
+        parse_cache.set(key, dict(result))
+    return result
+
+
+def parse_expense_texts(texts: List[str]) -> List[Dict[str, Any]]:
+    """Parse many texts in one go; results come back in input order.
+
+    Cached texts are answered first, then the rule pass runs over the rest, so
+    texts that fail validation or that the rules can fully parse never reach the
+    model. The remainder is spread over the model pool: each worker checks an
+    instance out once and runs its whole share on it instead of queueing for the
+    pool per text.
+    """
+    keys = [_cache_key(text) for text in texts]
+    cached = [parse_cache.get(key) for key in keys]
+    prepared = [{"parsed": dict(hit)} if hit is not None else _pre_parse(text) for text, hit in zip(texts, cached)]
+    results: List[Dict[str, Any]] = [item.get("parsed", item) for item in prepared]
+    pending = [i for i, item in enumerate(prepared) if "rules" in item]
+
+    def run(indexes: List[int]) -> None:
+        try:
+            with model_pool.acquire() as llm:
+                for i in indexes:
+                    results[i] = _infer(llm, prepared[i]["text"], prepared[i]["rules"])
+        except Exception as e:
+            for i in indexes:
+                if results[i] is prepared[i]:
+                    results[i] = _model_error(e)
+
+    workers = min(model_pool.size, len(pending))
+    shares = [pending[w::workers] for w in range(workers)]
+    if workers == 1:
+        run(shares[0])
+    elif workers > 1:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            list(executor.map(run, shares))
+
+    for i, (key, hit) in enumerate(zip(keys, cached)):
+        if hit is None and "error" not in results[i]:
+            parse_cache.set(key, dict(results[i]))
+    return results
\ No newline at end of file
@@ -0,0 +1,215 @@
+# utils/job_queue.py
+import os
+import threading
+import time
+import uuid
+import multiprocessing
+from collections import OrderedDict, deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Dict
+
+
+class QueueFull(Exception):
+    pass
+
+
+class Job:
+    def __init__(self, user_id: int, payload: Dict[str, Any]):
+        self.id = uuid.uuid4().hex
+        self.user_id = user_id
+        self.payload = payload
+        self.status = "queued"
+        self.result: Dict[str, Any] | None = None
+        self.error: str | None = None
+        self.created_at = time.time()
+        self.started_at: float | None = None
+        self.finished_at: float | None = None
+        self.done = threading.Event()
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "job_id": self.id,
+            "status": self.status,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "result": self.result,
+            "detail": self.error,
+        }
+
+
+class JobQueue:
+    """Bounded job queue in front of a process pool, fair between users.
+
+    `work(text)` runs in a worker process and must be a picklable module-level
+    function. `on_result(job, output)` runs back in this process (on a small
+    thread pool) and its return value becomes `job.result`, e.g. the saved record.
+
+    Pending jobs are kept per user and dispatched round-robin, so one user with
+    many queued jobs can't starve the others. `max_depth` bounds all pending jobs
+    and `max_per_user` bounds each user's share; `submit` raises QueueFull past
+    either limit. Finished jobs are kept for `result_ttl` seconds.
+    """
+
+    def __init__(self, work: Callable, on_result: Callable, workers: int,
+                 max_depth: int = 200, max_per_user: int = 20, result_ttl: float = 900):
+        self.work = work
+        self.on_result = on_result
+        self.workers = max(1, workers)
+        self.max_depth = max_depth
+        self.max_per_user = max_per_user
+        self.result_ttl = result_ttl
+        self._pending: "OrderedDict[int, deque]" = OrderedDict()
+        self._depth = 0
+        self._inflight = 0
+        self._jobs: Dict[str, Job] = {}
+        self._cond = threading.Condition()
+        self._executor: ProcessPoolExecutor | None = None
+        self._finisher: ThreadPoolExecutor | None = None
+        self._dispatcher: threading.Thread | None = None
+        self._closed = False
+        self.restarts = 0
+
+    def _new_executor(self) -> ProcessPoolExecutor:
+        # spawn, not fork: the server process already runs threads
+        return ProcessPoolExecutor(max_workers=self.workers, mp_context=multiprocessing.get_context("spawn"))
+
+    def _start(self) -> None:
+        self._executor = self._new_executor()
+        self._finisher = ThreadPoolExecutor(max_workers=2, thread_name_prefix="ai-job-finish")
+        self._dispatcher = threading.Thread(target=self._dispatch_loop, name="ai-job-dispatch", daemon=True)
+        self._dispatcher.start()
+
+    def submit(self, user_id: int, payload: Dict[str, Any]) -> Job:
+        with self._cond:
+            if self._closed:
+                raise QueueFull("job queue is shut down")
+            self._prune()
+            if self._depth >= self.max_depth:
+                raise QueueFull("antrian AI penuh, coba lagi nanti")
+            user_queue = self._pending.get(user_id)
+            if user_queue is not None and len(user_queue) >= self.max_per_user:
+                raise QueueFull(f"maksimal {self.max_per_user} job AI menunggu per user")
+            if self._dispatcher is None:
+                self._start()
+            job = Job(user_id, payload)
+            self._jobs[job.id] = job
+            if user_queue is None:
+                self._pending[user_id] = user_queue = deque()
+            user_queue.append(job)
+            self._depth += 1
+            self._cond.notify_all()
+        return job
+
+    def get(self, job_id: str) -> Job | None:
+        return self._jobs.get(job_id)
+
+    def _next_job(self) -> Job:
+        # round-robin: take the first user's oldest job, move that user to the back
+        user_id, user_queue = self._pending.popitem(last=False)
+        job = user_queue.popleft()
+        if user_queue:
+            self._pending[user_id] = user_queue
+        self._depth -= 1
+        return job
+
+    def _dispatch_loop(self) -> None:
+        while True:
+            with self._cond:
+                while not self._closed and (not self._pending or self._inflight >= self.workers):
+                    self._cond.wait()
+                if self._closed:
+                    return
+                job = self._next_job()
+                self._inflight += 1
+            job.status = "running"
+            job.started_at = time.time()
+            executor = self._executor
+            try:
+                try:
+                    future = executor.submit(self.work, job.payload["text"])
+                except BrokenProcessPool:
+                    executor = self._reset_executor(executor)
+                    future = executor.submit(self.work, job.payload["text"])
+            except Exception as e:
+                self._finish(job, None, e)
+                continue
+            future.add_done_callback(lambda f, job=job, executor=executor: self._on_done(job, f, executor))
+
+    def _reset_executor(self, broken: ProcessPoolExecutor) -> ProcessPoolExecutor:
+        """Replace `broken` (a worker died: OOM, segfault, kill) with a fresh pool and return the current one."""
+        with self._cond:
+            if self._executor is broken and not self._closed:
+                self._executor = self._new_executor()
+                self.restarts += 1
+            current = self._executor
+        if current is not broken:
+            broken.shutdown(wait=False, cancel_futures=True)
+        return current
+
+    def _on_done(self, job: Job, future, executor: ProcessPoolExecutor) -> None:
+        # runs on the executor's management thread: hand the DB work off
+        try:
+            self._finisher.submit(self._complete, job, future, executor)
+        except RuntimeError as e:
+            self._finish(job, None, e)
+
+    def _complete(self, job: Job, future, executor: ProcessPoolExecutor) -> None:
+        try:
+            output = future.result()
+        except BrokenProcessPool:
+            # every job in flight on that pool ends here; the next ones get a fresh pool
+            self._reset_executor(executor)
+            self._finish(job, None, RuntimeError("proses AI berhenti mendadak, silakan kirim ulang"))
+            return
+        except Exception as e:
+            self._finish(job, None, e)
+            return
+        try:
+            self._finish(job, self.on_result(job, output), None)
+        except Exception as e:
+            self._finish(job, None, e)
+
+    def _finish(self, job: Job, result, error: Exception | None) -> None:
+        job.result = result
+        job.error = str(error) if error else None
+        job.status = "failed" if error else "done"
+        job.finished_at = time.time()
+        with self._cond:
+            self._inflight -= 1
+            self._cond.notify_all()
+        job.done.set()
+
+    def _prune(self) -> None:
+        cutoff = time.time() - self.result_ttl
+        expired = [job_id for job_id, job in self._jobs.items() if job.finished_at and job.finished_at < cutoff]
+        for job_id in expired:
+            del self._jobs[job_id]
+
+    def stats(self) -> Dict[str, Any]:
+        with self._cond:
+            return {
+                "workers": self.workers,
+                "queued": self._depth,
+                "running": self._inflight,
+                "users_waiting": len(self._pending),
+                "tracked_jobs": len(self._jobs),
+                "max_depth": self.max_depth,
+                "max_per_user": self.max_per_user,
+                "restarts": self.restarts,
+            }
+
+    def shutdown(self) -> None:
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+        if self._finisher is not None:
+            self._finisher.shutdown(wait=False)
+
+
+def default_workers(threads_per_model: int) -> int:
+    """One worker per `threads_per_model` cores; each worker loads its own model."""
+    return max(1, (os.cpu_count() or 1) // max(1, threads_per_model))
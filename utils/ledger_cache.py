@@ -0,0 +1,261 @@
+# utils/ledger_cache.py
+"""Per-user columnar copy of the ledger for the summary endpoints.
+
+A user's incomes and expenses are loaded once into NumPy arrays, sorted by
+date: day ordinals, amounts, category ids (0 = none) and an income flag.
+Period summaries are then a `searchsorted` for the range plus `bincount`
+per bucket, with no per-row Python and no database round trip.
+
+Each entry remembers the user's data version (utils/summary_cache.py) and
+is reloaded once the version moves on. With the per-process version store
+(SUMMARY_CACHE_BACKEND=memory) this process sees every write, so instead of
+a reload the entry is patched: the rollup helpers every income/expense write
+already goes through queue the change with `note_records` / `note_detach`,
+and it is applied after commit. A patch is skipped (and the entry dropped)
+when the entry finished loading after the write was queued: its rows may
+already contain the write, and applying it again would count it twice.
+With a shared store another worker may have written too, so entries are
+only reloaded.
+
+Least recently used users are evicted first, so the arrays together stay
+under LEDGER_CACHE_MAX_MB. The cache is optional: without NumPy, with
+LEDGER_CACHE_MAX_MB=0 or with SUMMARY_CACHE_BACKEND=none (no versions to
+check against) `get_ledger` returns None and callers query the database.
+"""
+import itertools
+import os
+import threading
+from collections import OrderedDict
+from datetime import date
+from typing import Iterable, List, Mapping, Sequence
+
+from sqlalchemy import event, select
+from sqlalchemy.orm import Session
+
+import models
+from .summary_cache import SUMMARY_CACHE_BACKEND, data_version
+
+try:
+    import numpy as np
+except ImportError:  # optional dependency
+    np = None
+
+LEDGER_CACHE_MAX_MB = float(os.getenv("LEDGER_CACHE_MAX_MB", "64"))
+LEDGER_CACHE_USERS = int(os.getenv("LEDGER_CACHE_USERS", "1000"))
+ENABLED = np is not None and LEDGER_CACHE_MAX_MB > 0 and SUMMARY_CACHE_BACKEND != "none"
+PATCH_ON_WRITE = ENABLED and SUMMARY_CACHE_BACKEND == "memory"
+
+# orders ledger loads against queued writes (next() on a count is atomic)
+_ticks = itertools.count()
+
+
+class Ledger:
+    """One user's ledger as parallel arrays sorted by day."""
+    __slots__ = ("days", "amounts", "categories", "income", "version", "loaded_at")
+
+    def __init__(self, days, amounts, categories, income, version: int, loaded_at: int):
+        order = np.argsort(days, kind="stable")
+        self.days = days[order]
+        self.amounts = amounts[order]
+        self.categories = categories[order]
+        self.income = income[order]
+        self.version = version
+        # tick taken after the rows were read; patches keep it
+        self.loaded_at = loaded_at
+
+    @property
+    def nbytes(self) -> int:
+        return self.days.nbytes + self.amounts.nbytes + self.categories.nbytes + self.income.nbytes
+
+    def bucket_totals(self, edges: Sequence[date]) -> List[dict]:
+        """Income/expense totals and counts per half-open period [edges[i], edges[i+1])."""
+        bounds = np.array([d.toordinal() for d in edges], dtype=np.int32)
+        lo, hi = np.searchsorted(self.days, [bounds[0], bounds[-1]])
+        buckets = np.searchsorted(bounds, self.days[lo:hi], side="right") - 1
+        amounts, income = self.amounts[lo:hi], self.income[lo:hi]
+        n = len(bounds) - 1
+        incomes = np.bincount(buckets, weights=np.where(income, amounts, 0.0), minlength=n)
+        expenses = np.bincount(buckets, weights=np.where(income, 0.0, amounts), minlength=n)
+        counts = np.bincount(buckets, minlength=n)
+        return [
+            {"total_income": float(incomes[i]), "total_expense": float(expenses[i]), "transaction_count": int(counts[i])}
+            for i in range(n)
+        ]
+
+
+def _columns(rows, is_income: bool):
+    rows = list(rows)
+    return (
+        np.fromiter((r[0].toordinal() for r in rows), dtype=np.int32, count=len(rows)),
+        np.fromiter((r[1] for r in rows), dtype=np.float64, count=len(rows)),
+        np.fromiter((r[2] or 0 for r in rows), dtype=np.int32, count=len(rows)),
+        np.full(len(rows), is_income, dtype=bool),
+    )
+
+
+def _concat(parts, version: int, loaded_at: int) -> Ledger:
+    return Ledger(*(np.concatenate(column) for column in zip(*parts)), version=version, loaded_at=loaded_at)
+
+
+class LedgerCache:
+    def __init__(self, max_bytes: int, max_users: int):
+        self.max_bytes = max_bytes
+        self.max_users = max(1, max_users)
+        self._entries: "OrderedDict[int, Ledger]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.loads = 0
+        self.patches = 0
+        self.evictions = 0
+
+    def get(self, user_id: int, version: int) -> Ledger | None:
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is None or entry.version != version:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(user_id)
+            self.hits += 1
+            return entry
+
+    def put(self, user_id: int, entry: Ledger) -> None:
+        with self._lock:
+            self._replace(user_id, entry)
+            self.loads += 1
+
+    def _replace(self, user_id: int, entry: Ledger | None) -> None:
+        old = self._entries.pop(user_id, None)
+        if old is not None:
+            self._bytes -= old.nbytes
+        if entry is None or entry.nbytes > self.max_bytes:
+            return
+        self._entries[user_id] = entry
+        self._bytes += entry.nbytes
+        while self._bytes > self.max_bytes or len(self._entries) > self.max_users:
+            _, evicted = self._entries.popitem(last=False)
+            self._bytes -= evicted.nbytes
+            self.evictions += 1
+
+    def patch(self, user_id: int, changes: list, based_on: int, noted_at: int) -> None:
+        """Apply a committed transaction's `changes`, queued at tick `noted_at` while the user's version was `based_on`."""
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is None or entry.version != based_on:
+                return
+            if entry.loaded_at > noted_at:
+                # finished loading after the write was queued: the rows may already include it
+                self._replace(user_id, None)
+                return
+            try:
+                patched = _apply(entry, changes, data_version(user_id))
+            except LookupError:
+                patched = None
+            self._replace(user_id, patched)
+            self.patches += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "enabled": ENABLED,
+                "users": len(self._entries),
+                "max_users": self.max_users,
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+                "loads": self.loads,
+                "patches": self.patches,
+                "evictions": self.evictions,
+            }
+
+
+ledger_cache = LedgerCache(int(LEDGER_CACHE_MAX_MB * 1024 * 1024), LEDGER_CACHE_USERS)
+
+
+async def get_ledger(db, user_id: int) -> Ledger | None:
+    """The user's cached ledger, loading it through `db` (an AsyncSession) on a miss; None when disabled."""
+    if not ENABLED:
+        return None
+    # read the version before loading: a write landing mid-load leaves the entry stale, and
+    # LedgerCache.patch() won't apply it on top of rows that may already contain it
+    version = data_version(user_id)
+    entry = ledger_cache.get(user_id, version)
+    if entry is None:
+        parts = []
+        for model, is_income in ((models.Income, True), (models.Expense, False)):
+            rows = await db.execute(select(model.date, model.amount, model.category_id).where(model.user_id == user_id))
+            parts.append(_columns(rows, is_income))
+        entry = _concat(parts, version, next(_ticks))
+        ledger_cache.put(user_id, entry)
+    return entry
+
+
+# --- write patches ---------------------------------------------------------
+
+def _pending(db: Session, user_id: int) -> list:
+    pending = db.info.setdefault("ledger_patches", {})
+    if user_id not in pending:
+        pending[user_id] = []
+        # the version the cached entry must still have for the patch to apply, and when the
+        # write was queued: only entries loaded before that can't contain it yet
+        db.info.setdefault("ledger_versions", {})[user_id] = (data_version(user_id), next(_ticks))
+    return pending[user_id]
+
+
+def note_records(db: Session, kind: str, records: Iterable, sign: int = 1) -> None:
+    """Queue income/expense rows (ORM objects or dicts) added (sign 1) or removed (-1) in `db`."""
+    if not PATCH_ON_WRITE:
+        return
+    for record in records:
+        get = record.get if isinstance(record, Mapping) else lambda name, r=record: getattr(r, name)
+        _pending(db, get("user_id")).append(
+            ("row", sign, get("date").toordinal(), float(get("amount")), get("category_id") or 0, kind == "income"))
+
+
+def note_detach(db: Session, user_id: int, category_id: int) -> None:
+    """Queue "rows of this category become uncategorised"."""
+    if PATCH_ON_WRITE:
+        _pending(db, user_id).append(("detach", category_id))
+
+
+def _apply(entry: Ledger, changes: list, version: int) -> Ledger:
+    days, amounts, categories, income = entry.days, entry.amounts, entry.categories.copy(), entry.income
+    added, removed = [], []
+    for change in changes:
+        if change[0] == "detach":
+            categories[categories == change[1]] = 0
+        elif change[1] > 0:
+            added.append(change[2:])
+        else:
+            removed.append(change[2:])
+    keep = np.ones(len(days), dtype=bool)
+    for day, amount, category_id, is_income in removed:
+        match = np.flatnonzero(keep & (days == day) & (amounts == amount) & (categories == category_id) & (income == is_income))
+        if not len(match):
+            raise LookupError("removed row not in the cached ledger")
+        keep[match[0]] = False
+    columns = [days[keep], amounts[keep], categories[keep], income[keep]]
+    if added:
+        new = list(zip(*added))
+        columns = [np.concatenate([column, np.array(values, dtype=column.dtype)]) for column, values in zip(columns, new)]
+    return Ledger(*columns, version=version, loaded_at=entry.loaded_at)
+
+
+@event.listens_for(Session, "after_commit")
+def _apply_patches(session):
+    # registered after database._record_writes, so the data version is already bumped
+    pending = session.info.pop("ledger_patches", None)
+    versions = session.info.pop("ledger_versions", None)
+    if pending:
+        for user_id, changes in pending.items():
+            ledger_cache.patch(user_id, changes, *versions[user_id])
+
+
+@event.listens_for(Session, "after_rollback")
+def _drop_patches(session):
+    session.info.pop("ledger_patches", None)
+    session.info.pop("ledger_versions", None)
@@ -0,0 +1,214 @@
+# utils/metrics.py
+"""In-process counters and histograms, rendered in the Prometheus text format.
+
+`install(app)` adds an ASGI middleware that records, per route template
+(`/summary/series`, never the raw path, so label cardinality stays bounded):
+request counts by status, latency, and the number of SQL statements and the
+database time each request spent. The statement counts come from engine-wide
+`before/after_cursor_execute` listeners that add into a per-request context
+variable, so they cover sync and async sessions alike. `utils.ai_parser`
+records model load, pool wait and inference timings here too.
+
+Recording is a bisect and a lock per observation; values are aggregated as
+they come in, never stored, so the overhead stays flat under load. Metrics
+are per process: with several workers, scrape each one. METRICS_ENABLED=0
+skips the middleware and the SQL listeners.
+"""
+import bisect
+import contextvars
+import os
+import threading
+import time
+from typing import Dict, List, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "1").lower() not in ("0", "false", "no")
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+STATEMENT_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 100)
+MODEL_BUCKETS = (0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+
+_registry: List["_Metric"] = []
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(names: Tuple[str, ...], values: tuple, extra: str = "") -> str:
+    parts = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _number(value: float) -> str:
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    type = ""
+
+    def __init__(self, name: str, help: str, labelnames: Tuple[str, ...] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._series: Dict[tuple, object] = {}
+        self._lock = threading.Lock()
+        _registry.append(self)
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.type}"]
+        with self._lock:
+            series = [(labels, self._copy(value)) for labels, value in self._series.items()]
+        for labels, value in sorted(series, key=lambda item: tuple(map(str, item[0]))):
+            lines.extend(self._sample(labels, value))
+        return lines
+
+    def _copy(self, value):
+        return value
+
+
+class Counter(_Metric):
+    """Monotonic total per label set."""
+    type = "counter"
+
+    def inc(self, *labels, amount: float = 1) -> None:
+        with self._lock:
+            self._series[labels] = self._series.get(labels, 0) + amount
+
+    def _sample(self, labels: tuple, value) -> List[str]:
+        return [f"{self.name}{_labels(self.labelnames, labels)} {_number(value)}"]
+
+
+class Histogram(_Metric):
+    """Bucketed observations per label set (upper bounds inclusive, as in Prometheus)."""
+    type = "histogram"
+
+    def __init__(self, name: str, help: str, labelnames: Tuple[str, ...] = (), buckets=LATENCY_BUCKETS):
+        super().__init__(name, help, labelnames)
+        self.bounds = tuple(sorted(buckets))
+
+    def observe(self, value: float, *labels) -> None:
+        index = bisect.bisect_left(self.bounds, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                # per-bucket counts (the last one is +Inf), then the sum
+                series = self._series[labels] = [[0] * (len(self.bounds) + 1), 0]
+            series[0][index] += 1
+            series[1] += value
+
+    def _copy(self, value):
+        return list(value[0]), value[1]
+
+    def _sample(self, labels: tuple, value) -> List[str]:
+        counts, total = value
+        lines, cumulative = [], 0
+        for bound, count in zip(self.bounds + ("+Inf",), counts):
+            cumulative += count
+            le = 'le="' + (bound if bound == "+Inf" else _number(bound)) + '"'
+            lines.append(f"{self.name}_bucket{_labels(self.labelnames, labels, le)} {cumulative}")
+        suffix = _labels(self.labelnames, labels)
+        lines.append(f"{self.name}_sum{suffix} {_number(total)}")
+        lines.append(f"{self.name}_count{suffix} {cumulative}")
+        return lines
+
+
+def render() -> str:
+    """Every registered metric in the Prometheus text exposition format (0.0.4)."""
+    lines = []
+    for metric in _registry:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+http_requests = Counter("http_requests_total", "HTTP requests by route and status.", ("method", "route", "status"))
+http_latency = Histogram("http_request_duration_seconds", "HTTP request latency.", ("method", "route"))
+http_statements = Histogram("http_request_db_statements", "SQL statements executed per HTTP request.",
+                            ("method", "route"), STATEMENT_BUCKETS)
+http_db_time = Histogram("http_request_db_seconds", "Time spent in SQL statements per HTTP request.", ("method", "route"))
+db_statements = Counter("db_statements_total", "SQL statements executed, in and outside requests.")
+db_time = Counter("db_statement_seconds_total", "Time spent in SQL statements, in and outside requests.")
+model_load = Histogram("ai_model_load_seconds", "Time to load one model instance.", (), MODEL_BUCKETS)
+model_wait = Histogram("ai_model_wait_seconds", "Time waiting to check a model instance out of the pool.")
+model_inference = Histogram("ai_inference_seconds", "Model time per prompt, by phase (total, prompt_eval, generation).",
+                            ("phase",), MODEL_BUCKETS)
+model_tokens = Counter("ai_tokens_total", "Tokens processed by the model, by kind (prompt, completion).", ("kind",))
+
+# [statements, seconds] of the request being handled, None outside requests
+_request_db: contextvars.ContextVar = contextvars.ContextVar("metrics_request_db", default=None)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("metrics_started", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info.get("metrics_started")
+    if not started:
+        return
+    elapsed = time.perf_counter() - started.pop()
+    db_statements.inc()
+    db_time.inc(amount=elapsed)
+    usage = _request_db.get()
+    if usage is not None:
+        usage[0] += 1
+        usage[1] += elapsed
+
+
+def _handle_error(exception_context):
+    # a failed statement never reaches after_cursor_execute
+    started = exception_context.connection.info.get("metrics_started") if exception_context.connection else None
+    if started:
+        started.pop()
+
+
+class MetricsMiddleware:
+    """Plain ASGI middleware (no BaseHTTPMiddleware task hop) timing every HTTP request."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        status = 500
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        usage = [0, 0.0]
+        token = _request_db.set(usage)
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            elapsed = time.perf_counter() - started
+            _request_db.reset(token)
+            # the router stores the matched route in the scope; unmatched paths share one label
+            route = getattr(scope.get("route"), "path", None) or "<unmatched>"
+            method = scope["method"]
+            http_requests.inc(method, route, status)
+            http_latency.observe(elapsed, method, route)
+            http_statements.observe(usage[0], method, route)
+            http_db_time.observe(usage[1], method, route)
+
+
+def install(app) -> None:
+    """Instrument `app` and every SQLAlchemy engine (unless METRICS_ENABLED=0)."""
+    if not METRICS_ENABLED:
+        return
+    app.add_middleware(MetricsMiddleware)
+    if not event.contains(Engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(Engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(Engine, "after_cursor_execute", _after_cursor_execute)
+        event.listen(Engine, "handle_error", _handle_error)
@@ -0,0 +1,52 @@
+# utils/pagination.py
+"""Keyset (seek) pagination over (date, id) in descending order.
+
+A cursor is the sort key of the last row of a page, JSON-encoded and
+base64url'd so clients treat it as opaque. The next page starts strictly
+after it, so pages stay stable while new rows are inserted and each page
+costs an index range scan instead of an OFFSET.
+"""
+import base64
+import json
+from datetime import date
+
+from sqlalchemy import and_, or_
+
+DEFAULT_LIMIT = 50
+MAX_LIMIT = 500
+
+
+def encode_cursor(*key) -> str:
+    values = [v.isoformat() if isinstance(v, date) else v for v in key]
+    return base64.urlsafe_b64encode(json.dumps(values, separators=(",", ":")).encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, size: int = 2) -> list:
+    """Inverse of encode_cursor: [date, *ints]. Raises ValueError for anything malformed."""
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        if not isinstance(values, list) or len(values) != size:
+            raise ValueError
+        return [date.fromisoformat(values[0])] + [int(v) for v in values[1:]]
+    except (TypeError, ValueError, UnicodeDecodeError, json.JSONDecodeError):
+        raise ValueError("invalid cursor")
+
+
+def before(date_col, id_col, cursor_date: date, cursor_id: int):
+    """Rows after the cursor in `ORDER BY date DESC, id DESC` order."""
+    return or_(date_col < cursor_date, and_(date_col == cursor_date, id_col < cursor_id))
+
+
+def page_statement(stmt, model, cursor: str | None, limit: int):
+    """Restrict a select() to the page after `cursor`, ordered by (date, id) desc, limit + 1 rows."""
+    if cursor:
+        stmt = stmt.where(before(model.date, model.id, *decode_cursor(cursor)))
+    return stmt.order_by(model.date.desc(), model.id.desc()).limit(limit + 1)
+
+
+def split_page(rows: list, limit: int):
+    """Rows fetched with page_statement -> (page rows, next_cursor or None)."""
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    return rows, encode_cursor(rows[-1].date, rows[-1].id)
@@ -0,0 +1,200 @@
+# utils/passwords.py
+"""bcrypt hashing on a dedicated, bounded process pool.
+
+bcrypt is deliberately slow (~250ms at cost 12). Run inline it occupies a
+request thread for that long, so a login burst starves every other route.
+Here it runs in PASSWORD_WORKERS separate processes; at most
+PASSWORD_MAX_QUEUE calls may wait for a worker, beyond that `PoolBusy` is
+raised and the API answers 503 with Retry-After.
+
+BCRYPT_ROUNDS sets the cost for new hashes. `verify_and_update` also returns
+a new hash whenever a stored one was made with a different cost, so the cost
+can be tuned and existing users migrate on their next login.
+"""
+import asyncio
+import math
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Dict, Tuple
+
+from passlib.context import CryptContext
+
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+PASSWORD_WORKERS = int(os.getenv("PASSWORD_WORKERS", "0")) or max(1, (os.cpu_count() or 2) // 2)
+PASSWORD_MAX_QUEUE = int(os.getenv("PASSWORD_MAX_QUEUE", "64"))
+
+
+class PoolBusy(Exception):
+    def __init__(self, retry_after: int):
+        super().__init__("server sedang sibuk, coba lagi nanti")
+        self.retry_after = retry_after
+
+
+# --- runs in the worker processes ------------------------------------------
+
+_contexts: Dict[int, CryptContext] = {}
+
+
+def _context(rounds: int) -> CryptContext:
+    ctx = _contexts.get(rounds)
+    if ctx is None:
+        ctx = _contexts[rounds] = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=rounds)
+    return ctx
+
+
+def _hash(password: str, rounds: int) -> Tuple[float, str]:
+    started = time.time()
+    return started, _context(rounds).hash(password)
+
+
+def _verify_and_update(password: str, hashed: str, rounds: int) -> Tuple[float, Tuple[bool, str | None]]:
+    started = time.time()
+    try:
+        return started, _context(rounds).verify_and_update(password, hashed)
+    except (ValueError, TypeError):
+        # malformed stored hash: treat as a failed login, not a server error
+        return started, (False, None)
+
+
+# --- API process -----------------------------------------------------------
+
+class PasswordPool:
+    def __init__(self, workers: int, max_queue: int, rounds: int):
+        self.workers = max(1, workers)
+        self.max_queue = max(0, max_queue)
+        self.rounds = rounds
+        self._executor: ProcessPoolExecutor | None = None
+        self._lock = threading.Lock()
+        self._pending = 0
+        self.submitted = 0
+        self.completed = 0
+        self.rejected = 0
+        self.restarts = 0
+        self.queue_time_total = 0.0
+        self.queue_time_max = 0.0
+        self.run_time_total = 0.0
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            # spawn, not fork: the server process already runs threads
+            self._executor = ProcessPoolExecutor(max_workers=self.workers,
+                                                 mp_context=multiprocessing.get_context("spawn"))
+        return self._executor
+
+    def _reset_executor(self, broken: ProcessPoolExecutor) -> None:
+        """Drop `broken` (a worker died: OOM, segfault, kill) so the next call starts a fresh pool."""
+        with self._lock:
+            if self._executor is not broken:
+                return  # another thread already replaced it
+            self._executor = None
+            self.restarts += 1
+        broken.shutdown(wait=False, cancel_futures=True)
+
+    def _executor_submit(self, fn, args: tuple) -> Tuple[ProcessPoolExecutor, Future]:
+        with self._lock:
+            executor = self._get_executor()
+        try:
+            return executor, executor.submit(fn, *args)
+        except BrokenProcessPool:
+            self._reset_executor(executor)
+            with self._lock:
+                executor = self._get_executor()
+            return executor, executor.submit(fn, *args)
+
+    def _retry_after(self) -> int:
+        avg = self.run_time_total / self.completed if self.completed else 0.25
+        return max(1, math.ceil(self._pending * avg / self.workers))
+
+    def _submit(self, fn, *args) -> Future:
+        submitted_at = time.time()
+        with self._lock:
+            if self._pending >= self.workers + self.max_queue:
+                self.rejected += 1
+                raise PoolBusy(self._retry_after())
+            self._pending += 1
+            self.submitted += 1
+        outer: Future = Future()
+
+        def finish(error: BaseException | None, result=None) -> None:
+            finished_at = time.time()
+            with self._lock:
+                self._pending -= 1
+                self.completed += 1
+                if error is None:
+                    started_at = result[0]
+                    queued = max(0.0, started_at - submitted_at)
+                    self.queue_time_total += queued
+                    self.queue_time_max = max(self.queue_time_max, queued)
+                    self.run_time_total += max(0.0, finished_at - started_at)
+            if error is not None:
+                outer.set_exception(error)
+            else:
+                outer.set_result(result[1])
+
+        def run(retried: bool) -> None:
+            executor, inner = self._executor_submit(fn, args)
+            inner.add_done_callback(lambda f: done(f, executor, retried))
+
+        def done(f: Future, executor: ProcessPoolExecutor, retried: bool) -> None:
+            error = f.exception()
+            if isinstance(error, BrokenProcessPool) and not retried:
+                # a worker died while this call was queued or running; hashing has
+                # no side effects, so run it once more on a fresh pool
+                self._reset_executor(executor)
+                try:
+                    run(retried=True)
+                    return
+                except Exception as e:
+                    error = e
+            finish(error, None if error else f.result())
+
+        try:
+            run(retried=False)
+        except Exception:
+            with self._lock:
+                self._pending -= 1
+            raise
+        return outer
+
+    # blocking API (worker thread callers)
+    def hash(self, password: str) -> str:
+        return self._submit(_hash, password, self.rounds).result()
+
+    def verify_and_update(self, password: str, hashed: str) -> Tuple[bool, str | None]:
+        return self._submit(_verify_and_update, password, hashed, self.rounds).result()
+
+    # awaitable API: the event loop thread is free while bcrypt runs
+    async def hash_async(self, password: str) -> str:
+        return await asyncio.wrap_future(self._submit(_hash, password, self.rounds))
+
+    async def verify_and_update_async(self, password: str, hashed: str) -> Tuple[bool, str | None]:
+        return await asyncio.wrap_future(self._submit(_verify_and_update, password, hashed, self.rounds))
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            done = self.completed
+            return {
+                "workers": self.workers,
+                "max_queue": self.max_queue,
+                "rounds": self.rounds,
+                "in_flight": min(self._pending, self.workers),
+                "queued": max(0, self._pending - self.workers),
+                "submitted": self.submitted,
+                "completed": done,
+                "rejected": self.rejected,
+                "restarts": self.restarts,
+                "avg_queue_ms": round(self.queue_time_total / done * 1000, 2) if done else 0.0,
+                "max_queue_ms": round(self.queue_time_max * 1000, 2),
+                "avg_hash_ms": round(self.run_time_total / done * 1000, 2) if done else 0.0,
+            }
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+password_pool = PasswordPool(PASSWORD_WORKERS, PASSWORD_MAX_QUEUE, BCRYPT_ROUNDS)
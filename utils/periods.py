@@ -0,0 +1,107 @@
+# utils/periods.py
+"""Turn month/year/week requests into half-open date ranges.
+
+Filtering with ``column >= start AND column < end`` keeps the predicate
+sargable, so MySQL can use the (user_id, date) indexes; ``extract()`` on the
+column can't.
+"""
+from datetime import date, timedelta
+from typing import List, Tuple
+
+from sqlalchemy import extract
+
+
+def month_range(year: int, month: int) -> Tuple[date, date]:
+    start = date(year, month, 1)
+    end = date(year + 1, 1, 1) if month == 12 else date(year, month + 1, 1)
+    return start, end
+
+
+def year_range(year: int) -> Tuple[date, date]:
+    return date(year, 1, 1), date(year + 1, 1, 1)
+
+
+def week_range(day: date) -> Tuple[date, date]:
+    """Monday-to-Monday week containing `day`."""
+    start = day - timedelta(days=day.weekday())
+    return start, start + timedelta(days=7)
+
+
+def month_weeks(year: int, month: int) -> List[Tuple[date, date]]:
+    """Calendar weeks of a month, clipped to the month (first and last may be short)."""
+    return buckets(*month_range(year, month), "week")
+
+
+GRANULARITIES = ("day", "week", "month", "quarter", "year")
+
+
+def bucket_start(day: date, granularity: str) -> date:
+    """First day of the day/week (Monday)/month/quarter/year containing `day`."""
+    if granularity == "day":
+        return day
+    if granularity == "week":
+        return week_range(day)[0]
+    if granularity == "month":
+        return day.replace(day=1)
+    if granularity == "quarter":
+        return date(day.year, (day.month - 1) // 3 * 3 + 1, 1)
+    if granularity == "year":
+        return date(day.year, 1, 1)
+    raise ValueError(f"unknown granularity: {granularity}")
+
+
+def next_bucket(start: date, granularity: str) -> date:
+    """Start of the bucket after the one starting at `start`."""
+    if granularity == "day":
+        return start + timedelta(days=1)
+    if granularity == "week":
+        return start + timedelta(days=7)
+    if granularity == "year":
+        return date(start.year + 1, 1, 1)
+    months = 3 if granularity == "quarter" else 1
+    month = start.month - 1 + months
+    return date(start.year + month // 12, month % 12 + 1, 1)
+
+
+def buckets(start: date, end: date, granularity: str) -> List[Tuple[date, date]]:
+    """Consecutive buckets covering [start, end), the first and last clipped to the range."""
+    result = []
+    current = bucket_start(start, granularity)
+    while current < end:
+        following = next_bucket(current, granularity)
+        result.append((max(current, start), min(following, end)))
+        current = following
+    return result
+
+
+def bucket_count(start: date, end: date, granularity: str) -> int:
+    """len(buckets(start, end, granularity)), computed without building them."""
+    first = bucket_start(start, granularity)
+    if end <= first:
+        return 0
+    if granularity in ("day", "week"):
+        days = 1 if granularity == "day" else 7
+        return -(-(end - first).days // days)
+    months = {"month": 1, "quarter": 3, "year": 12}[granularity]
+    index = lambda day: (day.year * 12 + day.month - 1) // months
+    # buckets start at first ... up to the one containing end, which counts unless end is its first day
+    return index(end) - index(first) + (bucket_start(end, granularity) < end)
+
+
+def in_range(column, start: date, end: date) -> list:
+    return [column >= start, column < end]
+
+
+def period_filter(column, year: int | None = None, month: int | None = None) -> list:
+    """Filter clauses for an optional year and/or month.
+
+    A month without a year (every March) has no single range, so that case
+    still falls back to extract().
+    """
+    if year and month:
+        return in_range(column, *month_range(year, month))
+    if year:
+        return in_range(column, *year_range(year))
+    if month:
+        return [extract('month', column) == month]
+    return []
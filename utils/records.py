@@ -0,0 +1,63 @@
+# utils/records.py
+"""Create incomes/expenses in bulk: one category check, one INSERT, one commit."""
+from datetime import datetime
+from typing import List
+
+from fastapi import HTTPException
+from sqlalchemy.orm import Session
+
+import models, schemas
+from utils import rollup
+
+MAX_BATCH = 500
+
+
+def create_records(db: Session, model, kind: str, user_id: int, payloads: list) -> List[dict]:
+    """Insert all payloads for `user_id` in one transaction and return them serialised, in order.
+
+    All-or-nothing: an unknown/foreign category anywhere rejects the whole batch
+    before anything is written, and any database error rolls everything back.
+    """
+    if not payloads:
+        return []
+    if len(payloads) > MAX_BATCH:
+        raise HTTPException(status_code=400, detail=f"Maksimal {MAX_BATCH} data per request")
+
+    category_ids = {p.category_id for p in payloads if p.category_id}
+    if category_ids:
+        owned = {id_ for (id_,) in db.query(models.Category.id).filter(
+            models.Category.id.in_(category_ids), models.Category.user_id == user_id, models.Category.type == kind)}
+        if category_ids - owned:
+            raise HTTPException(status_code=400, detail="Invalid category")
+
+    now = datetime.utcnow()
+    rows = [{
+        "user_id": user_id,
+        "category_id": p.category_id or None,
+        "title": p.title,
+        "amount": p.amount,
+        "description": p.description,
+        "date": p.date,
+        "created_at": now,
+    } for p in payloads]
+
+    try:
+        if db.get_bind().dialect.insert_executemany_returning:
+            # one multi-row INSERT ... RETURNING. Ids are handed out in VALUES order, so sorting
+            # by id restores payload order (sort_by_parameter_order would fall back to one
+            # INSERT per row on SQLite, which has no sentinel column to sort on)
+            table = model.__table__
+            records = sorted(db.execute(table.insert().returning(*table.c), rows).all(), key=lambda r: r.id)
+        else:
+            # e.g. MySQL: no RETURNING, the ORM fetches each new id itself
+            records = [model(**row) for row in rows]
+            db.add_all(records)
+            db.flush()
+        rollup.apply_many(db, kind, rows)
+        # serialise before commit: afterwards every object would be expired and reloaded one by one
+        data = [schemas.TransactionResponse.model_validate(r).model_dump() for r in records]
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    return data
@@ -0,0 +1,142 @@
+# utils/rollup.py
+"""Maintenance of the `daily_totals` rollup.
+
+Every write to incomes/expenses must go through one of these helpers inside
+the same session/transaction as the write itself, so the rollup commits or
+rolls back together with the rows it summarises:
+
+    db.add(expense)
+    rollup.add(db, expense, "expense")
+    db.commit()
+
+Rebuild from scratch with ``python -m utils.rollup rebuild [--user-id N]``.
+"""
+import argparse
+from collections import defaultdict
+from datetime import date
+from typing import Iterable, Mapping
+
+from sqlalchemy import func, insert, literal, select
+from sqlalchemy.dialects import mysql, postgresql, sqlite
+from sqlalchemy.orm import Session
+
+import models
+from database import note_write
+from utils import ledger_cache
+
+DailyTotal = models.DailyTotal
+_table = DailyTotal.__table__
+_KEY = ("user_id", "date", "category_id", "type")
+
+
+def _kind(kind: str) -> models.CategoryType:
+    return models.CategoryType.income if kind == "income" else models.CategoryType.expense
+
+
+def _upsert(db: Session, rows: list[dict]) -> None:
+    """Add each row's total/count onto the matching rollup row, creating it if missing."""
+    if not rows:
+        return
+    for user_id in {row["user_id"] for row in rows}:
+        note_write(db, user_id)
+    dialect = db.get_bind().dialect.name
+    # one cached statement run as executemany, whatever the number of rows
+    if dialect == "mysql":
+        stmt = mysql.insert(_table)
+        stmt = stmt.on_duplicate_key_update(total=_table.c.total + stmt.inserted.total,
+                                            count=_table.c["count"] + stmt.inserted["count"])
+    elif dialect in ("sqlite", "postgresql"):
+        stmt = (sqlite.insert if dialect == "sqlite" else postgresql.insert)(_table)
+        stmt = stmt.on_conflict_do_update(index_elements=list(_KEY),
+                                          set_={"total": _table.c.total + stmt.excluded.total,
+                                                "count": _table.c["count"] + stmt.excluded["count"]})
+    else:
+        for row in rows:
+            existing = db.get(DailyTotal, tuple(row[k] for k in _KEY))
+            if existing is None:
+                db.add(DailyTotal(**row))
+            else:
+                existing.total += row["total"]
+                existing.count += row["count"]
+        db.flush()
+        return
+    db.execute(stmt, rows)
+
+
+def apply_many(db: Session, kind: str, records: Iterable, sign: int = 1) -> None:
+    """Fold many income/expense records (ORM objects or dicts) into the rollup in one statement."""
+    records = list(records)
+    ledger_cache.note_records(db, kind, records, sign)
+    buckets: dict = defaultdict(lambda: [0.0, 0])
+    for record in records:
+        get = record.get if isinstance(record, Mapping) else lambda name, r=record: getattr(r, name)
+        key = (get("user_id"), get("date"), get("category_id") or 0)
+        buckets[key][0] += sign * float(get("amount"))
+        buckets[key][1] += sign
+    kind_type = _kind(kind)
+    _upsert(db, [
+        {"user_id": user_id, "date": day, "category_id": category_id, "type": kind_type, "total": total, "count": count}
+        for (user_id, day, category_id), (total, count) in buckets.items()
+    ])
+
+
+def add(db: Session, record, kind: str) -> None:
+    apply_many(db, kind, [record])
+
+
+def remove(db: Session, record, kind: str) -> None:
+    apply_many(db, kind, [record], sign=-1)
+
+
+def detach_category(db: Session, user_id: int, category_id: int) -> None:
+    """Move a category's totals to "no category" before the category is deleted
+    (its incomes/expenses end up with category_id NULL)."""
+    ledger_cache.note_detach(db, user_id, category_id)
+    rows = db.query(DailyTotal).filter(DailyTotal.user_id == user_id, DailyTotal.category_id == category_id).all()
+    if not rows:
+        return
+    moved = [{"user_id": r.user_id, "date": r.date, "category_id": 0, "type": r.type, "total": r.total, "count": r.count}
+             for r in rows]
+    db.query(DailyTotal).filter(DailyTotal.user_id == user_id, DailyTotal.category_id == category_id)\
+        .delete(synchronize_session=False)
+    _upsert(db, moved)
+
+
+def rebuild(db: Session, user_id: int | None = None) -> None:
+    """Recompute the rollup from the raw incomes/expenses rows (all users or one)."""
+    delete_q = db.query(DailyTotal)
+    if user_id is not None:
+        delete_q = delete_q.filter(DailyTotal.user_id == user_id)
+    delete_q.delete(synchronize_session=False)
+
+    for model, kind in ((models.Income, "income"), (models.Expense, "expense")):
+        category_id = func.coalesce(model.category_id, 0)
+        source = select(
+            model.user_id, model.date, category_id,
+            literal(_kind(kind), _table.c.type.type),
+            func.sum(model.amount), func.count(),
+        ).group_by(model.user_id, model.date, category_id)
+        if user_id is not None:
+            source = source.where(model.user_id == user_id)
+        db.execute(insert(_table).from_select(["user_id", "date", "category_id", "type", "total", "count"], source))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Maintain the daily_totals rollup table.")
+    parser.add_argument("command", choices=["rebuild"])
+    parser.add_argument("--user-id", type=int, default=None, help="only rebuild this user's rows")
+    args = parser.parse_args()
+
+    from database import Base, SessionLocal, engine
+    Base.metadata.create_all(bind=engine, tables=[_table])
+    db = SessionLocal()
+    try:
+        rebuild(db, args.user_id)
+        db.commit()
+    finally:
+        db.close()
+    print(f"daily_totals rebuilt for {'user ' + str(args.user_id) if args.user_id else 'all users'}")
+
+
+if __name__ == "__main__":
+    main()
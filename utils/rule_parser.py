@@ -1,8 +1,156 @@
 import re
 import json
 from datetime import datetime, timedelta
+from functools import lru_cache
 from typing import Dict, Any
 
+# ---------------------------------------------------------------------------
+# Rule tables. Everything below is compiled once at import; the extractors only
+# run precompiled patterns over a text that has been lowercased a single time.
+# Dict order is significant: when several entries match, the earliest entry
+# wins, exactly like the original per-entry loops.
+# ---------------------------------------------------------------------------
+
+_NUMBER_WORDS = {
+    'satu': 1, 'dua': 2, 'tiga': 3, 'empat': 4, 'lima': 5,
+    'enam': 6, 'tujuh': 7, 'delapan': 8, 'sembilan': 9, 'sepuluh': 10,
+    'sebelas': 11, 'dua belas': 12, 'tiga belas': 13, 'empat belas': 14, 'lima belas': 15
+}
+
+_NUMBER_WORDS_FULL = {
+    'satu': 1, 'dua': 2, 'tiga': 3, 'empat': 4, 'lima': 5,
+    'enam': 6, 'tujuh': 7, 'delapan': 8, 'sembilan': 9, 'sepuluh': 10,
+    'sebelas': 11, 'dua belas': 12, 'tiga belas': 13, 'empat belas': 14, 'lima belas': 15,
+    'dua puluh': 20, 'tiga puluh': 30, 'empat puluh': 40, 'lima puluh': 50,
+    'enam puluh': 60, 'tujuh puluh': 70, 'delapan puluh': 80, 'sembilan puluh': 90,
+    'seratus': 100, 'seribu': 1000
+}
+
+_MONTHS = {
+    'januari': 1, 'jan': 1,
+    'februari': 2, 'feb': 2,
+    'maret': 3, 'mar': 3,
+    'april': 4, 'apr': 4,
+    'mei': 5,
+    'juni': 6, 'jun': 6,
+    'juli': 7, 'jul': 7,
+    'agustus': 8, 'agu': 8, 'aug': 8,
+    'september': 9, 'sep': 9, 'sept': 9,
+    'oktober': 10, 'okt': 10, 'oct': 10,
+    'november': 11, 'nov': 11,
+    'desember': 12, 'des': 12, 'dec': 12,
+}
+
+# Category keywords mapping (most specific first)
+_CATEGORY_KEYWORDS = {
+    'makan': ['nasi', 'ayam', 'soto', 'bakso', 'mie', 'bubur', 'sate',
+              'rendang', 'gudeg', 'pecel', 'gado', 'warteg', 'padang',
+              'resto', 'restoran', 'makanan', 'makan', 'sarapan',
+              'makan siang', 'makan malam'],
+    'minuman': ['kopi', 'teh', 'jus', 'susu', 'air mineral', 'aqua',
+                'minuman', 'minum', 'es', 'cappuccino', 'latte', 'espresso',
+                'americano', 'boba', 'milkshake', 'smoothie'],
+    'transport': ['bensin', 'ojek', 'gojek', 'grab', 'taxi', 'taksi',
+                  'bus', 'kereta', 'transportasi', 'parkir', 'tol',
+                  'angkot', 'angkutan', 'bbm', 'pertamax'],
+    'belanja': ['beli', 'belanja', 'shopping', 'supermarket', 'indomaret',
+                'alfamart', 'pasar', 'toko'],
+    'tagihan': ['listrik', 'air', 'pdam', 'wifi', 'internet', 'pulsa',
+                'token', 'tagihan', 'bayar cicilan', 'cicilan'],
+    'hiburan': ['nonton', 'bioskop', 'cinema', 'karaoke', 'game', 'netflix',
+                'spotify', 'youtube premium', 'hiburan'],
+    'kesehatan': ['obat', 'dokter', 'rumah sakit', 'rs', 'klinik', 'apotek',
+                  'vitamin', 'kesehatan'],
+    'gaji': ['gaji', 'salary', 'penghasilan', 'pendapatan', 'income'],
+}
+
+# Removed (in this order) before checking whether anything besides a date is left.
+# "hari ini" must stay first: it is the only entry that spans two tokens.
+_DATE_WORDS = (
+    'hari ini', 'kemarin', 'today', 'yesterday',
+    'hari', 'lalu', 'yang', 'tanggal', 'bulan', 'di',
+    'januari', 'februari', 'maret', 'april', 'mei', 'juni',
+    'juli', 'agustus', 'september', 'oktober', 'november', 'desember',
+    'jan', 'feb', 'mar', 'apr', 'jun', 'jul', 'aug', 'sep', 'oct', 'nov', 'dec',
+    'agu', 'okt', 'des', 'satu', 'dua', 'tiga', 'empat', 'lima',
+    'enam', 'tujuh', 'delapan', 'sembilan', 'sepuluh'
+)
+
+_ACTION_WORDS = (
+    'beli', 'bayar', 'belanja', 'makan', 'minum', 'dapat', 'terima', 'mendapatkan',
+    'kopi', 'nasi', 'bensin', 'pulsa', 'token', 'listrik', 'air',
+    'gaji', 'bonus', 'ojek', 'grab', 'gojek', 'taxi', 'bus', 'senilai', 'sebesar'
+)
+
+# Same type rules the LLM prompt uses
+_EXPENSE_WORDS = ('beli', 'membeli', 'bayar', 'belanja', 'makan', 'minum', 'bensin', 'kopi')
+_INCOME_WORDS = ('gaji', 'terima', 'pendapatan', 'bonus', 'hasil', 'dapat', 'mendapatkan')
+# A title made of just one of these says nothing about what was bought
+_TITLE_VERBS = frozenset(('beli', 'membeli', 'bayar', 'belanja', 'terima', 'dapat', 'mendapatkan'))
+# Tokens that end a title: amounts, dates and filler around them
+_TITLE_STOP_WORDS = frozenset(
+    set(_MONTHS) | {w for words in _NUMBER_WORDS_FULL for w in words.split()} | {
+        'puluh', 'belas', 'ratus', 'ribu', 'juta', 'rb', 'jt', 'k', 'rp',
+        'hari', 'ini', 'kemarin', 'today', 'yesterday', 'tadi', 'lalu', 'yang', 'tanggal', 'bulan',
+        'seharga', 'senilai', 'sebesar', 'harga', 'nominal', 'sebanyak', 'total',
+        'di', 'pada', 'untuk', 'dengan', 'sekitar',
+    }
+)
+_TITLE_MAX_WORDS = 5
+
+
+def _alternation(words) -> str:
+    return '|'.join(re.escape(w) for w in words)
+
+
+_AMOUNT_SHORTHAND_RE = re.compile(r"^(\d+(?:[\.,]\d+)?)(\s*)(rb|ribu|k|jt|juta)?$")
+_DIGITS_RE = re.compile(r"\d+")
+_ONE_DAY = timedelta(days=1)
+
+# dates
+_TODAY_RE = re.compile(r'\b(hari ini|today)\b')
+_YESTERDAY_RE = re.compile(r'\b(kemarin|yesterday)\b')
+_NUMBER_WORD_RANK = {w: i for i, w in enumerate(_NUMBER_WORDS)}
+_WORD_DAYS_AGO_RE = re.compile(rf'\b({_alternation(_NUMBER_WORDS)})\s+hari\s*(yang)?\s*lalu\b')
+_DAYS_AGO_RE = re.compile(r'(\d+)\s*hari\s*(yang)?\s*lalu')
+_NUMERIC_BULAN_RE = re.compile(r'(?:tanggal\s+)?(\d{1,2})\s+bulan\s+(\d{1,2})\s+(\d{4})')
+# every month name starts a whitespace-delimited token in all month patterns, so
+# a text whose tokens share no 3-letter prefix with a month name can skip them
+_MONTH_PREFIXES = frozenset(name[:3] for name in _MONTHS)
+# (name, month, "bulan X tanggal D", "tanggal D bulan X", "D X YYYY", "D X")
+_MONTH_PATTERNS = tuple(
+    (name, num,
+     re.compile(rf'(?:di\s+)?bulan\s+{name}\s+tanggal\s+(\d{{1,2}})'),
+     re.compile(rf'tanggal\s+(\d{{1,2}})\s+(?:di\s+)?bulan\s+{name}'),
+     re.compile(rf'(\d{{1,2}})\s+{name}\s+(\d{{4}})\b'),
+     re.compile(rf'(\d{{1,2}})\s+{name}\b'))
+    for name, num in _MONTHS.items()
+)
+_ISO_DATE_RE = re.compile(r'(\d{4})-(\d{1,2})-(\d{1,2})')
+_DMY_DATE_RE = re.compile(r'(\d{1,2})[-/](\d{1,2})[-/](\d{4})')
+
+# amounts
+_NUMBER_WORD_FULL_RANK = {w: i for i, w in enumerate(_NUMBER_WORDS_FULL)}
+_WORD_AMOUNT_RE = re.compile(rf'\b({_alternation(_NUMBER_WORDS_FULL)})\s+(juta|ribu)\b')
+_RP_AMOUNT_RE = re.compile(r'rp\.?\s*(\d+(?:[.,]\d+)*)')
+_THOUSANDS_AMOUNT_RE = re.compile(r'(\d+(?:[.,]\d+)?)\s*(rb|ribu|k)\b')
+_MILLIONS_AMOUNT_RE = re.compile(r'(\d+(?:[.,]\d+)?)\s*(jt|juta)\b')
+_NOMINAL_AMOUNT_RE = re.compile(r'(?:senilai|sebesar|nominal)\s+(\d+(?:[.,]\d+)?)\s*(jt|juta|rb|ribu|k)?\b')
+_SEPARATED_AMOUNT_RE = re.compile(r'\b(\d{1,3}(?:\.\d{3})+)\b')
+_PLAIN_AMOUNT_RE = re.compile(r'\b(\d{3,})\b')
+
+# categories: flat (keyword, category) table in priority order. Substring tests
+# run in C, which beats walking a trie/automaton in Python for inputs this short.
+_CATEGORY_TABLE = tuple((kw, cat) for cat, kws in _CATEGORY_KEYWORDS.items() for kw in kws)
+
+# transaction content
+_ACTION_RE = re.compile(_alternation(_ACTION_WORDS))
+_EXPENSE_RE = re.compile(_alternation(_EXPENSE_WORDS))
+_INCOME_RE = re.compile(_alternation(_INCOME_WORDS))
+_TYPE_RE = re.compile(_alternation(_EXPENSE_WORDS + _INCOME_WORDS))
+_SEPARATORS = str.maketrans('-/,.', '    ')
+
+
 def _normalize_amount(raw: str) -> int | None:
     """Extract amount from Indonesian text."""
     if not raw:
@@ -10,10 +158,10 @@ def _normalize_amount(raw: str) -> int | None:
     s = raw.lower().strip()
     s = s.replace(".", "").replace(",", "")
     # handle common shorthand: 15rb, 15k, 15ribu, 1.5jt
-    m = re.match(r"^(\d+(?:[\.,]\d+)?)(\s*)(rb|ribu|k|jt|juta)?$", s)
+    m = _AMOUNT_SHORTHAND_RE.match(s)
     if not m:
         # try to extract digits
-        nums = re.findall(r"\d+", s)
+        nums = _DIGITS_RE.findall(s)
         if not nums:
             return None
         return int(nums[-1])
@@ -28,237 +176,163 @@ def _normalize_amount(raw: str) -> int | None:
     return int(val)
 
 
-def _extract_date_from_text(text: str) -> str | None:
-    """Extract date from Indonesian text using regex."""
-    text_lower = text.lower()
+def _fmt(date_obj) -> str:
+    # isoformat() is ~7x cheaper than strftime(); they only differ below year 1000
+    return date_obj.isoformat() if date_obj.year >= 1000 else date_obj.strftime("%Y-%m-%d")
+
+
+def _date_or_next_year(today, month: int, day: int):
+    date_obj = datetime(today.year, month, day).date()
+    # If date is in the past, use next year
+    if date_obj < today:
+        date_obj = datetime(today.year + 1, month, day).date()
+    return date_obj
+
+
+def _find_date(text_lower: str, tokens: list[str]) -> str | None:
     today = datetime.utcnow().date()
-    
+
     # Check for "hari ini" or "today"
-    if re.search(r'\b(hari ini|today)\b', text_lower):
-        return today.strftime("%Y-%m-%d")
-    
+    if ('hari ini' in text_lower or 'today' in text_lower) and _TODAY_RE.search(text_lower):
+        return _fmt(today)
+
     # Check for "kemarin" or "yesterday"
-    if re.search(r'\b(kemarin|yesterday)\b', text_lower):
-        return (today - timedelta(days=1)).strftime("%Y-%m-%d")
-    
-    # ✅ FIX 1: Handle "tiga hari yang lalu" (kata → angka)
-    number_words = {
-        'satu': 1, 'dua': 2, 'tiga': 3, 'empat': 4, 'lima': 5,
-        'enam': 6, 'tujuh': 7, 'delapan': 8, 'sembilan': 9, 'sepuluh': 10,
-        'sebelas': 11, 'dua belas': 12, 'tiga belas': 13, 'empat belas': 14, 'lima belas': 15
-    }
-    
-    # Check for "tiga hari yang lalu" or "tiga hari lalu"
-    for word, num in number_words.items():
-        pattern = rf'\b{word}\s+hari\s*(yang)?\s*lalu\b'
-        if re.search(pattern, text_lower):
-            return (today - timedelta(days=num)).strftime("%Y-%m-%d")
-    
-    # Check for "2 hari yang lalu" or "2 hari lalu" (angka)
-    match = re.search(r'(\d+)\s*hari\s*(yang)?\s*lalu', text_lower)
-    if match:
-        days_ago = int(match.group(1))
-        return (today - timedelta(days=days_ago)).strftime("%Y-%m-%d")
-    
-    # ✅ FIX 2: Handle "tanggal DD bulan MM YYYY" or "DD bulan MM YYYY"
-    months = {
-        'januari': 1, 'jan': 1,
-        'februari': 2, 'feb': 2,
-        'maret': 3, 'mar': 3,
-        'april': 4, 'apr': 4,
-        'mei': 5,
-        'juni': 6, 'jun': 6,
-        'juli': 7, 'jul': 7,
-        'agustus': 8, 'agu': 8, 'aug': 8,
-        'september': 9, 'sep': 9, 'sept': 9,
-        'oktober': 10, 'okt': 10, 'oct': 10,
-        'november': 11, 'nov': 11,
-        'desember': 12, 'des': 12, 'dec': 12,
-    }
-    
-    # Match "tanggal 1 bulan 1 2025" or "1 bulan 1 2025"
-    match = re.search(r'(?:tanggal\s+)?(\d{1,2})\s+bulan\s+(\d{1,2})\s+(\d{4})', text_lower)
-    if match:
-        day = int(match.group(1))
-        month = int(match.group(2))
-        year = int(match.group(3))
-        try:
-            date_obj = datetime(year, month, day).date()
-            return date_obj.strftime("%Y-%m-%d")
-        except ValueError:
-            pass
-    
-    # ✅ NEW: Match "di bulan Februari tanggal 1" or "bulan februari tanggal 1"
-    for month_name, month_num in months.items():
-        # Pattern: "di bulan MONTH tanggal DD"
-        pattern = rf'(?:di\s+)?bulan\s+{month_name}\s+tanggal\s+(\d{{1,2}})'
-        match = re.search(pattern, text_lower)
-        if match:
-            day = int(match.group(1))
-            # Try with current year first
-            try:
-                date_obj = datetime(today.year, month_num, day).date()
-                # If date is in the past, use next year
-                if date_obj < today:
-                    date_obj = datetime(today.year + 1, month_num, day).date()
-                return date_obj.strftime("%Y-%m-%d")
-            except ValueError:
-                pass
-        
-        # Pattern: "tanggal DD bulan MONTH" or "tanggal DD di bulan MONTH"
-        pattern = rf'tanggal\s+(\d{{1,2}})\s+(?:di\s+)?bulan\s+{month_name}'
-        match = re.search(pattern, text_lower)
-        if match:
-            day = int(match.group(1))
-            try:
-                date_obj = datetime(today.year, month_num, day).date()
-                if date_obj < today:
-                    date_obj = datetime(today.year + 1, month_num, day).date()
-                return date_obj.strftime("%Y-%m-%d")
-            except ValueError:
-                pass
-    
-    # Match "5 januari 2025" or "5 jan 2025"
-    for month_name, month_num in months.items():
-        pattern = rf'(\d{{1,2}})\s+{month_name}\s+(\d{{4}})\b'
-        match = re.search(pattern, text_lower)
+    if ('kemarin' in text_lower or 'yesterday' in text_lower) and _YESTERDAY_RE.search(text_lower):
+        return _fmt(today - _ONE_DAY)
+
+    if 'hari' in text_lower and 'lalu' in text_lower:
+        # "tiga hari yang lalu" / "tiga hari lalu" (kata → angka)
+        best = None
+        for match in _WORD_DAYS_AGO_RE.finditer(text_lower):
+            word = match.group(1)
+            if best is None or _NUMBER_WORD_RANK[word] < _NUMBER_WORD_RANK[best]:
+                best = word
+        if best is not None:
+            days_ago = _NUMBER_WORDS[best]
+            return _fmt(today - timedelta(days=days_ago))
+
+        # "2 hari yang lalu" or "2 hari lalu" (angka)
+        match = _DAYS_AGO_RE.search(text_lower)
         if match:
-            day = int(match.group(1))
-            year = int(match.group(2))
-            try:
-                date_obj = datetime(year, month_num, day).date()
-                return date_obj.strftime("%Y-%m-%d")
-            except ValueError:
-                pass
-    
-    # Check for specific date formats: "5 januari", "5 jan", etc (tanpa tahun, pakai tahun sekarang)
-    for month_name, month_num in months.items():
-        pattern = rf'(\d{{1,2}})\s+{month_name}\b'
-        match = re.search(pattern, text_lower)
+            days_ago = int(match.group(1))
+            return _fmt(today - timedelta(days=days_ago))
+
+    has_bulan = 'bulan' in text_lower
+    if has_bulan:
+        # "tanggal 1 bulan 1 2025" or "1 bulan 1 2025"
+        match = _NUMERIC_BULAN_RE.search(text_lower)
         if match:
             day = int(match.group(1))
+            month = int(match.group(2))
+            year = int(match.group(3))
             try:
-                date_obj = datetime(today.year, month_num, day).date()
-                # If date is in the past, use next year
-                if date_obj < today:
-                    date_obj = datetime(today.year + 1, month_num, day).date()
-                return date_obj.strftime("%Y-%m-%d")
+                return _fmt(datetime(year, month, day).date())
             except ValueError:
                 pass
-    
-    # ✅ FIX 3: Handle ISO format "YYYY-MM-DD" or "DD-MM-YYYY" or "DD/MM/YYYY"
+
+    prefixes = {token[:3] for token in tokens}
+    if not prefixes.isdisjoint(_MONTH_PREFIXES):
+        present = [p for p in _MONTH_PATTERNS if p[0][:3] in prefixes and p[0] in text_lower]
+
+        if has_bulan and 'tanggal' in text_lower:
+            # "di bulan Februari tanggal 1", then "tanggal 1 (di) bulan Februari"
+            for _, month_num, bulan_tanggal, tanggal_bulan, _, _ in present:
+                for pattern in (bulan_tanggal, tanggal_bulan):
+                    match = pattern.search(text_lower)
+                    if match:
+                        try:
+                            return _fmt(_date_or_next_year(today, month_num, int(match.group(1))))
+                        except ValueError:
+                            pass
+
+        # "5 januari 2025" or "5 jan 2025"
+        for _, month_num, _, _, with_year, _ in present:
+            match = with_year.search(text_lower)
+            if match:
+                try:
+                    return _fmt(datetime(int(match.group(2)), month_num, int(match.group(1))).date())
+                except ValueError:
+                    pass
+
+        # "5 januari", "5 jan" (tanpa tahun, pakai tahun sekarang)
+        for _, month_num, _, _, _, without_year in present:
+            match = without_year.search(text_lower)
+            if match:
+                try:
+                    return _fmt(_date_or_next_year(today, month_num, int(match.group(1))))
+                except ValueError:
+                    pass
+
+    if '-' not in text_lower and '/' not in text_lower:
+        return None
+
     # ISO format: 2025-01-01
-    match = re.search(r'(\d{4})-(\d{1,2})-(\d{1,2})', text_lower)
+    match = _ISO_DATE_RE.search(text_lower) if '-' in text_lower else None
     if match:
         year = int(match.group(1))
         month = int(match.group(2))
         day = int(match.group(3))
         try:
-            date_obj = datetime(year, month, day).date()
-            return date_obj.strftime("%Y-%m-%d")
+            return _fmt(datetime(year, month, day).date())
         except ValueError:
             pass
-    
+
     # DD-MM-YYYY or DD/MM/YYYY
-    match = re.search(r'(\d{1,2})[-/](\d{1,2})[-/](\d{4})', text_lower)
+    match = _DMY_DATE_RE.search(text_lower)
     if match:
         day = int(match.group(1))
         month = int(match.group(2))
         year = int(match.group(3))
         try:
-            date_obj = datetime(year, month, day).date()
-            return date_obj.strftime("%Y-%m-%d")
+            return _fmt(datetime(year, month, day).date())
         except ValueError:
             pass
-    
+
     return None
 
 
-def _extract_category_from_text(text: str) -> str | None:
-    """Extract category from Indonesian text using keyword matching."""
-    text_lower = text.lower()
-    
-    # Category keywords mapping (most specific first)
-    category_keywords = {
-        'makan': ['nasi', 'ayam', 'soto', 'bakso', 'mie', 'bubur', 'sate', 
-                  'rendang', 'gudeg', 'pecel', 'gado', 'warteg', 'padang',
-                  'resto', 'restoran', 'makanan', 'makan', 'sarapan', 
-                  'makan siang', 'makan malam'],
-        'minuman': ['kopi', 'teh', 'jus', 'susu', 'air mineral', 'aqua',
-                    'minuman', 'minum', 'es', 'cappuccino', 'latte', 'espresso',
-                    'americano', 'boba', 'milkshake', 'smoothie'],
-        'transport': ['bensin', 'ojek', 'gojek', 'grab', 'taxi', 'taksi',
-                      'bus', 'kereta', 'transportasi', 'parkir', 'tol',
-                      'angkot', 'angkutan', 'bbm', 'pertamax'],
-        'belanja': ['beli', 'belanja', 'shopping', 'supermarket', 'indomaret',
-                    'alfamart', 'pasar', 'toko'],
-        'tagihan': ['listrik', 'air', 'pdam', 'wifi', 'internet', 'pulsa',
-                    'token', 'tagihan', 'bayar cicilan', 'cicilan'],
-        'hiburan': ['nonton', 'bioskop', 'cinema', 'karaoke', 'game', 'netflix',
-                    'spotify', 'youtube premium', 'hiburan'],
-        'kesehatan': ['obat', 'dokter', 'rumah sakit', 'rs', 'klinik', 'apotek',
-                      'vitamin', 'kesehatan'],
-        'gaji': ['gaji', 'salary', 'penghasilan', 'pendapatan', 'income'],
-    }
-    
-    # Check each category
-    for category, keywords in category_keywords.items():
-        for keyword in keywords:
-            if keyword in text_lower:
-                return category
-    
+def _find_category(text_lower: str) -> str | None:
+    for keyword, category in _CATEGORY_TABLE:
+        if keyword in text_lower:
+            return category
     return None
 
 
-def _extract_amount_from_text(text: str) -> int | None:
-    """Extract amount from Indonesian text."""
-    text_lower = text.lower()
-    
-    # ✅ NEW: Pattern for "10 juta" or "sepuluh juta" (kata + juta/ribu)
-    number_words_full = {
-        'satu': 1, 'dua': 2, 'tiga': 3, 'empat': 4, 'lima': 5,
-        'enam': 6, 'tujuh': 7, 'delapan': 8, 'sembilan': 9, 'sepuluh': 10,
-        'sebelas': 11, 'dua belas': 12, 'tiga belas': 13, 'empat belas': 14, 'lima belas': 15,
-        'dua puluh': 20, 'tiga puluh': 30, 'empat puluh': 40, 'lima puluh': 50,
-        'enam puluh': 60, 'tujuh puluh': 70, 'delapan puluh': 80, 'sembilan puluh': 90,
-        'seratus': 100, 'seribu': 1000
-    }
-    
-    # Check for "sepuluh juta", "lima ribu", etc
-    for word, num in number_words_full.items():
-        # Match "sepuluh juta"
-        pattern = rf'\b{word}\s+juta\b'
-        if re.search(pattern, text_lower):
-            return num * 1000000
-        
-        # Match "lima ribu"
-        pattern = rf'\b{word}\s+ribu\b'
-        if re.search(pattern, text_lower):
-            return num * 1000
-    
+def _find_amount(text: str, text_lower: str) -> int | None:
+    # "sepuluh juta", "lima ribu", etc
+    if 'juta' in text_lower or 'ribu' in text_lower:
+        best = None
+        for match in _WORD_AMOUNT_RE.finditer(text_lower):
+            key = (_NUMBER_WORD_FULL_RANK[match.group(1)], match.group(2) != 'juta')
+            if best is None or key < best[0]:
+                best = (key, match.group(1), match.group(2))
+        if best is not None:
+            _, word, unit = best
+            return _NUMBER_WORDS_FULL[word] * (1000000 if unit == 'juta' else 1000)
+
     # Pattern 1: "Rp15.000" or "Rp 15.000" or "rp15000"
-    match = re.search(r'rp\.?\s*(\d+(?:[.,]\d+)*)', text_lower)
+    match = _RP_AMOUNT_RE.search(text_lower) if 'rp' in text_lower else None
     if match:
         amount_str = match.group(1).replace('.', '').replace(',', '')
         try:
             return int(amount_str)
         except ValueError:
             pass
-    
+
     # Pattern 2: "15rb" or "15ribu" or "15k"
-    match = re.search(r'(\d+(?:[.,]\d+)?)\s*(rb|ribu|k)\b', text_lower)
+    match = _THOUSANDS_AMOUNT_RE.search(text_lower) if ('k' in text_lower or 'rb' in text_lower or 'ribu' in text_lower) else None
     if match:
         val = float(match.group(1).replace(',', '.'))
         return int(val * 1000)
-    
+
     # Pattern 3: "1.5jt" or "1.5juta" or "10 juta"
-    match = re.search(r'(\d+(?:[.,]\d+)?)\s*(jt|juta)\b', text_lower)
+    match = _MILLIONS_AMOUNT_RE.search(text_lower) if ('jt' in text_lower or 'juta' in text_lower) else None
     if match:
         val = float(match.group(1).replace(',', '.'))
         return int(val * 1000000)
-    
+
     # Pattern 4: "senilai XXX" or "sebesar XXX"
-    match = re.search(r'(?:senilai|sebesar|nominal)\s+(\d+(?:[.,]\d+)?)\s*(jt|juta|rb|ribu|k)?\b', text_lower)
+    match = _NOMINAL_AMOUNT_RE.search(text_lower) if ('senilai' in text_lower or 'sebesar' in text_lower or 'nominal' in text_lower) else None
     if match:
         val = float(match.group(1).replace(',', '.'))
         unit = match.group(2)
@@ -275,65 +349,115 @@ def _extract_amount_from_text(text: str) -> int | None:
             else:
                 # Assume it's in thousands if < 1000
                 return int(val * 1000) if val < 100 else int(val)
-    
+
     # Pattern 5: Just numbers with thousand separators "15.000"
-    match = re.search(r'\b(\d{1,3}(?:\.\d{3})+)\b', text)
+    match = _SEPARATED_AMOUNT_RE.search(text) if '.' in text else None
     if match:
         amount_str = match.group(1).replace('.', '')
         try:
             return int(amount_str)
         except ValueError:
             pass
-    
+
     # Pattern 6: Just a plain number (as last resort)
-    match = re.search(r'\b(\d{3,})\b', text)
+    match = _PLAIN_AMOUNT_RE.search(text)
     if match:
         try:
             return int(match.group(1))
         except ValueError:
             pass
-    
+
     return None
 
 
+@lru_cache(maxsize=4096)
+def _clean_token(token: str) -> tuple:
+    # Date words never contain whitespace (except "hari ini", handled by the
+    # caller), so removing them token by token gives the same result as running
+    # the replacements over the whole text. Phrases repeat a lot, hence the cache.
+    for word in _DATE_WORDS[1:]:
+        if word in token:
+            token = token.replace(word, ' ')
+    token = _DIGITS_RE.sub('', token).translate(_SEPARATORS)
+    return tuple(token.split())
+
+
+def _has_content(text_lower: str, tokens: list[str]) -> bool:
+    # Check if there's at least one action word or item (cheap, so it goes first)
+    if not _ACTION_RE.search(text_lower):
+        return False
+
+    # Remove date words, numbers and common separators
+    if 'hari ini' in text_lower:
+        tokens = text_lower.replace('hari ini', ' ').split()
+    cleaned = ' '.join(fragment for token in tokens for fragment in _clean_token(token))
+
+    # If after removing date words, there's still meaningful content
+    return len(cleaned) >= 3
+
+
+def _find_type(text_lower: str) -> str | None:
+    """'income' or 'expense' when only one side's keywords occur, otherwise None."""
+    is_expense = _EXPENSE_RE.search(text_lower) is not None
+    is_income = _INCOME_RE.search(text_lower) is not None
+    if is_expense == is_income:
+        return None
+    return "expense" if is_expense else "income"
+
+
+def _find_title(tokens: list[str]) -> str | None:
+    """Title from the first type keyword up to the amount/date part: "beli kopi 15rb" → "Beli kopi"."""
+    start = next((i for i, token in enumerate(tokens) if _TYPE_RE.search(token)), None)
+    if start is None:
+        return None
+    words = []
+    for token in tokens[start:start + _TITLE_MAX_WORDS]:
+        word = token.strip('.,;:!?()"\'')
+        if not word or word in _TITLE_STOP_WORDS or _DIGITS_RE.search(word):
+            break
+        words.append(word)
+    if not words or (len(words) == 1 and words[0] in _TITLE_VERBS):
+        return None
+    title = ' '.join(words)
+    return title[0].upper() + title[1:]
+
+
+def analyze_text(text: str) -> Dict[str, Any]:
+    """Run every rule extractor over `text` with a single lowercasing pass.
+
+    Returns dict with keys: has_content, date, category, amount (same values the
+    individual `_extract_*` / `_has_transaction_content` helpers return), plus
+    type and title when the rules alone can decide them (else None).
+    """
+    text_lower = text.lower()
+    tokens = text_lower.split()
+    return {
+        "has_content": _has_content(text_lower, tokens),
+        "date": _find_date(text_lower, tokens),
+        "category": _find_category(text_lower),
+        "amount": _find_amount(text, text_lower),
+        "type": _find_type(text_lower),
+        "title": _find_title(tokens),
+    }
+
+
+def _extract_date_from_text(text: str) -> str | None:
+    """Extract date from Indonesian text using regex."""
+    text_lower = text.lower()
+    return _find_date(text_lower, text_lower.split())
+
+
+def _extract_category_from_text(text: str) -> str | None:
+    """Extract category from Indonesian text using keyword matching."""
+    return _find_category(text.lower())
+
+
+def _extract_amount_from_text(text: str) -> int | None:
+    """Extract amount from Indonesian text."""
+    return _find_amount(text, text.lower())
+
+
 def _has_transaction_content(text: str) -> bool:
     """Check if text contains actual transaction information (not just date/time words)."""
-    text_lower = text.lower().strip()
-    
-    # Remove common date/time words
-    date_words = [
-        'hari ini', 'kemarin', 'today', 'yesterday',
-        'hari', 'lalu', 'yang', 'tanggal', 'bulan', 'di',
-        'januari', 'februari', 'maret', 'april', 'mei', 'juni',
-        'juli', 'agustus', 'september', 'oktober', 'november', 'desember',
-        'jan', 'feb', 'mar', 'apr', 'jun', 'jul', 'aug', 'sep', 'oct', 'nov', 'dec',
-        'agu', 'okt', 'des', 'satu', 'dua', 'tiga', 'empat', 'lima',
-        'enam', 'tujuh', 'delapan', 'sembilan', 'sepuluh'
-    ]
-    
-    # Remove date patterns and numbers
-    cleaned = text_lower
-    for word in date_words:
-        cleaned = cleaned.replace(word, ' ')
-    
-    # Remove numbers and common separators
-    cleaned = re.sub(r'\d+', '', cleaned)
-    cleaned = re.sub(r'[-/,.]', ' ', cleaned)
-    cleaned = ' '.join(cleaned.split())  # normalize whitespace
-    
-    # If after removing date words, there's still meaningful content
-    if len(cleaned) < 3:
-        return False
-    
-    # Check if there's at least one action word or item
-    action_words = [
-        'beli', 'bayar', 'belanja', 'makan', 'minum', 'dapat', 'terima', 'mendapatkan',
-        'kopi', 'nasi', 'bensin', 'pulsa', 'token', 'listrik', 'air',
-        'gaji', 'bonus', 'ojek', 'grab', 'gojek', 'taxi', 'bus', 'senilai', 'sebesar'
-    ]
-    
-    for word in action_words:
-        if word in text_lower:
-            return True
-    
-    return False
\ No newline at end of file
+    text_lower = text.lower()
+    return _has_content(text_lower, text_lower.split())
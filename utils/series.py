@@ -0,0 +1,103 @@
+# utils/series.py
+"""Income/expense totals per day, week, month, quarter or year, in one query.
+
+The query groups the `daily_totals` rollup by a bucket expression computed
+in SQL (per dialect, below) and by type, and optionally by category. Only
+the (user_id, date) primary-key range is scanned. Buckets with no rows are
+filled in here, so the result always has one entry per period.
+"""
+from datetime import date, datetime
+from typing import List
+
+from sqlalchemy import Integer, String, cast, func, select
+
+import models
+from .periods import GRANULARITIES, bucket_count, bucket_start, buckets, in_range
+
+MAX_BUCKETS = 1000
+
+Daily = models.DailyTotal
+
+
+def bucket_column(column, granularity: str, dialect: str):
+    """SQL expression for the first day of the bucket containing `column` (weeks start on Monday)."""
+    if dialect == "mysql":
+        if granularity == "day":
+            return column
+        if granularity == "week":
+            return func.subdate(column, func.weekday(column))
+        if granularity == "quarter":
+            return func.concat(func.year(column), "-", func.lpad((func.quarter(column) - 1) * 3 + 1, 2, "0"), "-01")
+        return func.date_format(column, "%Y-%m-01" if granularity == "month" else "%Y-01-01")
+    if dialect == "sqlite":
+        if granularity == "day":
+            return func.date(column)
+        if granularity == "week":
+            # back 6 days, then forward to the next Monday (or stay on it)
+            return func.date(column, "-6 days", "weekday 1")
+        if granularity == "quarter":
+            months_in = (cast(func.strftime("%m", column), Integer) - 1) % 3
+            return func.date(column, "start of month", "-" + cast(months_in, String) + " months")
+        return func.strftime("%Y-%m-01" if granularity == "month" else "%Y-01-01", column)
+    # PostgreSQL and others with date_trunc
+    return func.date_trunc(granularity, column)
+
+
+def _as_date(value) -> date:
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    return date.fromisoformat(str(value)[:10])
+
+
+async def series(db, user_id: int, start: date, end: date, granularity: str, group_by: str | None = None) -> List[dict]:
+    """Totals per bucket over [start, end) for `user_id`; `db` is an AsyncSession.
+
+    group_by "type" adds an income and an expense entry per bucket,
+    "category" one entry per (type, category) with rows in that bucket
+    (category_id None = uncategorised)."""
+    # counted before building the list, so a huge range is rejected in O(1)
+    if bucket_count(start, end, granularity) > MAX_BUCKETS:
+        raise ValueError(f"Maksimal {MAX_BUCKETS} periode per permintaan")
+    periods = buckets(start, end, granularity)
+    index = {bucket_start(period_start, granularity): i for i, (period_start, _) in enumerate(periods)}
+
+    bucket = bucket_column(Daily.date, granularity, db.get_bind().dialect.name).label("bucket")
+    keys = [bucket, Daily.type]
+    if group_by == "category":
+        keys += [Daily.category_id, models.Category.name]
+    stmt = select(*keys, func.sum(Daily.total), func.sum(Daily.count))\
+        .where(Daily.user_id == user_id, *in_range(Daily.date, start, end))\
+        .group_by(*keys)
+    if group_by == "category":
+        stmt = stmt.outerjoin(models.Category, (models.Category.id == Daily.category_id) & (models.Category.type == Daily.type))
+
+    data = [{"start": period_start, "end": period_end, "income": 0.0, "expense": 0.0, "count": 0}
+            for period_start, period_end in periods]
+    if group_by == "type":
+        for item in data:
+            item["groups"] = [{"type": kind.value, "total": 0.0, "count": 0} for kind in models.CategoryType]
+    elif group_by == "category":
+        for item in data:
+            item["groups"] = []
+
+    for row in await db.execute(stmt):
+        item = data[index[_as_date(row[0])]]
+        kind, total, count = row[1], float(row[-2] or 0), int(row[-1] or 0)
+        item[kind.value] += total
+        item["count"] += count
+        if group_by == "type":
+            group = next(g for g in item["groups"] if g["type"] == kind.value)
+            group["total"] += total
+            group["count"] += count
+        elif group_by == "category":
+            item["groups"].append({"type": kind.value, "category_id": row[2] or None, "category": row[3],
+                                   "total": total, "count": count})
+
+    for item in data:
+        item["balance"] = item["income"] - item["expense"]
+        if group_by == "category":
+            # incomes first, largest first
+            item["groups"].sort(key=lambda g: (g["type"] != "income", -g["total"]))
+    return data
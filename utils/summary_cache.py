@@ -0,0 +1,88 @@
+# utils/summary_cache.py
+"""Versioned response cache for the summary endpoints.
+
+Every user has a data version, bumped whenever a commit writes one of their
+incomes, expenses or categories (see `database.on_user_write`). Responses
+are cached under (user, path, query, version) and sent with an ETag derived
+from the same key, so:
+
+* a dashboard repeating a request with If-None-Match gets a bare 304;
+* a repeat without it gets the stored body, no query runs;
+* after a write the version changes and nothing stale can be served.
+
+Backends come from `make_cache`: "memory" is per process, "sqlite" is shared
+by all workers on the host (required when running several workers, otherwise
+a worker would not see versions bumped by another), "none" disables caching.
+"""
+import hashlib
+import json
+import os
+import time
+
+from fastapi import Request, Response
+from fastapi.encoders import jsonable_encoder
+
+from database import on_user_write
+from .cache import make_cache
+
+SUMMARY_CACHE_BACKEND = os.getenv("SUMMARY_CACHE_BACKEND", "memory")
+SUMMARY_CACHE_SIZE = int(os.getenv("SUMMARY_CACHE_SIZE", "5000"))
+SUMMARY_CACHE_TTL = float(os.getenv("SUMMARY_CACHE_TTL", "3600"))
+SUMMARY_CACHE_PATH = os.getenv("SUMMARY_CACHE_PATH", "./cache/summary_cache.sqlite3")
+
+# versions live apart from the responses so evicting responses never drops a version
+VERSION_TTL = 30 * 24 * 3600
+
+response_cache = make_cache(SUMMARY_CACHE_BACKEND, SUMMARY_CACHE_SIZE, SUMMARY_CACHE_TTL, SUMMARY_CACHE_PATH, table="summary_cache")
+version_cache = make_cache(SUMMARY_CACHE_BACKEND, SUMMARY_CACHE_SIZE, VERSION_TTL, SUMMARY_CACHE_PATH, table="summary_versions")
+
+
+def data_version(user_id: int) -> int:
+    version = version_cache.get(str(user_id))
+    if version is None:
+        # unknown (new process, evicted): start a fresh one, which can't match anything stored
+        version = time.time_ns()
+        version_cache.set(str(user_id), version)
+    return version
+
+
+def bump_versions(user_ids) -> None:
+    version = time.time_ns()
+    for user_id in user_ids:
+        version_cache.set(str(user_id), version)
+
+
+on_user_write(bump_versions)
+
+
+def _etag_matches(header: str | None, etag: str) -> bool:
+    if not header:
+        return False
+    candidates = [tag.strip() for tag in header.split(",")]
+    return "*" in candidates or any(tag.removeprefix("W/") == etag for tag in candidates)
+
+
+class CachedSummary:
+    """One request's view of the cache; the version is read once, before any query runs."""
+
+    def __init__(self, request: Request, user_id: int):
+        query = "&".join(f"{k}={v}" for k, v in sorted(request.query_params.multi_items()))
+        self.key = f"{user_id}:{data_version(user_id)}:{request.url.path}?{query}"
+        self.etag = '"' + hashlib.blake2b(self.key.encode(), digest_size=16).hexdigest() + '"'
+        self.headers = {"ETag": self.etag, "Cache-Control": "private, no-cache"}
+        self.response: Response | None = None
+        if _etag_matches(request.headers.get("if-none-match"), self.etag):
+            self.response = Response(status_code=304, headers=self.headers)
+        else:
+            body = response_cache.get(self.key)
+            if body is not None:
+                self.response = Response(content=body, media_type="application/json", headers=self.headers)
+
+    def store(self, data) -> Response:
+        body = json.dumps(jsonable_encoder(data), separators=(",", ":"))
+        response_cache.set(self.key, body)
+        return Response(content=body, media_type="application/json", headers=self.headers)
+
+
+def stats() -> dict:
+    return {"responses": response_cache.stats(), "versions": version_cache.stats()}